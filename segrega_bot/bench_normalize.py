@@ -0,0 +1,153 @@
+# bench_normalize.py
+# -*- coding: utf-8 -*-
+r"""
+Micro-benchmark da normalização (util_normalize): compara a implementação
+atual (tabela de str.translate + stopwords no mesmo passo) com a anterior
+(NFD + filtro de marcas combinantes + regex + split/join), que fica aqui
+como referência. Antes de medir, confere que as saídas são idênticas.
+
+Entradas: nomes, nomes de arquivo e textos de página no estilo de
+``geracao_test.py`` (acentos, Ç, maiúsculas, pontuação, stopwords).
+
+Uso (exemplos):
+  python bench_normalize.py
+  python bench_normalize.py --docs 5000 --repeat 7 --out normalize.json
+  python bench_normalize.py --exhaustive      # confere também todos os code points
+
+Códigos de saída:
+  0  ok
+  1  alguma saída diferente da implementação de referência
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import time
+import unicodedata
+from typing import Callable, Dict, List
+
+import util_normalize as un
+from geracao_test import FILLER, realistic_names
+
+
+# ---------------- referência (implementação anterior) ----------------
+def ref_strip_accents_lower(s: str) -> str:
+    if not s:
+        return ""
+    s = unicodedata.normalize("NFD", s)
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    s = s.replace("Ç", "C").replace("ç", "c")
+    s = s.lower()
+    s = re.sub(r"\s+", " ", s)
+    return s.strip()
+
+
+def ref_normalize_text_for_search(text: str) -> str:
+    tokens = ref_strip_accents_lower(text).split()
+    return " ".join([t for t in tokens if t not in un.STOPWORDS])
+
+
+# ---------------- entradas ----------------
+def build_inputs(docs: int, seed: int) -> Dict[str, List[str]]:
+    rng = random.Random(seed)
+    names = realistic_names(max(docs, 100), rng)
+    pages, files = [], []
+    for i in range(docs):
+        lines = [FILLER[(i + k) % len(FILLER)].format(n=i, m=(i % 12) + 1) for k in range(12)]
+        for k in range(rng.choice([1, 2, 3])):
+            name = rng.choice(names)
+            lines.insert(rng.randrange(len(lines)), name.upper() if rng.random() < 0.3 else name)
+        pages.append("\n".join(lines))
+        who = rng.choice(names).replace(" ", rng.choice(["_", " ", "-"]))
+        files.append(f"{i:06d}_{who}" if rng.random() < 0.5 else f"doc_{i:06d}")
+    return {"names": names, "filenames": files, "pages": pages}
+
+
+# ---------------- medição ----------------
+def _best_of(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def check_equivalence(inputs: Dict[str, List[str]], exhaustive: bool) -> List[str]:
+    errors = []
+    for kind, items in inputs.items():
+        for s in items:
+            if un.normalize_text_for_search(s) != ref_normalize_text_for_search(s):
+                errors.append(f"{kind}: {s[:60]!r}")
+            if un.strip_accents_lower(s) != ref_strip_accents_lower(s):
+                errors.append(f"{kind} (strip_accents_lower): {s[:60]!r}")
+        if un.normalize_texts_for_search(items) != [ref_normalize_text_for_search(s) for s in items]:
+            errors.append(f"{kind}: lote difere")
+    if exhaustive:
+        for cp in range(0x110000):
+            if 0xD800 <= cp < 0xE000:
+                continue
+            s = f"A{chr(cp)}b De {chr(cp)}"
+            if un.normalize_text_for_search(s) != ref_normalize_text_for_search(s):
+                errors.append(f"U+{cp:04X}")
+    return errors
+
+
+def measure(inputs: Dict[str, List[str]], repeat: int) -> Dict[str, dict]:
+    out = {}
+    for kind, items in inputs.items():
+        chars = sum(len(s) for s in items)
+        ref = _best_of(lambda: [ref_normalize_text_for_search(s) for s in items], repeat)
+        new = _best_of(lambda: [un.normalize_text_for_search(s) for s in items], repeat)
+        batch = _best_of(lambda: un.normalize_texts_for_search(items), repeat)
+        out[kind] = {
+            "items": len(items),
+            "chars": chars,
+            "reference_ms": round(ref * 1000, 2),
+            "translate_ms": round(new * 1000, 2),
+            "batch_ms": round(batch * 1000, 2),
+            "speedup": round(ref / new, 2) if new else None,
+            "speedup_batch": round(ref / batch, 2) if batch else None,
+            "mchars_per_s": round(chars / new / 1e6, 1) if new else None,
+        }
+    return out
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Micro-benchmark da normalização de texto.")
+    ap.add_argument("--docs", type=int, default=2000, help="Textos de página / nomes de arquivo gerados.")
+    ap.add_argument("--repeat", type=int, default=5, help="Repetições por medição (vale a melhor).")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--exhaustive", action="store_true", help="Confere também todos os code points Unicode.")
+    ap.add_argument("--out", help="Grava o resultado em JSON.")
+    return ap.parse_args()
+
+
+def main():
+    args = parse_args()
+    inputs = build_inputs(args.docs, args.seed)
+
+    errors = check_equivalence(inputs, args.exhaustive)
+    if errors:
+        print(f"[ERRO] {len(errors)} saída(s) diferente(s) da referência:", file=sys.stderr)
+        for e in errors[:20]:
+            print(f"  {e}", file=sys.stderr)
+        return 1
+    print("Equivalência: ok" + (" (todos os code points)" if args.exhaustive else ""))
+
+    result = measure(inputs, args.repeat)
+    print(f"{'entrada':<10} {'itens':>7} {'ref ms':>9} {'novo ms':>9} {'lote ms':>9} {'ganho':>6} {'lote':>6}")
+    for kind, r in result.items():
+        print(f"{kind:<10} {r['items']:>7} {r['reference_ms']:>9} {r['translate_ms']:>9} "
+              f"{r['batch_ms']:>9} {r['speedup']:>5}x {r['speedup_batch']:>5}x")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"docs": args.docs, "repeat": args.repeat, "results": result}, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
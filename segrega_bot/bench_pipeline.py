@@ -0,0 +1,295 @@
+# bench_pipeline.py
+# -*- coding: utf-8 -*-
+r"""
+Benchmark do pipeline completo, por etapa, sobre um corpus gerado por
+``geracao_test.py`` (ou qualquer pasta de PDFs + lista de nomes).
+
+Duas medições:
+  - etapas: varredura, extração, normalização, autômato, busca, cópia e relatório,
+    cada uma isolada, no próprio processo (em até --sample PDFs), com
+    tempo de parede, CPU, itens/s e pico de memória;
+  - ponta a ponta: ``cli.py`` num processo filho (sem GUI), com o resumo
+    JSON da execução e o pico de memória (RSS) do filho.
+
+O resultado vai para JSON (com a versão do código) para comparar versões.
+
+Uso (exemplos):
+  python bench_pipeline.py --generate 10000 --corpus /tmp/corpus_10k --out bench_10k.json
+  python bench_pipeline.py --corpus /tmp/corpus_10k --workers 8 --baseline bench_10k.json
+  python bench_pipeline.py --generate 1000000 --max-pages 3 --depth 2 --corpus /tmp/corpus_1m --sample 5000
+
+Códigos de saída:
+  0  ok
+  1  regressão acima da tolerância ou falha na execução ponta a ponta
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+try:
+    import resource     # indisponível no Windows
+except ImportError:
+    resource = None
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _maxrss_mb(who=None) -> Optional[float]:
+    """Pico de RSS (MB) do processo ou dos filhos; None se não houver ``resource``."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who is None else who)
+    kb = usage.ru_maxrss / (1024 if sys.platform == "darwin" else 1)   # macOS reporta bytes
+    return round(kb / 1024, 1)
+
+
+def _version() -> Dict[str, Optional[str]]:
+    try:
+        rev = subprocess.run(["git", "describe", "--always", "--dirty"], cwd=HERE,
+                             capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        rev = None
+    return {"git": rev, "python": sys.version.split()[0], "platform": sys.platform}
+
+
+def _stage(name: str, items: int, fn: Callable[[], object], trace: bool) -> tuple:
+    """Executa ``fn`` medindo parede/CPU/memória. Retorna (métricas, valor)."""
+    if trace:
+        tracemalloc.start()
+    t0, c0 = time.perf_counter(), time.process_time()
+    value = fn()
+    wall, cpu = time.perf_counter() - t0, time.process_time() - c0
+    peak = None
+    if trace:
+        peak = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+        tracemalloc.stop()
+    n = items if items >= 0 else len(value)
+    metrics = {
+        "items": n,
+        "wall_s": round(wall, 4),
+        "cpu_s": round(cpu, 4),
+        "items_per_s": round(n / wall, 1) if wall > 0 else None,
+        "peak_alloc_mb": peak,
+        "maxrss_mb": _maxrss_mb(),
+    }
+    print(f"[INFO] {name:<9} {n:>9} itens  {wall:8.3f} s  {metrics['items_per_s'] or 0:>10.1f} it/s")
+    return metrics, value
+
+
+def bench_stages(names_txt: str, src: str, sample: int, copy_workers: int, trace: bool,
+                 fuzzy: bool = False) -> Dict[str, dict]:
+    """Etapas isoladas, no processo atual."""
+    from main import load_names, scan_pdfs
+    from pdf_reader import extract_first_pages
+    from util_normalize import normalize_names_for_key, normalize_texts_for_search
+    from search_ac import compile_names, find_displays_with_source
+    from copy_engine import copy_plan
+    from report_writer import write_distribution_report
+
+    logging.getLogger("pypdf").setLevel(logging.ERROR)   # arquivos ilegíveis do corpus
+    out: Dict[str, dict] = {}
+    names = load_names(names_txt)
+
+    out["scan"], pdfs = _stage("scan", -1, lambda: scan_pdfs(src), trace)
+    chosen = pdfs[:sample] if sample > 0 else pdfs
+
+    def _extract():
+        texts = []
+        for p in chosen:
+            try:
+                pages, _h12 = extract_first_pages(p, 3)
+            except Exception:
+                pages = []
+            texts.append(pages)
+        return texts
+    out["extract"], texts = _stage("extract", len(chosen), _extract, trace)
+
+    def _normalize():
+        canon = dict(zip(names, normalize_names_for_key(names)))
+        norm = []
+        for p, pages in zip(chosen, texts):
+            *pages_norm, stem = normalize_texts_for_search(pages + [os.path.splitext(os.path.basename(p))[0]])
+            norm.append((pages_norm, stem))
+        return canon, norm
+    out["normalize"], (canon, norm) = _stage("normalize", len(chosen), _normalize, trace)
+
+    out["automaton"], compiled = _stage("automaton", len(canon), lambda: compile_names(canon, fuzzy=fuzzy), trace)
+
+    def _match():
+        plan: Dict[str, List[str]] = {}
+        for p, (pages_norm, stem) in zip(chosen, norm):
+            displays, _approx = find_displays_with_source(compiled, pages_norm, stem)
+            if displays:
+                plan[p] = sorted(displays)
+        return plan
+    out["match"], plan = _stage("match", len(chosen), _match, trace)
+
+    tmp = tempfile.mkdtemp(prefix="bench_copy_")
+    try:
+        ops = sum(len(v) for v in plan.values())
+        out["copy"], result = _stage(
+            "copy", ops, lambda: copy_plan(plan, tmp, max_workers=copy_workers), trace)
+
+        rows = [{"collaborator": c, "source_path": p, "created_path": dst, "status": "criado"}
+                for p, res in result.items() for c, dst in res["created"]]
+        found = {r["collaborator"] for r in rows}
+        not_found = [n for n in names if n not in found]
+        no_match = [p for p in chosen if p not in plan]
+        report = os.path.join(tmp, "relatorio_bench.xlsx")
+        out["report"], _ = _stage(
+            "report", len(rows) + len(not_found) + len(no_match),
+            lambda: write_distribution_report(report, names, rows, not_found, no_match), trace)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return out
+
+
+def bench_end_to_end(names_txt: str, src: str, workers: int, overlap: bool, fuzzy: bool = False,
+                     stop_rule: str = "full") -> dict:
+    """Execução completa via cli.py num processo filho."""
+    dst = tempfile.mkdtemp(prefix="bench_dst_")
+    summary_path = os.path.join(dst, "resumo_bench.json")
+    cmd = [sys.executable, os.path.join(HERE, "cli.py"), "--names", names_txt, "--src", src,
+           "--dst", dst, "--workers", str(workers), "--json", summary_path, "--quiet"]
+    if overlap:
+        cmd.append("--overlap")
+    if fuzzy:
+        cmd.append("--fuzzy")
+    cmd += ["--stop-rule", stop_rule]
+    try:
+        t0 = time.perf_counter()
+        proc = subprocess.run(cmd, cwd=HERE, capture_output=True, text=True)
+        wall = time.perf_counter() - t0
+        summary = {}
+        if os.path.isfile(summary_path):
+            with open(summary_path, "r", encoding="utf-8") as f:
+                summary = json.load(f)
+        pdfs = summary.get("pdfs") or 0
+        return {
+            "exit_code": proc.returncode,
+            "stderr_tail": proc.stderr.strip().splitlines()[-5:],
+            "wall_s": round(wall, 3),
+            "pdfs_per_s": round(pdfs / wall, 1) if wall > 0 else None,
+            "child_maxrss_mb": _maxrss_mb(resource.RUSAGE_CHILDREN) if resource else None,
+            "workers": workers,
+            "overlap": overlap,
+            "summary": summary,
+        }
+    finally:
+        shutil.rmtree(dst, ignore_errors=True)
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Etapas cuja vazão caiu mais que a tolerância em relação à baseline."""
+    problems = []
+    same_mode = current["params"].get("tracemalloc") == baseline.get("params", {}).get("tracemalloc")
+    for stage, cur in (current.get("stages", {}) if same_mode else {}).items():
+        base = baseline.get("stages", {}).get(stage)
+        if not base or not cur.get("items_per_s") or not base.get("items_per_s"):
+            continue
+        if cur["items_per_s"] < base["items_per_s"] * (1 - tolerance):
+            problems.append(f"{stage}: {base['items_per_s']:.1f} -> {cur['items_per_s']:.1f} itens/s")
+    cur_e2e, base_e2e = current.get("end_to_end") or {}, baseline.get("end_to_end") or {}
+    if cur_e2e.get("pdfs_per_s") and base_e2e.get("pdfs_per_s"):
+        if cur_e2e["pdfs_per_s"] < base_e2e["pdfs_per_s"] * (1 - tolerance):
+            problems.append(f"ponta a ponta: {base_e2e['pdfs_per_s']:.1f} -> {cur_e2e['pdfs_per_s']:.1f} PDFs/s")
+    return problems
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Benchmark do pipeline por etapa e ponta a ponta.")
+    ap.add_argument("--corpus", required=True,
+                    help="Pasta do corpus (com pdfs/ e colaboradores.txt, como gera o geracao_test.py).")
+    ap.add_argument("--names", help="Lista de nomes (padrão: <corpus>/colaboradores.txt).")
+    ap.add_argument("--src", help="Pasta de PDFs (padrão: <corpus>/pdfs).")
+    ap.add_argument("--generate", type=int, metavar="N", help="Gera antes um corpus com N PDFs.")
+    ap.add_argument("--num-names", type=int, default=2000, help="Nomes do corpus gerado.")
+    ap.add_argument("--max-pages", type=int, default=3)
+    ap.add_argument("--dup-rate", type=float, default=0.02)
+    ap.add_argument("--bad-rate", type=float, default=0.005)
+    ap.add_argument("--depth", type=int, default=2)
+    ap.add_argument("--sample", type=int, default=2000,
+                    help="PDFs usados nas etapas isoladas (0 = todos).")
+    ap.add_argument("--copy-workers", type=int, default=2, help="Threads de cópia na etapa isolada.")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processos na execução ponta a ponta.")
+    ap.add_argument("--overlap", action="store_true", help="Ponta a ponta com cópias durante a leitura.")
+    ap.add_argument("--fuzzy", action="store_true", help="Mede com a busca aproximada ativada.")
+    ap.add_argument("--stop-rule", choices=("full", "match", "filename"), default="full",
+                    help="Regra de parada da leitura na execução ponta a ponta.")
+    ap.add_argument("--no-stages", action="store_true", help="Só a execução ponta a ponta.")
+    ap.add_argument("--no-e2e", action="store_true", help="Só as etapas isoladas.")
+    ap.add_argument("--tracemalloc", action="store_true",
+                    help="Mede o pico de alocação por etapa (mais lento).")
+    ap.add_argument("--out", help="Grava o resultado em JSON.")
+    ap.add_argument("--baseline", help="JSON de uma medição anterior para comparar.")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="Queda de vazão aceita (0.2 = 20%%).")
+    return ap.parse_args()
+
+
+def main():
+    args = parse_args()
+    sys.path.insert(0, HERE)
+    names_txt = args.names or os.path.join(args.corpus, "colaboradores.txt")
+    src = args.src or os.path.join(args.corpus, "pdfs")
+
+    corpus_info = None
+    if args.generate:
+        from pathlib import Path
+        from geracao_test import generate_corpus
+        t0 = time.perf_counter()
+        corpus_info = generate_corpus(
+            Path(args.corpus), args.generate, args.num_names, max_pages=args.max_pages,
+            dup_rate=args.dup_rate, bad_rate=args.bad_rate, depth=args.depth,
+            progress_every=max(1000, args.generate // 20) if args.generate >= 10000 else 0,
+        )
+        corpus_info["generate_s"] = round(time.perf_counter() - t0, 2)
+        print(f"[INFO] Corpus gerado em {corpus_info['generate_s']} s: {corpus_info}")
+
+    result = {
+        "version": _version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "params": {"corpus": os.path.abspath(args.corpus), "sample": args.sample,
+                   "workers": args.workers, "copy_workers": args.copy_workers, "overlap": args.overlap,
+                   "fuzzy": args.fuzzy, "stop_rule": args.stop_rule,
+                   "tracemalloc": args.tracemalloc},
+        "corpus": corpus_info,
+        "stages": {},
+        "end_to_end": None,
+    }
+    if not args.no_stages:
+        result["stages"] = bench_stages(names_txt, src, args.sample, args.copy_workers, args.tracemalloc,
+                                         args.fuzzy)
+    if not args.no_e2e:
+        e2e = bench_end_to_end(names_txt, src, args.workers, args.overlap, args.fuzzy, args.stop_rule)
+        result["end_to_end"] = e2e
+        print(f"[INFO] ponta a ponta: {e2e['wall_s']} s, {e2e['pdfs_per_s']} PDFs/s, "
+              f"RSS máx. {e2e['child_maxrss_mb']} MB (saída {e2e['exit_code']})")
+
+    problems: List[str] = []
+    if result["end_to_end"] and result["end_to_end"]["exit_code"] != 0:
+        problems.append(f"cli.py terminou com código {result['end_to_end']['exit_code']}")
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            problems += compare(result, json.load(f), args.tolerance)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"[OK] Resultado salvo em: {args.out}")
+
+    for p in problems:
+        print(f"[REGRESSÃO] {p}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
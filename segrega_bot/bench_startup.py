@@ -0,0 +1,173 @@
+# bench_startup.py
+# -*- coding: utf-8 -*-
+r"""
+Mede o tempo de startup (import) de cada módulo com ``python -X importtime``
+e acusa regressões. Cada ponto de entrada é importado num processo novo,
+várias vezes; vale a mediana do tempo cumulativo por módulo.
+
+Uso (exemplos):
+  python bench_startup.py
+  python bench_startup.py --out startup.json
+  python bench_startup.py --baseline startup.json --tolerance 0.25
+  python bench_startup.py --gui          # inclui o tempo até a janela ficar pronta
+
+Códigos de saída:
+  0  ok
+  1  regressão acima da tolerância, orçamento estourado ou dependência pesada
+     carregada no startup
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# pontos de entrada medidos (ui só se houver tkinter)
+ENTRY_POINTS = ["main", "cli", "ui"]
+
+PROJECT_MODULES = {
+    "main", "cli", "ui", "scan_engine", "pdf_reader", "report_writer", "copy_engine",
+    "cache_db", "dest_index", "doc_handle", "extract_calibration", "fs_scan", "run_journal", "run_metrics",
+    "search_ac", "search_fuzzy", "util_normalize",
+}
+
+# dependências que NÃO podem ser carregadas antes do primeiro uso
+HEAVY_DEPS = ("pdfminer", "openpyxl", "pypdf", "fitz", "pypdfium2")
+
+_GUI_SNIPPET = (
+    "import time; t=time.perf_counter(); "
+    "from ui import App; a=App(); a.update(); "
+    "print(time.perf_counter()-t); a.destroy()"
+)
+
+
+def _importtime(module: str) -> Dict[str, int]:
+    """{módulo: microssegundos cumulativos} de um import num processo novo."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=HERE, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else module)
+    out: Dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [p.strip() for p in line[len("import time:"):].split("|")]
+        if len(parts) != 3 or not parts[1].isdigit():
+            continue
+        out[parts[2]] = int(parts[1])
+    return out
+
+
+def measure(repeat: int) -> Dict[str, dict]:
+    results: Dict[str, dict] = {}
+    for entry in ENTRY_POINTS:
+        runs: List[Dict[str, int]] = []
+        try:
+            for _ in range(repeat):
+                runs.append(_importtime(entry))
+        except RuntimeError as e:
+            results[entry] = {"skipped": str(e)}
+            continue
+        modules = {}
+        for mod in sorted(set().union(*runs)):
+            top = mod.split(".")[0]
+            if top in PROJECT_MODULES or top in HEAVY_DEPS:
+                modules[mod] = statistics.median(r.get(mod, 0) for r in runs)
+        results[entry] = {
+            "total_ms": round(statistics.median(r.get(entry, 0) for r in runs) / 1000, 2),
+            "modules_ms": {m: round(us / 1000, 2) for m, us in modules.items()},
+            "heavy_loaded": sorted({m.split(".")[0] for m in runs[0]} & set(HEAVY_DEPS)),
+        }
+    return results
+
+
+def measure_gui(repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-c", _GUI_SNIPPET], cwd=HERE,
+                              capture_output=True, text=True)
+        if proc.returncode != 0:
+            return {"skipped": (proc.stderr.strip().splitlines() or ["erro"])[-1]}
+        times.append(float(proc.stdout.strip()))
+    return {"window_ready_ms": round(statistics.median(times) * 1000, 2)}
+
+
+def compare(current: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> List[str]:
+    """Regressões: módulos que ficaram mais lentos que baseline*(1+tolerância)."""
+    problems = []
+    for entry, cur in current.get("entries", {}).items():
+        base = baseline.get("entries", {}).get(entry)
+        if not base or "skipped" in cur or "skipped" in base:
+            continue
+        pairs = [(entry, cur["total_ms"], base["total_ms"])]
+        pairs += [(m, ms, base["modules_ms"][m]) for m, ms in cur["modules_ms"].items()
+                  if m in base["modules_ms"]]
+        for name, now, before in pairs:
+            if now > before * (1 + tolerance) and now - before > min_delta_ms:
+                problems.append(f"{entry}: {name} {before:.1f} ms -> {now:.1f} ms")
+    return problems
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Benchmark de startup (tempo de import por módulo).")
+    ap.add_argument("--repeat", type=int, default=5, help="Processos por ponto de entrada (mediana).")
+    ap.add_argument("--out", help="Grava o resultado em JSON.")
+    ap.add_argument("--baseline", help="JSON de uma medição anterior para comparar.")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="Piora relativa aceita (0.25 = 25%%).")
+    ap.add_argument("--min-delta-ms", type=float, default=5.0, help="Ignora variações absolutas menores que isso.")
+    ap.add_argument("--budget-ms", type=float, default=300.0,
+                    help="Orçamento para o import de cada ponto de entrada.")
+    ap.add_argument("--gui", action="store_true", help="Mede também o tempo até a janela ficar pronta.")
+    return ap.parse_args()
+
+
+def main():
+    args = parse_args()
+    result = {
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "entries": measure(max(1, args.repeat)),
+    }
+    if args.gui:
+        result["gui"] = measure_gui(max(1, args.repeat))
+
+    problems: List[str] = []
+    for entry, data in result["entries"].items():
+        if "skipped" in data:
+            print(f"[INFO] {entry}: não medido ({data['skipped']})")
+            continue
+        print(f"[INFO] import {entry}: {data['total_ms']:.1f} ms")
+        for mod, ms in sorted(data["modules_ms"].items(), key=lambda kv: -kv[1])[:8]:
+            print(f"         {ms:8.1f} ms  {mod}")
+        if data["heavy_loaded"]:
+            problems.append(f"{entry}: dependências pesadas no startup: {', '.join(data['heavy_loaded'])}")
+        if data["total_ms"] > args.budget_ms:
+            problems.append(f"{entry}: {data['total_ms']:.1f} ms > orçamento de {args.budget_ms:.0f} ms")
+    if "gui" in result:
+        print(f"[INFO] GUI: {result['gui']}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            problems += compare(result, json.load(f), args.tolerance, args.min_delta_ms)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"[OK] Resultado salvo em: {args.out}")
+
+    for p in problems:
+        print(f"[REGRESSÃO] {p}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
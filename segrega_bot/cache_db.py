@@ -1,75 +1,281 @@
 # Cache incremental por arquivo PDF
-import shutil, time, uuid, os, json, stat
+import shutil, time, os, json, stat, sqlite3, threading
 from typing import Dict, Any, Optional
-
-from pdf_reader import extract_first_two_pages_hash
+from doc_handle import QUICK_HASH_SPAN, open_document, quick_hash_parts
+from fs_scan import FileEntry
 
 def _cache_dir(out_root: str) -> str:
     d = os.path.join(out_root, ".cache_distcolabs")
     os.makedirs(d, exist_ok=True)
     return d
 
+def get_cache_dir(out_root: str) -> str:
+    """Pasta de cache atual (criada se preciso); outros módulos guardam seus arquivos nela."""
+    return _cache_dir(out_root)
+
 def _cache_file(out_root: str) -> str:
+    """Índice JSON legado (só lido uma vez, para migrar ao SQLite)."""
     return os.path.join(_cache_dir(out_root), "index.json")
 
-def load_cache(out_root: str) -> Dict[str, Any]:
+def _db_file(out_root: str) -> str:
+    return os.path.join(_cache_dir(out_root), "index.sqlite")
+
+# commits em lote durante a varredura: a cada N entradas ou T segundos
+COMMIT_EVERY = 500
+COMMIT_INTERVAL_S = 5.0
+
+class SqliteCache:
+    """
+    Mapeamento caminho -> entrada do cache, persistido em SQLite (WAL).
+    Expõe ``get``/``[]``/``in`` como o antigo dict, mas cada consulta vai ao
+    índice da chave primária: nada é carregado inteiro em memória e cada
+    ``cache[path] = ...`` é gravado em lote, sobrevivendo a uma queda.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries (path TEXT PRIMARY KEY, data TEXT NOT NULL)"
+        )
+        self._conn.commit()
+        self._pending = 0
+        self._last_commit = time.monotonic()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM entries WHERE path = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def __getitem__(self, key: str) -> Dict[str, Any]:
+        info = self.get(key)
+        if info is None:
+            raise KeyError(key)
+        return info
+
+    def __contains__(self, key: object) -> bool:
+        return self.get(key) is not None
+
+    def __setitem__(self, key: str, info: Dict[str, Any]) -> None:
+        self.update({key: info})
+
+    def update(self, entries: Dict[str, Dict[str, Any]]) -> None:
+        rows = [(k, json.dumps(v, ensure_ascii=False)) for k, v in entries.items()]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO entries (path, data) VALUES (?, ?)", rows)
+            self._pending += len(rows)
+            if (self._pending >= COMMIT_EVERY
+                    or time.monotonic() - self._last_commit >= COMMIT_INTERVAL_S):
+                self._commit_locked()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def _commit_locked(self) -> None:
+        self._conn.commit()
+        self._pending = 0
+        self._last_commit = time.monotonic()
+
+    def commit(self) -> None:
+        with self._lock:
+            self._commit_locked()
+
+    def close(self) -> None:
+        with self._lock:
+            try:
+                self._conn.commit()
+            finally:
+                self._conn.close()
+
+# conexões abertas por pasta destino (para fechar antes de purgar)
+_open_caches: Dict[str, SqliteCache] = {}
+
+def _migrate_json_index(out_root: str, cache: SqliteCache) -> None:
+    """Importa o index.json antigo (uma única vez) e o renomeia para .migrated."""
     p = _cache_file(out_root)
     if not os.path.exists(p):
-        return {}
+        return
     try:
         with open(p, "r", encoding="utf-8") as f:
-            return json.load(f)
+            data = json.load(f)
+        if isinstance(data, dict) and data:
+            cache.update(data)
+        cache.commit()
+        os.replace(p, p + ".migrated")
     except Exception:
-        return {}
+        pass
+
+def load_cache(out_root: str) -> SqliteCache:
+    root = os.path.abspath(out_root)
+    cache = _open_caches.get(root)
+    if cache is None:
+        cache = SqliteCache(_db_file(out_root))
+        _migrate_json_index(out_root, cache)
+        _open_caches[root] = cache
+    return cache
 
 def save_cache(out_root: str, data: Dict[str, Any]) -> None:
-    p = _cache_file(out_root)
-    tmp = p + ".tmp"
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    os.replace(tmp, p)
+    """Confirma no disco o que ainda estiver pendente (ou grava um dict avulso)."""
+    if isinstance(data, SqliteCache):
+        data.commit()
+        return
+    cache = load_cache(out_root)
+    cache.update(data)
+    cache.commit()
 
-def is_unchanged(path: str, cache: Dict[str, Any]) -> bool:
-    try:
-        st = os.stat(path)
-    except OSError:
+def close_cache(out_root: str) -> None:
+    cache = _open_caches.pop(os.path.abspath(out_root), None)
+    if cache is not None:
+        try:
+            cache.close()
+        except Exception:
+            pass
+
+# Modos de validação de uma entrada do cache
+VALIDATE_STAT = "stat"    # tamanho + mtime_ns + inode/dispositivo (só metadados)
+VALIDATE_BYTES = "bytes"  # + hash dos bytes brutos do início/fim (cabeçalho, trailer/xref)
+VALIDATE_TEXT = "text"    # + hash do texto das páginas 1–2 (paranoico: reextrai com pdfminer)
+VALIDATION_MODES = (VALIDATE_STAT, VALIDATE_BYTES, VALIDATE_TEXT)
+
+def quick_file_hash(path: str, size: Optional[int] = None) -> str:
+    """SHA-1 dos primeiros e últimos 64 KiB do arquivo (onde ficam cabeçalho e trailer/xref)."""
+    with open(path, "rb") as f:
+        if size is None:
+            size = os.fstat(f.fileno()).st_size
+        head = f.read(QUICK_HASH_SPAN)
+        tail = b""
+        if size > QUICK_HASH_SPAN:
+            f.seek(max(QUICK_HASH_SPAN, size - QUICK_HASH_SPAN))
+            tail = f.read(QUICK_HASH_SPAN)
+    return quick_hash_parts(size, head, tail)
+
+def _stat_identity(st: os.stat_result) -> Dict[str, Any]:
+    return {"mtime": st.st_mtime, "mtime_ns": st.st_mtime_ns, "size": st.st_size,
+            "ino": st.st_ino, "dev": st.st_dev}
+
+def _same_identity(info: Dict[str, Any], ident: Dict[str, Any]) -> bool:
+    """``ident``: identidade atual (_stat_identity, DocumentHandle/FileEntry.identity)."""
+    if info.get("size") != ident["size"]:
         return False
-    key = os.path.abspath(path)
-    info = cache.get(key)
-    if not info:
+    if "mtime_ns" in info:
+        if info["mtime_ns"] != ident["mtime_ns"]:
+            return False
+    elif info.get("mtime") != ident["mtime"]:   # entradas antigas, sem mtime_ns
         return False
-    if info.get("mtime") != st.st_mtime or info.get("size") != st.st_size:
+    if "ino" in info and (info["ino"], info.get("dev")) != (ident["ino"], ident["dev"]):
         return False
+    return True
 
-    cached_hash = info.get("first2_hash")
-    if cached_hash is None:
+def is_unchanged(path: str, cache: Dict[str, Any], mode: str = VALIDATE_STAT,
+                 entry: Optional[FileEntry] = None) -> bool:
+    """
+    True se a entrada do cache ainda vale para ``path``.
+    Nos modos "stat" e "bytes" o PDF nunca é interpretado; "text" mantém a
+    verificação antiga pelo hash do texto das páginas 1–2.
+    entry: o stat da varredura (fs_scan); com ele o arquivo não é restatado e,
+    nos modos "bytes"/"text", só é aberto se a identidade ainda bate.
+    """
+    key = os.path.abspath(path)
+    info = cache.get(key)
+    if not info:
+        return False   # sem entrada nem vale o stat
+    if entry is not None and not _same_identity(info, entry.identity()):
         return False
+    if mode not in (VALIDATE_BYTES, VALIDATE_TEXT):
+        if entry is not None:
+            return True
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        return _same_identity(info, _stat_identity(st))
 
+    # "bytes"/"text": um único open serve ao stat e à leitura (doc_handle)
     try:
-        current_hash = extract_first_two_pages_hash(path)
+        with open_document(path) as doc:
+            if not _same_identity(info, doc.identity()):
+                return False
+            if mode == VALIDATE_BYTES:
+                cached_quick = info.get("quick_hash")
+                return cached_quick is not None and doc.quick_hash() == cached_quick
+            cached_hash = info.get("first2_hash")
+            if cached_hash is None:
+                return False
+            from pdf_reader import DEFAULT_BACKEND, extract_first_two_pages_hash
+            return extract_first_two_pages_hash(doc, info.get("backend") or DEFAULT_BACKEND) == cached_hash
     except Exception:
         return False
-    return current_hash == cached_hash
 
-def update_cache_entry(out_root: str, cache: Dict[str, Any], path: str, first2_hash: str, names: list):
-    try:
-        st = os.stat(path)
-    except OSError:
-        return
+def update_cache_entry(out_root: str, cache: Dict[str, Any], path: str, first2_hash: str, names: list,
+                       sources: Optional[Dict[str, str]] = None, fuzzy: Optional[list] = None,
+                       pages: Optional[str] = None, backend: Optional[str] = None,
+                       file_info: Optional[Dict[str, Any]] = None):
+    """
+    fuzzy: nomes achados só pela busca aproximada, ou None se ela estava desligada.
+    pages: modo de leitura (PageBudget.key), None no padrão (páginas 1–3).
+    backend: extrator usado, se não o padrão (o hash das p. 1–2 é refeito com ele).
+    file_info: identidade + quick_hash já obtidos de quem leu o arquivo
+    (ScanResult.file_info); sem ele, o arquivo é restatado e relido aqui.
+    """
+    if file_info is None:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        try:
+            quick = quick_file_hash(path, st.st_size)
+        except OSError:
+            quick = None
+        file_info = {**_stat_identity(st), "quick_hash": quick}
     key = os.path.abspath(path)
-    cache[key] = {
-        "mtime": st.st_mtime,
-        "size": st.st_size,
+    info = {
+        "mtime": file_info["mtime"],
+        "mtime_ns": file_info["mtime_ns"],
+        "size": file_info["size"],
+        "ino": file_info["ino"],
+        "dev": file_info["dev"],
         "first2_hash": first2_hash,
+        "quick_hash": file_info.get("quick_hash"),
         "names": sorted(names),
+        "sources": dict(sources or {}),   # {nome: "p. N" | "nome do arquivo"}
     }
+    if fuzzy is not None:
+        info["fuzzy"] = sorted(fuzzy)
+    if pages is not None:
+        info["pages"] = pages
+    if backend is not None:
+        info["backend"] = backend
+    cache[key] = info
 
-def get_cached_names(path: str, cache: Dict[str, Any]) -> Optional[list]:
+def get_cached_names(path: str, cache: Dict[str, Any], fuzzy: bool = False,
+                     pages: Optional[str] = None) -> Optional[list]:
+    """
+    Nomes da entrada no modo pedido. Entrada gravada sem a busca aproximada não
+    serve a uma execução com ela (None: precisa ler de novo); no sentido contrário
+    basta tirar os nomes aproximados. Outro modo de leitura (``pages``) também
+    pede releitura: com outro orçamento de páginas os nomes podem ser outros.
+    """
     key = os.path.abspath(path)
     info = cache.get(key)
-    if info:
-        return list(info.get("names", []))
-    return None
+    if not info or info.get("pages") != pages:
+        return None
+    names = info.get("names", [])
+    if fuzzy:
+        return list(names) if "fuzzy" in info else None
+    approx = set(info.get("fuzzy", ()))
+    return [n for n in names if n not in approx]
+
+def get_cached_fuzzy(path: str, cache: Dict[str, Any]) -> list:
+    info = cache.get(os.path.abspath(path))
+    return list(info.get("fuzzy") or []) if info else []
+
+def get_cached_sources(path: str, cache: Dict[str, Any]) -> Dict[str, str]:
+    info = cache.get(os.path.abspath(path))
+    return dict(info.get("sources") or {}) if info else {}
 
 def _on_rm_error(func, path, exc_info):
     # Tenta remover atributo read-only e repetir a operação (Windows-friendly)
@@ -86,6 +292,7 @@ def get_cache_dirs(out_root: str) -> list[str]:
 
 def purge_cache(out_root: str) -> None:
     """Remove recursivamente quaisquer pastas de cache conhecidas."""
+    close_cache(out_root)
     for d in get_cache_dirs(out_root):
         if os.path.exists(d):
             try:
@@ -0,0 +1,250 @@
+# cli.py
+# -*- coding: utf-8 -*-
+r"""
+Executa a distribuição sem interface gráfica (cron, agendador de tarefas, servidores).
+Usa o mesmo Controller da GUI, com um "sink" de progresso em texto.
+
+Uso (exemplos):
+  python cli.py --names colaboradores.txt --src /dados/pdfs --dst /dados/saida
+  python cli.py --names c.txt --src in --dst out --report out/rel.xlsx --workers 16 --json -
+
+Códigos de saída:
+  0  concluído
+  1  erro (falha fatal ou falha ao gravar o relatório)
+  2  argumentos inválidos
+  3  cancelado (Ctrl+C / SIGTERM) – use --resume para continuar depois
+"""
+
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from typing import Optional
+
+from main import Controller, LOG_DIR_NAME
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2
+EXIT_CANCELLED = 3
+
+PROGRESS_INTERVAL_S = 5.0
+
+
+class ConsoleSink:
+    """Implementa a mesma interface que o Controller usa da GUI (get_* e ui_*)."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self._lock = threading.Lock()
+        self._log_file = None
+        self._total = 1
+        self._value = 0
+        self._last_print = 0.0
+        self.finished = threading.Event()
+        self.report_path: Optional[str] = None
+
+    # ---- entradas ----
+    def get_paths(self):
+        return self.args.names, self.args.src, self.args.dst
+
+    def get_report_path(self) -> Optional[str]:
+        if self.args.no_report:
+            return None
+        path = os.path.abspath(self.args.report) if self.args.report \
+            else os.path.join(self.args.dst, "relatorio_distribuicao.xlsx")
+        if self.args.report_format:
+            path = os.path.splitext(path)[0] + "." + self.args.report_format
+        return path
+
+    def should_clear_cache(self) -> bool:
+        return not self.args.keep_cache
+
+    def get_workers(self) -> int:
+        return self.args.workers
+
+    def get_cache_validation(self) -> str:
+        return self.args.cache_validation
+
+    def should_overlap_copies(self) -> bool:
+        return self.args.overlap
+
+    def should_match_fuzzy(self) -> bool:
+        return self.args.fuzzy
+
+    def should_scan_unordered(self) -> bool:
+        return self.args.unordered_scan
+
+    def get_max_pages(self) -> int:
+        return self.args.max_pages
+
+    def get_stop_rule(self) -> str:
+        return self.args.stop_rule
+
+    def get_extract_backend(self) -> str:
+        return self.args.extract_backend
+
+    def get_placement(self) -> str:
+        return self.args.placement
+
+    # ---- saídas ----
+    def _err(self, msg: str):
+        print(msg, file=sys.stderr, flush=True)
+
+    def ui_log(self, msg: str):
+        with self._lock:
+            if self._log_file is not None:
+                self._log_file.write(msg + "\n")
+        if self.args.verbose:
+            self._err(msg)
+
+    def ui_set_log_file(self, path: Optional[str]):
+        with self._lock:
+            if self._log_file is not None:
+                self._log_file.close()
+                self._log_file = None
+            if path:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                self._log_file = open(path, "a", encoding="utf-8")
+
+    def ui_set_counts(self, *, total=0, colabs=0, found=0, nomatch=0, conflicts=0):
+        if not self.args.quiet:
+            self._err(f"PDFs: {total} | Colaboradores: {colabs} | Encontrados: {found} | "
+                      f"Sem match: {nomatch} | Conflitos: {conflicts}")
+
+    def ui_set_progress_total(self, total: int):
+        with self._lock:
+            self._total = max(1, total)
+            self._value = 0
+
+    def ui_set_progress(self, value: int):
+        with self._lock:
+            self._value = min(value, self._total)
+        self._maybe_print_progress()
+
+    def ui_step(self, inc: int = 1):
+        with self._lock:
+            self._value = min(self._value + inc, self._total)
+        self._maybe_print_progress()
+
+    def _maybe_print_progress(self):
+        if self.args.quiet:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_print < PROGRESS_INTERVAL_S and self._value < self._total:
+                return
+            self._last_print = now
+            value, total = self._value, self._total
+        self._err(f"  {value}/{total} ({100.0 * value / total:.1f}%)")
+
+    def ui_on_finish(self, report_path: Optional[str], resumable: bool = False):
+        self.report_path = report_path
+        self.ui_set_log_file(None)
+        self.finished.set()
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Distribui PDFs por colaborador (sem interface gráfica).")
+    ap.add_argument("--names", required=True, help="Arquivo .txt com um colaborador por linha.")
+    ap.add_argument("--src", required=True, help="Pasta de origem dos PDFs.")
+    ap.add_argument("--dst", required=True, help="Pasta destino.")
+    ap.add_argument("--report", help="Caminho do relatório (o formato sai da extensão: .xlsx, .csv, .jsonl "
+                                     "ou .parquet). Padrão: <dst>/relatorio_distribuicao.xlsx")
+    ap.add_argument("--report-format", choices=("xlsx", "csv", "jsonl", "parquet"),
+                    help="Força o formato do relatório (troca a extensão). Fora do xlsx, cada aba vira "
+                         "um arquivo: <base>.<ext>, <base>_sem_match, <base>_log e <base>_metricas.")
+    ap.add_argument("--no-report", action="store_true", help="Não gera relatório.")
+    ap.add_argument("--keep-cache", action="store_true", help="Mantém o cache ao finalizar (padrão: limpa).")
+    ap.add_argument("--cache-validation", choices=("stat", "bytes", "text"), default="stat",
+                    help="Validação do cache: stat (metadados), bytes (início/fim do arquivo) ou text (reextrai p. 1–2).")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                    help="Processos de leitura (padrão: todos os núcleos).")
+    ap.add_argument("--placement", choices=("auto", "clone", "copy", "symlink"), default="auto",
+                    help="Como criar os arquivos no destino: auto (hardlink → reflink → cópia no kernel → "
+                         "cópia), clone (sem hardlink), copy (sempre copiar) ou symlink (links p/ a origem).")
+    ap.add_argument("--overlap", action="store_true", help="Copia durante a leitura (pipeline).")
+    ap.add_argument("--extract-backend", default="pdfminer",
+                    choices=("pdfminer", "auto", "pdfminer_raw", "pypdf", "pymupdf", "pdfium"),
+                    help="Extrator de texto: pdfminer (com layout, padrão), auto (calibra numa amostra por "
+                         "produtor do PDF e usa o mais rápido com os mesmos matches; decisão guardada na "
+                         "pasta destino), pdfminer_raw (sem layout), pypdf, pymupdf ou pdfium (se instalados).")
+    ap.add_argument("--max-pages", type=int, default=3, help="Páginas lidas por PDF, no máximo (padrão: 3).")
+    ap.add_argument("--stop-rule", choices=("full", "match", "filename"), default="full",
+                    help="Quando parar de ler um PDF: full (sempre até --max-pages), match (na 1ª página "
+                         "com match sem indicação de continuação, ex.: \"continua\", \"página 1 de 3\") ou "
+                         "filename (como match, e o nome do arquivo casando dispensa a leitura).")
+    ap.add_argument("--fuzzy", action="store_true",
+                    help="Busca aproximada: aceita 1 letra trocada/faltando/sobrando por palavra do nome "
+                         "(OCR, hifenização); esses casos saem como 'aproximada' no relatório.")
+    ap.add_argument("--unordered-scan", action="store_true",
+                    help="Lê os PDFs na ordem em que as pastas da origem terminam de ser listadas (uma pasta "
+                         "lenta não segura as outras); a ordem do relatório e os sufixos -2, -3… de nomes "
+                         "repetidos passam a variar entre execuções.")
+    ap.add_argument("--resume", action="store_true", help="Retoma a última execução interrompida na pasta destino.")
+    ap.add_argument("--json", metavar="ARQUIVO", help="Grava o resumo em JSON ('-' para stdout).")
+    ap.add_argument("--verbose", action="store_true", help="Mostra cada linha do log no stderr.")
+    ap.add_argument("--quiet", action="store_true", help="Não mostra progresso.")
+    args = ap.parse_args(argv)
+
+    if not os.path.isfile(args.names):
+        ap.error(f"arquivo de colaboradores não encontrado: {args.names}")
+    if not os.path.isdir(args.src):
+        ap.error(f"pasta de origem inválida: {args.src}")
+    os.makedirs(args.dst, exist_ok=True)
+    args.workers = max(1, args.workers)
+    args.max_pages = max(1, args.max_pages)
+    return args
+
+
+def _write_summary(summary: dict, target: Optional[str]):
+    if not target:
+        return
+    data = json.dumps(summary, ensure_ascii=False, indent=2)
+    if target == "-":
+        print(data)
+        return
+    with open(target, "w", encoding="utf-8") as f:
+        f.write(data + "\n")
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    sink = ConsoleSink(args)
+    ctrl = Controller(sink)
+
+    def _cancel(*_):
+        if not args.quiet:
+            print("Cancelando…", file=sys.stderr, flush=True)
+        ctrl.on_cancel(sink)
+
+    signal.signal(signal.SIGINT, _cancel)
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, _cancel)
+
+    ctrl.on_start(sink, resume=args.resume)
+    while ctrl.thread is not None and ctrl.thread.is_alive():
+        ctrl.thread.join(timeout=0.5)   # join com timeout: sinais continuam sendo atendidos
+
+    summary = dict(ctrl.summary)
+    summary.update(
+        names=os.path.abspath(args.names),
+        src=os.path.abspath(args.src),
+        dst=os.path.abspath(args.dst),
+        log_dir=os.path.join(os.path.abspath(args.dst), LOG_DIR_NAME),
+    )
+    _write_summary(summary, args.json)
+
+    status = summary.get("status")
+    if status == "ok":
+        return EXIT_ERROR if summary.get("report_error") else EXIT_OK
+    if status == "cancelled":
+        return EXIT_CANCELLED
+    return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    sys.exit(main())
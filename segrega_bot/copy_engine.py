@@ -1,14 +1,154 @@
 # copy_engine.py
-from typing import Dict, List, Tuple, Optional
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Tuple, Optional, TYPE_CHECKING
+import errno
 import os
+import queue
 import shutil
+import stat
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from dataclasses import dataclass
 
-def _same_drive(a: str, b: str) -> bool:
-    da = os.path.splitdrive(os.path.abspath(a))[0].upper()
-    db = os.path.splitdrive(os.path.abspath(b))[0].upper()
-    return da == db and da != ""
+from dest_index import DestIndex, file_digest
+from doc_handle import DocumentHandle, open_document, storage_kind
+from fs_scan import FileEntry
+
+if TYPE_CHECKING:
+    from run_metrics import RunMetrics
+
+# -------- formas de colocar o arquivo no destino (da mais barata para a mais cara) --------
+METHOD_HARDLINK = "hardlink"     # mesmo sistema de arquivos: só metadados
+METHOD_REFLINK = "reflink"       # clone copy-on-write (FICLONE: Btrfs, XFS, …)
+METHOD_KERNEL = "kernel_copy"    # copy_file_range/sendfile: cópia sem passar pelo Python
+METHOD_SYMLINK = "symlink"       # link simbólico para a origem (opcional)
+METHOD_COPY = "copy2"            # cópia em espaço de usuário (sempre funciona)
+
+# modo escolhido por execução -> níveis tentados em ordem
+PLACEMENT_MODES: Dict[str, Tuple[str, ...]] = {
+    "auto": (METHOD_HARDLINK, METHOD_REFLINK, METHOD_KERNEL, METHOD_COPY),
+    "clone": (METHOD_REFLINK, METHOD_KERNEL, METHOD_COPY),     # arquivos independentes
+    "copy": (METHOD_KERNEL, METHOD_COPY),
+    "symlink": (METHOD_HARDLINK, METHOD_SYMLINK, METHOD_COPY),
+}
+DEFAULT_PLACEMENT = "auto"
+
+# níveis que só fazem sentido com origem e destino no mesmo sistema de arquivos
+_SAME_FS_ONLY = {METHOD_HARDLINK, METHOD_REFLINK}
+# níveis que não leem o conteúdo da origem (não abrem o arquivo)
+_NO_CONTENT = {METHOD_HARDLINK, METHOD_SYMLINK}
+
+_FICLONE = 0x40049409   # ioctl do Linux (linux/fs.h)
+
+# erros que indicam "este nível não funciona entre estes dois sistemas de arquivos"
+_UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.EPERM, errno.EOPNOTSUPP, errno.ENOTTY,
+                       errno.EINVAL, errno.ENOSYS}
+
+def _same_filesystem(src_dev: int, dest_dev: int) -> bool:
+    return src_dev == dest_dev
+
+@contextmanager
+def _source_fd(src: str, doc: Optional[DocumentHandle]) -> Iterator[int]:
+    """fd da origem: o do handle já aberto, ou o arquivo aberto só para esta operação."""
+    if doc is not None:
+        yield doc.fileno()
+        return
+    with open(src, "rb") as fs:
+        yield fs.fileno()
+
+def _copystat(src: str, dst: str, doc: Optional[DocumentHandle]):
+    """Datas e permissões da origem; com o handle, do stat da abertura (sem novo stat)."""
+    if doc is None:
+        shutil.copystat(src, dst)
+        return
+    st = doc.stat
+    os.utime(dst, ns=(st.st_atime_ns, st.st_mtime_ns))
+    os.chmod(dst, stat.S_IMODE(st.st_mode))
+
+@contextmanager
+def _new_copy(src: str, dst: str, doc: Optional[DocumentHandle]) -> Iterator[BinaryIO]:
+    """
+    O arquivo de destino, criado com O_EXCL (FileExistsError se o nome já existe,
+    sem tocar nele); ao sair é fechado e recebe datas/permissões da origem. Se
+    algo falha depois de criado, é removido: só o que esta chamada criou.
+    """
+    fd = open(dst, "xb")
+    try:
+        with fd:
+            yield fd
+        _copystat(src, dst, doc)
+    except BaseException:
+        _discard_partial(dst)
+        raise
+
+def _reflink(src: str, dst: str, doc: Optional[DocumentHandle] = None):
+    import fcntl   # só existe em POSIX; no Windows o nível é descartado
+    with _source_fd(src, doc) as sfd, _new_copy(src, dst, doc) as fd:
+        fcntl.ioctl(fd.fileno(), _FICLONE, sfd)
+
+def _kernel_copy(src: str, dst: str, doc: Optional[DocumentHandle] = None):
+    """copy_file_range (pode virar clone/cópia no servidor) com sendfile como reserva."""
+    copy_range = getattr(os, "copy_file_range", None)
+    sendfile = getattr(os, "sendfile", None)
+    if copy_range is None and sendfile is None:
+        raise OSError(errno.ENOSYS, "cópia no kernel indisponível")
+    with _source_fd(src, doc) as sfd, _new_copy(src, dst, doc) as fd:
+        remaining = doc.size if doc is not None else os.fstat(sfd).st_size
+        offset = 0
+        while remaining > 0:
+            chunk = min(remaining, 1 << 30)
+            if copy_range is not None:
+                try:
+                    n = copy_range(sfd, fd.fileno(), chunk, offset, offset)
+                except OSError as e:
+                    # kernels recentes recusam copy_file_range entre sistemas de arquivos
+                    if offset or sendfile is None or e.errno not in _UNSUPPORTED_ERRNOS:
+                        raise
+                    copy_range = None
+                    continue
+            else:
+                n = sendfile(fd.fileno(), sfd, offset, chunk)
+            if n == 0:
+                # origem encolheu (ou o kernel parou antes): _new_copy apaga o arquivo parcial
+                raise OSError(errno.EIO, f"cópia no kernel incompleta: faltam {remaining} bytes")
+            offset += n
+            remaining -= n
+
+def _buffer_copy(src: str, dst: str, doc: Optional[DocumentHandle] = None):
+    """Cópia em espaço de usuário: do buffer mapeado do handle, ou do arquivo aberto sem ele."""
+    if doc is None:
+        with open(src, "rb") as fs, _new_copy(src, dst, None) as fd:
+            shutil.copyfileobj(fs, fd, 1 << 20)
+        return
+    with _new_copy(src, dst, doc) as fd:
+        fd.write(doc.buffer)
+
+def _place(method: str, src: str, dst: str, doc: Optional[DocumentHandle] = None):
+    if method == METHOD_HARDLINK:
+        os.link(src, dst)
+    elif method == METHOD_REFLINK:
+        _reflink(src, dst, doc)
+    elif method == METHOD_KERNEL:
+        _kernel_copy(src, dst, doc)
+    elif method == METHOD_SYMLINK:
+        os.symlink(os.path.abspath(src), dst)
+    else:
+        _buffer_copy(src, dst, doc)
+
+def _discard_partial(dst: str):
+    try:
+        if os.path.lexists(dst):
+            os.remove(dst)
+    except OSError:
+        pass
+
+def _size_or(path: str, default: int) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return default
 
 def _ensure_dir(p: str):
     os.makedirs(p, exist_ok=True)
@@ -24,17 +164,28 @@ def _scan_dir_sizes(dest_dir: str) -> Dict[str, int]:
         pass
     return sizes
 
-def _resolve_conflict(dest_dir: str, fname: str, fsize: int, cache_sizes: Dict[str, int]) -> Tuple[str, str]:
+def _resolve_conflict(dest_dir: str, fname: str, fsize: int, cache_sizes: Dict[str, int],
+                      same_content: Optional[Callable[[str], bool]] = None) -> Tuple[str, str]:
+    """
+    Escolhe o nome final em ``dest_dir``: o próprio nome, ou nome-2, nome-3…
+    "skip_same" quando um desses já tem o mesmo tamanho e, se ``same_content``
+    for dado, o mesmo conteúdo (tamanho igual com conteúdo diferente vira -k).
+    """
     name, ext = os.path.splitext(fname)
     cand = os.path.join(dest_dir, fname)
 
+    def _same(existing_name: str, existing_size: int) -> bool:
+        if existing_size != fsize or fsize < 0:
+            return False
+        return same_content is None or same_content(existing_name)
+
     s = cache_sizes.get(fname)
     if s is None and os.path.exists(cand):
         s = os.path.getsize(cand)
         cache_sizes[fname] = s
 
     if s is not None:
-        if s == fsize and fsize >= 0:
+        if _same(fname, s):
             return "skip_same", cand
         k = 2
         while True:
@@ -46,108 +197,587 @@ def _resolve_conflict(dest_dir: str, fname: str, fsize: int, cache_sizes: Dict[s
                 cache_sizes[nf] = s2
             if s2 is None:
                 return "ok", cand
-            if s2 == fsize and fsize >= 0:
+            if _same(nf, s2):
                 return "skip_same", cand
             k += 1
     else:
         return "ok", cand
 
-def _hardlink_or_copy(src: str, dst: str):
-    try:
-        os.link(src, dst)  # hardlink
-    except Exception:
-        shutil.copy2(src, dst)
+class _Source:
+    """
+    A origem de um PDF nesta rodada: tamanho e dispositivo do stat da varredura
+    (FileEntry) ou, sem ele, da abertura; o handle (doc_handle) é aberto uma vez
+    e só quando algo precisa do conteúdo (hardlink/symlink não precisam).
+    """
+
+    __slots__ = ("path", "size", "dev", "_doc", "_opened")
+
+    def __init__(self, path: str, entry: Optional[FileEntry] = None):
+        self.path = path
+        self._doc: Optional[DocumentHandle] = None
+        self._opened = False
+        if entry is not None and entry.size >= 0:
+            self.size, self.dev = entry.size, entry.dev
+        else:
+            doc = self.doc()
+            self.size, self.dev = (doc.size, doc.stat.st_dev) if doc is not None else (-1, -1)
+
+    def doc(self) -> Optional[DocumentHandle]:
+        """O handle da origem, ou None se não abre (cada nível tenta pelo caminho e falha com o erro real)."""
+        if not self._opened:
+            self._opened = True
+            try:
+                self._doc = open_document(self.path)
+            except OSError:
+                self._doc = None
+        return self._doc
+
+    def close(self) -> None:
+        if self._doc is not None:
+            self._doc.close()
+            self._doc = None
 
 def _sanitize_folder(name: str) -> str:
     invalid = '<>:"/\\|?*'
     out = "".join("_" if ch in invalid else ch for ch in name).strip()
     return out or "_sem_nome_"
 
-def copy_plan(
-    plan: Dict[str, List[str]],
-    out_root: str,
-    max_workers: int = 2,
-    cancel_event: Optional[threading.Event] = None,
-) -> Dict[str, Dict[str, List[Tuple[str, str]]]]:
+# -------- concorrência adaptativa --------
+# ponto de partida por tipo de armazenamento do destino; o limite depois se ajusta
+INITIAL_WORKERS = {"network": 8, "ssd": 4, "hdd": 2, "unknown": 4}
+MAX_WORKERS = {"network": 32, "ssd": 16, "hdd": 4, "unknown": 16}
+ADJUST_WINDOW_S = 1.0    # janela mínima de medição antes de mexer no limite
+ADJUST_GAIN = 1.10       # o limite só sobe de novo se a vazão melhorar 10%
+HOLD_WINDOWS = 5         # janelas paradas depois de um recuo, antes de sondar outra vez
+
+class AdaptiveLimit:
     """
-    plan: { pdf_path: [ 'Colab A', 'Colab B', ... ] }
-    Retorna:
-      { pdf_path: { "created": [(collab, created_path), ...],
-                    "skipped": [(collab, reason), ...] } }
+    Quantas cópias podem rodar ao mesmo tempo. Sobe em degraus (x2) enquanto
+    a vazão (arquivos/s) melhora; volta ao melhor limite quando não melhora,
+    com uma pausa antes de sondar de novo. O pool tem ``cap`` threads; as
+    excedentes esperam em acquire().
     """
-    results: Dict[str, Dict[str, List[Tuple[str, str]]]] = {}
-    dest_cache: Dict[str, Dict[str, int]] = {}  # dest_dir -> {fname: size}
 
-    sanitized_by_name: Dict[str, str] = {}
-    used_sanitized: set[str] = set()
+    def __init__(self, initial: int, cap: int, adaptive: bool = True):
+        self.cap = max(1, cap)
+        self.limit = max(1, min(initial, self.cap))
+        self.adaptive = adaptive
+        self.history: List[Tuple[int, float]] = []   # (limite, arquivos/s) por janela
+        self._active = 0
+        self._cond = threading.Condition()
+        self._ops = 0
+        self._t0 = time.monotonic()
+        self._best: Optional[Tuple[int, float]] = None
+        self._hold = 0
 
-    def _alloc_folder(name: str) -> str:
-        if name in sanitized_by_name:
-            return sanitized_by_name[name]
+    def acquire(self) -> None:
+        with self._cond:
+            while self._active >= self.limit:
+                self._cond.wait()
+            self._active += 1
+
+    def release(self) -> None:
+        with self._cond:
+            self._active -= 1
+            self._ops += 1
+            if self.adaptive:
+                self._maybe_adjust()
+            self._cond.notify_all()
+
+    def _maybe_adjust(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._t0
+        if elapsed < ADJUST_WINDOW_S or self._ops < 4 * self.limit:
+            return
+        rate = self._ops / elapsed
+        self.history.append((self.limit, round(rate, 1)))
+        self._ops, self._t0 = 0, now
+        if self._hold:
+            self._hold -= 1
+            return
+        if self._best is None or rate > self._best[1] * ADJUST_GAIN:
+            # melhorou (ou primeira janela): guarda e sonda acima
+            self._best = (self.limit, rate)
+            if self.limit < self.cap:
+                self.limit = min(self.cap, self.limit * 2)
+        else:
+            # não compensou: volta ao melhor conhecido e espera antes de sondar
+            self.limit = self._best[0]
+            self._best = (self._best[0], rate)
+            self._hold = HOLD_WINDOWS
+
+def make_limit(out_root: str, max_workers: Optional[int] = None) -> AdaptiveLimit:
+    """max_workers=None: adaptativo pelo tipo de armazenamento; um número fixa o limite."""
+    if max_workers:
+        return AdaptiveLimit(max_workers, max_workers, adaptive=False)
+    kind = storage_kind(out_root)
+    return AdaptiveLimit(INITIAL_WORKERS[kind], MAX_WORKERS[kind])
+
+class _DestDir:
+    """Pasta de um colaborador: tamanhos conhecidos e o lock que protege a escolha de nomes."""
+
+    __slots__ = ("path", "dev", "sizes", "pending", "lock")
+
+    def __init__(self, path: str, index: Optional[DestIndex] = None):
+        _ensure_dir(path)
+        self.path = path
+        self.dev = os.stat(path).st_dev
+        # {fname: size}: do índice persistente (relista só se o mtime da pasta mudou)
+        self.sizes: Dict[str, int] = index.load_dir(path) if index else _scan_dir_sizes(path)
+        # {fname: origem}: nomes reservados cuja cópia ainda não terminou
+        self.pending: Dict[str, str] = {}
+        self.lock = threading.Lock()
+
+class _NeedDigest(Exception):
+    """Levantada sob o lock da pasta: falta o digest de ``name`` (calculado fora do lock)."""
+
+    def __init__(self, name: str, reserved_by: Optional[str]):
+        super().__init__(name)
+        self.name = name
+        self.reserved_by = reserved_by
+
+@dataclass
+class CopyEvent:
+    """Uma operação (PDF, colaborador) concluída – exatamente uma por par do plano."""
+    pdf_path: str
+    collaborator: str
+    status: str          # "created" ou "skipped"
+    detail: str          # caminho criado ou motivo do pulo
+    method: str = ""     # nível usado (hardlink, reflink, …) quando criado
+    nbytes: int = 0      # bytes colocados no destino
+
+    def as_result(self) -> Dict[str, object]:
+        """O mesmo formato de copy_plan, só com esta operação."""
+        if self.status == "created":
+            return {"created": [(self.collaborator, self.detail)], "skipped": [],
+                    "methods": {self.detail: self.method}}
+        return {"created": [], "skipped": [(self.collaborator, self.detail)], "methods": {}}
+
+def result_events(pdf_path: str, res: Dict[str, object]) -> List[CopyEvent]:
+    """Converte um resultado no formato de copy_plan (ex.: do diário) em eventos."""
+    methods = res.get("methods", {}) or {}
+    events = [CopyEvent(pdf_path, c, "created", path, methods.get(path, ""))
+              for c, path in res.get("created", [])]
+    events += [CopyEvent(pdf_path, c, "skipped", reason) for c, reason in res.get("skipped", [])]
+    return events
+
+class _CopyState:
+    """
+    Estado compartilhado por uma rodada de cópias (pastas alocadas, tamanhos já vistos).
+    Thread-safe: cada pasta é criada uma vez (prepare) e o nome final dentro dela
+    é escolhido sob o lock da pasta, reservado antes da cópia começar.
+    """
+
+    def __init__(self, out_root: str, cancel_event: Optional[threading.Event] = None,
+                 metrics: Optional["RunMetrics"] = None, placement: str = DEFAULT_PLACEMENT,
+                 use_index: bool = True):
+        self.out_root = out_root
+        self.cancel_event = cancel_event
+        self.metrics = metrics
+        self.index: Optional[DestIndex] = None
+        if use_index:
+            os.makedirs(out_root, exist_ok=True)
+            self.index = DestIndex(out_root)
+        self._src_digests: Dict[str, Optional[str]] = {}
+        self.tiers = PLACEMENT_MODES.get(placement, PLACEMENT_MODES[DEFAULT_PLACEMENT])
+        self.unsupported: set[Tuple[str, int, int]] = set()   # (nível, dev origem, dev destino)
+        self.dests: Dict[str, _DestDir] = {}                  # colaborador -> pasta preparada
+        self.sanitized_by_name: Dict[str, str] = {}
+        self.used_sanitized: set[str] = set()
+        self._lock = threading.Lock()
+
+    def alloc_folder(self, name: str) -> str:
+        with self._lock:
+            return self._alloc_folder(name)
+
+    def _alloc_folder(self, name: str) -> str:
+        if name in self.sanitized_by_name:
+            return self.sanitized_by_name[name]
         base = _sanitize_folder(name)
         cand = base
         suffix = 2
         key = cand.casefold()
-        while key in used_sanitized:
+        while key in self.used_sanitized:
             cand = f"{base}_{suffix}"
             suffix += 1
             key = cand.casefold()
-        sanitized_by_name[name] = cand
-        used_sanitized.add(key)
+        self.sanitized_by_name[name] = cand
+        self.used_sanitized.add(key)
         return cand
 
-    for collabs in plan.values():
-        for collab in collabs:
-            _alloc_folder(collab)
+    def prepare(self, collabs: Iterable[str]) -> None:
+        """Aloca e cria as pastas (uma vez por colaborador, na ordem dada)."""
+        with self._lock:
+            for collab in collabs:
+                if collab not in self.dests:
+                    folder = self._alloc_folder(collab)
+                    self.dests[collab] = _DestDir(os.path.join(self.out_root, folder), self.index)
 
-    def _should_cancel() -> bool:
-        return bool(cancel_event and cancel_event.is_set())
+    def should_cancel(self) -> bool:
+        return bool(self.cancel_event and self.cancel_event.is_set())
 
-    def task_for_pdf(pdf_path: str, collabs: List[str]):
-        created, skipped = [], []
+    def source_digest(self, pdf_path: str, doc: Optional[DocumentHandle] = None) -> Optional[str]:
+        """Digest da origem, calculado uma vez por execução e só se houver colisão."""
+        if pdf_path not in self._src_digests:
+            try:
+                self._src_digests[pdf_path] = doc.digest() if doc is not None else file_digest(pdf_path)
+            except OSError:
+                self._src_digests[pdf_path] = None
+        return self._src_digests[pdf_path]
+
+    def _same_content(self, source: _Source, dest: _DestDir, known: Dict[str, Optional[str]],
+                      existing: str) -> bool:
+        """
+        Mesmo conteúdo que ``existing`` em ``dest``? Roda sob ``dest.lock``: só
+        compara com digests já em ``known``; se falta um, _NeedDigest.
+        """
+        if existing not in known:
+            raise _NeedDigest(existing, dest.pending.get(existing))
+        src = self.source_digest(source.path, source.doc())
+        return src is not None and src == known[existing]
+
+    def _existing_digest(self, dest: _DestDir, name: str, reserved_by: Optional[str]) -> Optional[str]:
+        """Digest de ``name`` em ``dest``, fora do lock da pasta."""
+        if reserved_by is not None:
+            # cópia de outra thread ainda em andamento: o arquivo está incompleto, vale a origem dela
+            d = self._src_digests.get(reserved_by)
+            if d is not None:
+                return d
+            try:
+                return file_digest(reserved_by)
+            except OSError:
+                return None
+        return self.index.digest(dest.path, name)
+
+    def close(self) -> None:
+        if self.index is not None:
+            if self.metrics:
+                self.metrics.set("dest_dirs_rescanned", self.index.rescanned)
+                self.metrics.set("dest_dirs_from_index", self.index.reused)
+            self.index.close()
+            self.index = None
+
+    def place_file(self, source: _Source, dest: _DestDir, dst: str) -> str:
+        """
+        Tenta cada nível do modo escolhido; retorna o método que funcionou.
+        Os níveis que copiam conteúdo reaproveitam o fd/buffer do handle da origem.
+        Todos criam ``dst`` de forma exclusiva (link, symlink, O_EXCL): se o nome
+        já existe, FileExistsError sobe sem tentar outro nível nem apagar nada.
+        """
+        src, src_dev = source.path, source.dev
+        same_fs = _same_filesystem(src_dev, dest.dev)
+        for method in self.tiers:
+            if method == METHOD_COPY:
+                break
+            if method in _SAME_FS_ONLY and not same_fs:
+                continue
+            key = (method, src_dev, dest.dev)
+            if key in self.unsupported:
+                continue
+            try:
+                _place(method, src, dst, None if method in _NO_CONTENT else source.doc())
+                return method
+            except FileExistsError:
+                raise
+            except (OSError, ImportError) as e:
+                # sem suporte neste par de sistemas de arquivos: não tenta de novo
+                if isinstance(e, ImportError) or getattr(e, "errno", None) in _UNSUPPORTED_ERRNOS:
+                    self.unsupported.add(key)
+        _buffer_copy(src, dst, source.doc())
+        return METHOD_COPY
+
+    def copy_pdf(self, pdf_path: str, collabs: List[str],
+                 on_event: Optional[Callable[[CopyEvent], None]] = None,
+                 entry: Optional[FileEntry] = None):
+        """
+        Um PDF para todos os seus colaboradores com a origem aberta no máximo uma
+        vez (doc_handle): digest e todas as cópias usam o mesmo handle.
+        entry: o stat da varredura (fs_scan); sem ele, tamanho/dispositivo vêm da abertura.
+        """
+        source = _Source(pdf_path, entry)
         try:
-            fsize = os.path.getsize(pdf_path)
-        except OSError:
-            fsize = -1
+            return self._copy_pdf(source, collabs, on_event)
+        finally:
+            source.close()
+
+    def _copy_pdf(self, source: _Source, collabs: List[str],
+                  on_event: Optional[Callable[[CopyEvent], None]]):
+        pdf_path = source.path
+        created, skipped = [], []
+        methods: Dict[str, str] = {}
+
+        def _skip(collab: str, reason: str):
+            skipped.append((collab, reason))
+            if on_event:
+                on_event(CopyEvent(pdf_path, collab, "skipped", reason))
+
+        fsize = source.size
         fname = os.path.basename(pdf_path)
 
-        if _should_cancel():
-            skipped.extend((collab, "cancelled") for collab in collabs)
-            return (pdf_path, {"created": created, "skipped": skipped})
+        if self.should_cancel():
+            for collab in collabs:
+                _skip(collab, "cancelled")
+            return (pdf_path, {"created": created, "skipped": skipped, "methods": methods})
 
         for idx, collab in enumerate(collabs):   # sequência por PDF
-            if _should_cancel():
-                skipped.extend((c, "cancelled") for c in collabs[idx:])
+            if self.should_cancel():
+                for c in collabs[idx:]:
+                    _skip(c, "cancelled")
                 break
 
-            dest_dir = os.path.join(out_root, sanitized_by_name[collab])
-            _ensure_dir(dest_dir)
+            dest = self.dests.get(collab)
+            if dest is None:
+                self.prepare([collab])
+                dest = self.dests[collab]
 
-            if dest_dir not in dest_cache:
-                dest_cache[dest_dir] = _scan_dir_sizes(dest_dir)
-            cache_sizes = dest_cache[dest_dir]
-
-            status, final_path = _resolve_conflict(dest_dir, fname, fsize, cache_sizes)
+            compare = self.index is not None
+            t0, c0 = time.perf_counter(), time.thread_time()
+            if compare and fsize >= 0 and (fname in dest.sizes or os.path.exists(os.path.join(dest.path, fname))):
+                # nome já ocupado: o digest da origem sai antes de travar a pasta
+                self.source_digest(pdf_path, source.doc())
+            known: Dict[str, Optional[str]] = {}   # digests dos nomes já comparados
+            while True:
+                need = None
+                with dest.lock:
+                    try:
+                        status, final_path = _resolve_conflict(
+                            dest.path, fname, fsize, dest.sizes,
+                            partial(self._same_content, source, dest, known) if compare else None)
+                    except _NeedDigest as e:
+                        need = e
+                    else:
+                        final_name = os.path.basename(final_path)
+                        if status == "ok":
+                            dest.sizes[final_name] = fsize   # reserva o nome antes de copiar
+                            dest.pending[final_name] = pdf_path
+                if need is None:
+                    break
+                # hash fora do lock e nova resolução (a pasta pode ter mudado enquanto isso)
+                known[need.name] = self._existing_digest(dest, need.name, need.reserved_by)
+            t1, c1 = time.perf_counter(), time.thread_time()
+            if self.metrics:
+                self.metrics.add("conflict_resolution", t1 - t0, c1 - c0)
             if status == "skip_same":
-                skipped.append((collab, "same name & size"))
+                _skip(collab, "same content" if compare else "same name & size")
+                if self.metrics:
+                    self.metrics.count("skip_same")
                 continue
 
             try:
-                if _same_drive(pdf_path, dest_dir):
-                    _hardlink_or_copy(pdf_path, final_path)
-                else:
-                    shutil.copy2(pdf_path, final_path)
+                method = self.place_file(source, dest, final_path)
                 created.append((collab, final_path))
-                cache_sizes[os.path.basename(final_path)] = fsize
+                methods[final_path] = method
+                if self.index is not None:
+                    self.index.record(dest.path, final_name, pdf_path, self._src_digests.get(pdf_path))
+                with dest.lock:
+                    dest.pending.pop(final_name, None)
+                if on_event:
+                    on_event(CopyEvent(pdf_path, collab, "created", final_path, method, max(fsize, 0)))
+            except FileExistsError:
+                # outro processo criou o nome entre a resolução e a cópia: fica o dele
+                method = "exists"
+                with dest.lock:
+                    dest.sizes[final_name] = _size_or(final_path, fsize)
+                    dest.pending.pop(final_name, None)
+                _skip(collab, "already present")
             except Exception as e:
-                skipped.append((collab, f"copy_failed: {e}"))
+                method = "failed"
+                with dest.lock:
+                    dest.sizes.pop(final_name, None)   # libera a reserva
+                    dest.pending.pop(final_name, None)
+                _skip(collab, f"copy_failed: {e}")
+            if self.metrics:
+                self.metrics.add("link_copy", time.perf_counter() - t1, time.thread_time() - c1)
+                self.metrics.count(f"copy_{method}")
+
+        self._src_digests.pop(pdf_path, None)
+        return (pdf_path, {"created": created, "skipped": skipped, "methods": methods})
+
+    def copy_pdf_limited(self, limit: AdaptiveLimit, pdf_path: str, collabs: List[str],
+                         on_event: Optional[Callable[[CopyEvent], None]] = None,
+                         entry: Optional[FileEntry] = None):
+        limit.acquire()
+        try:
+            return self.copy_pdf(pdf_path, collabs, on_event, entry)
+        finally:
+            limit.release()
+
+    def record_limit(self, limit: AdaptiveLimit) -> None:
+        if self.metrics:
+            self.metrics.set("copy_workers_final", limit.limit)
+            self.metrics.set("copy_workers_max", max([limit.limit] + [n for n, _ in limit.history]))
 
-        return (pdf_path, {"created": created, "skipped": skipped})
+_PDF_DONE = object()
 
-    with ThreadPoolExecutor(max_workers=max_workers) as ex:
-        futs = [ex.submit(task_for_pdf, p, cols) for p, cols in plan.items()]
-        for fut in as_completed(futs):
-            pdf, res = fut.result()
-            results[pdf] = res
+def iter_copy_events(
+    plan: Dict[str, List[str]],
+    out_root: str,
+    max_workers: Optional[int] = None,
+    cancel_event: Optional[threading.Event] = None,
+    metrics: Optional["RunMetrics"] = None,
+    placement: str = DEFAULT_PLACEMENT,
+    window: Optional[int] = None,
+    entries: Optional[Dict[str, FileEntry]] = None,
+) -> Iterator[CopyEvent]:
+    """
+    Executa o plano e gera um CopyEvent por operação, na thread chamadora,
+    à medida que as cópias terminam. No máximo ``window`` PDFs ficam em voo,
+    então a memória não cresce com o tamanho do plano.
+    entries: {pdf_path: FileEntry} da varredura (fs_scan), para não restatar a origem.
+    """
+    entries = entries or {}
+    state = _CopyState(out_root, cancel_event, metrics, placement)
+    state.prepare(c for collabs in plan.values() for c in collabs)
+    limit = make_limit(out_root, max_workers)
+    events: "queue.SimpleQueue" = queue.SimpleQueue()
+    window = window or limit.cap * 8
 
+    def _task(pdf_path: str, collabs: List[str]):
+        try:
+            state.copy_pdf_limited(limit, pdf_path, collabs, events.put, entries.get(pdf_path))
+        except Exception as e:   # uma falha inesperada não pode travar o consumidor
+            for c in collabs:
+                events.put(CopyEvent(pdf_path, c, "skipped", f"copy_failed: {e}"))
+        finally:
+            events.put(_PDF_DONE)
+
+    items = iter(plan.items())
+    in_flight = 0
+    try:
+        with ThreadPoolExecutor(max_workers=limit.cap) as ex:
+            try:
+                while True:
+                    while in_flight < window:
+                        item = next(items, None)
+                        if item is None:
+                            break
+                        ex.submit(_task, item[0], list(item[1]))
+                        in_flight += 1
+                    if in_flight == 0:
+                        break
+                    ev = events.get()
+                    if ev is _PDF_DONE:
+                        in_flight -= 1
+                    else:
+                        yield ev
+            finally:
+                state.record_limit(limit)
+    finally:
+        state.close()   # depois do pool: nenhuma thread usa mais o índice
+
+def copy_plan(
+    plan: Dict[str, List[str]],
+    out_root: str,
+    max_workers: Optional[int] = None,
+    cancel_event: Optional[threading.Event] = None,
+    on_result: Optional[Callable[[str, Dict[str, List[Tuple[str, str]]]], None]] = None,
+    metrics: Optional["RunMetrics"] = None,
+    placement: str = DEFAULT_PLACEMENT,
+    on_event: Optional[Callable[[CopyEvent], None]] = None,
+    entries: Optional[Dict[str, FileEntry]] = None,
+) -> Dict[str, Dict[str, List[Tuple[str, str]]]]:
+    """
+    plan: { pdf_path: [ 'Colab A', 'Colab B', ... ] }
+    max_workers: None = concorrência adaptativa (ver make_limit); um número fixa o total.
+    on_event(ev): chamado (na thread chamadora) a cada operação concluída.
+    on_result(pdf_path, res): chamado (na thread chamadora) assim que cada PDF termina.
+    placement: chave de PLACEMENT_MODES (níveis hardlink → reflink → cópia no kernel → copy2).
+    entries: {pdf_path: FileEntry} da varredura (fs_scan); a origem não é restatada.
+    Retorna:
+      { pdf_path: { "created": [(collab, created_path), ...],
+                    "skipped": [(collab, reason), ...],
+                    "methods": {created_path: método} } }
+    Para planos enormes, prefira iter_copy_events (não acumula resultados).
+    """
+    results: Dict[str, Dict[str, List[Tuple[str, str]]]] = {}
+    remaining = {p: len(cols) for p, cols in plan.items()}
+    for ev in iter_copy_events(plan, out_root, max_workers, cancel_event, metrics, placement, entries=entries):
+        if on_event:
+            on_event(ev)
+        res = results.setdefault(ev.pdf_path, {"created": [], "skipped": [], "methods": {}})
+        if ev.status == "created":
+            res["created"].append((ev.collaborator, ev.detail))
+            res["methods"][ev.detail] = ev.method
+        else:
+            res["skipped"].append((ev.collaborator, ev.detail))
+        remaining[ev.pdf_path] -= 1
+        if remaining[ev.pdf_path] == 0 and on_result:
+            on_result(ev.pdf_path, res)
     return results
+
+class CopyPipeline:
+    """
+    Cópias em fluxo: cada PDF casado na Fase 1 entra numa fila limitada
+    servida por um pool de threads com concorrência adaptativa (ou fixa em
+    ``max_workers``), enquanto a leitura continua.
+
+    submit() bloqueia quando a fila enche (back-pressure); close() espera as
+    cópias pendentes. O pipeline não guarda resultados: on_result(pdf_path, res)
+    e on_event(ev) são chamados das threads de cópia, uma chamada por vez.
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        out_root: str,
+        max_workers: Optional[int] = None,
+        cancel_event: Optional[threading.Event] = None,
+        wait_if_paused: Optional[Callable[[], None]] = None,
+        on_result: Optional[Callable[[str, Dict[str, List[Tuple[str, str]]]], None]] = None,
+        queue_size: Optional[int] = None,
+        metrics: Optional["RunMetrics"] = None,
+        placement: str = DEFAULT_PLACEMENT,
+        on_event: Optional[Callable[[CopyEvent], None]] = None,
+    ):
+        self._state = _CopyState(out_root, cancel_event, metrics, placement)
+        self._limit = make_limit(out_root, max_workers)
+        self._wait_if_paused = wait_if_paused
+        self._on_result = on_result
+        self._on_event = on_event
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size or self._limit.cap * 8)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._threads = [threading.Thread(target=self._run, daemon=True) for _ in range(self._limit.cap)]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, pdf_path: str, collabs: List[str], entry: Optional[FileEntry] = None) -> None:
+        """entry: o stat da varredura (fs_scan), repassado para a cópia não restatar."""
+        # pastas criadas na ordem de submissão: mesmo mapeamento de copy_plan
+        self._state.prepare(collabs)
+        self._queue.put((pdf_path, list(collabs), entry))
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                return
+            if self._wait_if_paused and not self._state.should_cancel():
+                self._wait_if_paused()
+            try:
+                pdf, res = self._state.copy_pdf_limited(self._limit, item[0], item[1], self._emit, item[2])
+            except Exception as e:   # não deixa a thread morrer com a fila cheia
+                pdf, res = item[0], {"created": [], "skipped": [(c, f"copy_failed: {e}") for c in item[1]]}
+                for c in item[1]:
+                    self._emit(CopyEvent(pdf, c, "skipped", f"copy_failed: {e}"))
+            if self._on_result:
+                with self._lock:
+                    self._on_result(pdf, res)
+
+    def _emit(self, ev: CopyEvent) -> None:
+        if self._on_event:
+            with self._lock:
+                self._on_event(ev)
+
+    def close(self) -> None:
+        """Espera as cópias pendentes; chamadas repetidas não fazem nada."""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._threads:
+            self._queue.put(self._STOP)
+        for t in self._threads:
+            t.join()
+        self._state.record_limit(self._limit)
+        self._state.close()
@@ -0,0 +1,165 @@
+# dest_index.py
+# Índice persistente da pasta destino: o que já existe em cada pasta de colaborador
+# (nome, tamanho, mtime, digest do conteúdo, origem). Pastas cujo mtime não mudou
+# não são relistadas, e "mesmo arquivo" é decidido pelo conteúdo, não só pelo tamanho.
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Set, Tuple
+
+INDEX_NAME = ".distcolab_destindex.sqlite"
+
+# commits em lote (mesma política do cache de leitura)
+COMMIT_EVERY = 500
+COMMIT_INTERVAL_S = 5.0
+
+_DIGEST_CHUNK = 1 << 20
+
+
+def index_path(out_root: str) -> str:
+    return os.path.join(out_root, INDEX_NAME)
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 do conteúdo inteiro (só calculado quando nome e tamanho coincidem)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_DIGEST_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class DestIndex:
+    """
+    Tabelas ``dirs`` (pasta -> mtime_ns da última listagem) e ``files``
+    (pasta, nome -> tamanho, mtime_ns, digest, origem) em SQLite (WAL).
+    Thread-safe; os digests são calculados sob demanda e guardados.
+    """
+
+    def __init__(self, out_root: str):
+        self.path = index_path(out_root)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS dirs (dir TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files (dir TEXT NOT NULL, name TEXT NOT NULL, size INTEGER NOT NULL, "
+            "mtime_ns INTEGER NOT NULL, digest TEXT, source TEXT, PRIMARY KEY (dir, name))"
+        )
+        self._conn.commit()
+        self._pending = 0
+        self._last_commit = time.monotonic()
+        self._dirty: Set[str] = set()   # pastas alteradas por nós nesta execução
+        self.rescanned = 0
+        self.reused = 0
+
+    # ---- leitura ----
+    def load_dir(self, dir_path: str) -> Dict[str, int]:
+        """
+        {nome: tamanho} da pasta. Se o mtime da pasta é o mesmo da última
+        listagem, vem do índice; senão a pasta é relistada (digests de arquivos
+        com tamanho e mtime inalterados são preservados).
+        """
+        try:
+            dir_mtime = os.stat(dir_path).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        with self._lock:
+            row = self._conn.execute("SELECT mtime_ns FROM dirs WHERE dir = ?", (dir_path,)).fetchone()
+            if row is not None and row[0] == dir_mtime:
+                self.reused += 1
+                return {n: s for n, s in self._conn.execute(
+                    "SELECT name, size FROM files WHERE dir = ?", (dir_path,))}
+            known = {n: (s, m, d, src) for n, s, m, d, src in self._conn.execute(
+                "SELECT name, size, mtime_ns, digest, source FROM files WHERE dir = ?", (dir_path,))}
+
+        listing: Dict[str, Tuple[int, int]] = {}
+        with os.scandir(dir_path) as it:
+            for e in it:
+                if e.is_file():
+                    st = e.stat()
+                    listing[e.name] = (st.st_size, st.st_mtime_ns)
+
+        rows = []
+        for name, (size, mtime) in listing.items():
+            old = known.get(name)
+            same = old is not None and old[0] == size and old[1] == mtime
+            rows.append((dir_path, name, size, mtime, old[2] if same else None, old[3] if same else None))
+        with self._lock:
+            self.rescanned += 1
+            self._conn.execute("DELETE FROM files WHERE dir = ?", (dir_path,))
+            self._conn.executemany(
+                "INSERT INTO files (dir, name, size, mtime_ns, digest, source) VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._conn.execute("INSERT OR REPLACE INTO dirs (dir, mtime_ns) VALUES (?, ?)", (dir_path, dir_mtime))
+            self._maybe_commit_locked(len(rows) + 1)
+        return {n: s for n, (s, _m) in listing.items()}
+
+    def digest(self, dir_path: str, name: str) -> Optional[str]:
+        """
+        Digest do arquivo já no destino. Reaproveita o guardado se tamanho e
+        mtime do arquivo não mudaram (sobrescrever não altera o mtime da pasta).
+        """
+        full = os.path.join(dir_path, name)
+        try:
+            st = os.stat(full)
+        except OSError:
+            return None
+        with self._lock:
+            row = self._conn.execute("SELECT digest, size, mtime_ns FROM files WHERE dir = ? AND name = ?",
+                                     (dir_path, name)).fetchone()
+        if row and row[0] and row[1] == st.st_size and row[2] == st.st_mtime_ns:
+            return row[0]
+        try:
+            d = file_digest(full)
+        except OSError:
+            return None
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO files (dir, name, size, mtime_ns, digest) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(dir, name) DO UPDATE SET size = excluded.size, mtime_ns = excluded.mtime_ns, "
+                "digest = excluded.digest",
+                (dir_path, name, st.st_size, st.st_mtime_ns, d))
+            self._maybe_commit_locked(1)
+        return d
+
+    # ---- escrita ----
+    def record(self, dir_path: str, name: str, source: str, digest: Optional[str] = None) -> None:
+        """Arquivo recém-colocado por nós (o mtime da pasta é atualizado no close)."""
+        try:
+            st = os.stat(os.path.join(dir_path, name))
+        except OSError:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (dir, name, size, mtime_ns, digest, source) VALUES (?, ?, ?, ?, ?, ?)",
+                (dir_path, name, st.st_size, st.st_mtime_ns, digest, source))
+            self._dirty.add(dir_path)
+            self._maybe_commit_locked(1)
+
+    def _maybe_commit_locked(self, n: int) -> None:
+        self._pending += n
+        if self._pending >= COMMIT_EVERY or time.monotonic() - self._last_commit >= COMMIT_INTERVAL_S:
+            self._conn.commit()
+            self._pending = 0
+            self._last_commit = time.monotonic()
+
+    def close(self) -> None:
+        """
+        Grava o mtime atual das pastas que alteramos e fecha. Se a execução cair
+        antes disso, o mtime gravado fica velho e a pasta é relistada na próxima.
+        """
+        with self._lock:
+            try:
+                for d in self._dirty:
+                    try:
+                        self._conn.execute("INSERT OR REPLACE INTO dirs (dir, mtime_ns) VALUES (?, ?)",
+                                           (d, os.stat(d).st_mtime_ns))
+                    except OSError:
+                        self._conn.execute("DELETE FROM dirs WHERE dir = ?", (d,))
+                self._dirty.clear()
+                self._conn.commit()
+            finally:
+                self._conn.close()
@@ -0,0 +1,319 @@
+# doc_handle.py
+# Um PDF aberto uma única vez: um fstat, o arquivo mapeado só leitura (mmap) e
+# leitores independentes sobre o mesmo mapeamento. Extratores, hashes e cópia usam
+# o mesmo handle em vez de reabrir/restatar o arquivo. Hashes e cópia leem o
+# buffer sem copiar; o read() dos leitores devolve bytes (cópia só do trecho
+# pedido, como num arquivo comum).
+# Em armazenamento de rede (SMB/NFS) o arquivo não é mapeado: se outro cliente o
+# trunca, o acesso ao mapeamento derruba o processo (SIGBUS). Lá os leitores fazem
+# leituras posicionais no arquivo aberto, e o conteúdo inteiro só é lido quando
+# alguém pede ``buffer`` (hash completo, cópia).
+import hashlib
+import io
+import mmap
+import os
+import threading
+from typing import Any, BinaryIO, Dict, List, Optional, Union
+
+# início/fim do arquivo usados no hash rápido (cabeçalho e trailer/xref)
+QUICK_HASH_SPAN = 64 * 1024
+
+
+# sistemas de arquivos de rede (tipo em /proc/self/mounts)
+NETWORK_FS = {"nfs", "nfs4", "cifs", "smb3", "smbfs", "fuse.sshfs", "9p", "afs", "glusterfs", "ceph", "lustre"}
+
+_network_devs: Dict[int, bool] = {}   # st_dev -> está na rede? (um teste por montagem)
+
+
+def _linux_fstype(path: str) -> Optional[str]:
+    """Tipo do sistema de arquivos do ponto de montagem mais longo que contém ``path``."""
+    best, fstype = "", None
+    try:
+        with open("/proc/self/mounts", "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) < 3:
+                    continue
+                mnt = parts[1].replace("\\040", " ")
+                if (path == mnt or path.startswith(mnt.rstrip("/") + "/")) and len(mnt) >= len(best):
+                    best, fstype = mnt, parts[2]
+    except OSError:
+        return None
+    return fstype
+
+
+def storage_kind(path: str) -> str:
+    """'network', 'ssd', 'hdd' ou 'unknown' para a pasta ``path`` (melhor esforço)."""
+    p = os.path.abspath(path)
+    if os.name == "nt":
+        if p.startswith("\\\\"):
+            return "network"
+        try:
+            import ctypes
+            if ctypes.windll.kernel32.GetDriveTypeW(os.path.splitdrive(p)[0] + "\\") == 4:   # DRIVE_REMOTE
+                return "network"
+        except Exception:
+            pass
+        return "unknown"
+    if (_linux_fstype(p) or "") in NETWORK_FS:
+        return "network"
+    try:
+        dev = os.stat(p).st_dev
+        base = f"/sys/dev/block/{os.major(dev)}:{os.minor(dev)}"
+        for cand in (os.path.join(base, "queue", "rotational"), os.path.join(base, "..", "queue", "rotational")):
+            if os.path.exists(cand):
+                with open(cand, "r") as f:
+                    return "hdd" if f.read().strip() == "1" else "ssd"
+    except (OSError, AttributeError, ValueError):
+        pass
+    return "unknown"
+
+
+def _on_network(path: str, dev: int) -> bool:
+    hit = _network_devs.get(dev)
+    if hit is None:
+        hit = _network_devs[dev] = storage_kind(os.path.dirname(os.path.abspath(path))) == "network"
+    return hit
+
+
+def quick_hash_parts(size: int, head, tail) -> str:
+    """SHA-1 de tamanho + primeiros bytes + últimos bytes (``tail`` vazio se o arquivo é pequeno)."""
+    h = hashlib.sha1()
+    h.update(str(size).encode())
+    h.update(head)
+    h.update(tail)
+    return h.hexdigest()
+
+
+class BufferReader(io.RawIOBase):
+    """
+    Arquivo só leitura sobre um buffer compartilhado (mmap ou bytes), com posição
+    própria. read() copia só o trecho pedido; readinto() copia direto no destino.
+    """
+
+    def __init__(self, buf):
+        super().__init__()
+        self._raw = buf            # mmap/bytes: find() sem copiar
+        self._buf = memoryview(buf)
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._buf)
+        if offset < 0:
+            raise ValueError("posição negativa")
+        self._pos = offset
+        return offset
+
+    def _span(self, size: Optional[int]):
+        start = min(self._pos, len(self._buf))
+        end = len(self._buf) if size is None or size < 0 else min(start + size, len(self._buf))
+        return start, end
+
+    def read(self, size: int = -1) -> bytes:
+        start, end = self._span(size)
+        self._pos = end
+        return bytes(self._buf[start:end])
+
+    def readall(self) -> bytes:
+        return self.read()
+
+    def readinto(self, b) -> int:
+        start, end = self._span(len(b))
+        memoryview(b).cast("B")[:end - start] = self._buf[start:end]
+        self._pos = end
+        return end - start
+
+    def readline(self, size: int = -1) -> bytes:
+        start, limit = self._span(size)
+        i = self._raw.find(b"\n", start, limit)
+        end = limit if i < 0 else i + 1
+        self._pos = end
+        return bytes(self._buf[start:end])
+
+    def close(self) -> None:
+        if not self.closed:
+            self._buf.release()
+            self._raw = None
+        super().close()
+
+
+class FileReader(io.RawIOBase):
+    """Leitor com posição própria sobre o arquivo aberto do handle (leituras posicionais, sem mapear)."""
+
+    def __init__(self, handle: "DocumentHandle"):
+        super().__init__()
+        self._handle = handle
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self._handle.size
+        if offset < 0:
+            raise ValueError("posição negativa")
+        self._pos = offset
+        return offset
+
+    def readinto(self, b) -> int:
+        data = self._handle.pread(len(b), self._pos)
+        n = len(data)
+        memoryview(b).cast("B")[:n] = data
+        self._pos += n
+        return n
+
+
+class DocumentHandle:
+    """
+    ``stat``: o fstat feito na abertura; ``buffer``: memoryview do arquivo inteiro
+    (o mapeamento; na rede, lido uma vez quando pedido). ``mapped``: se há mmap.
+    Use como context manager; ``reader()`` dá um arquivo (read/seek/tell) com posição própria.
+    """
+
+    def __init__(self, path: str, mapped: Optional[bool] = None):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self.stat = os.fstat(self._file.fileno())
+            if mapped is None:
+                mapped = not _on_network(path, self.stat.st_dev)
+            self._raw: Any = None   # sem mapear: conteúdo lido só quando ``buffer`` é pedido
+            if mapped:
+                # arquivo vazio não pode ser mapeado
+                self._raw = (mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                             if self.stat.st_size > 0 else b"")
+        except Exception:
+            self._file.close()
+            raise
+        self.mapped = mapped
+        self._view: Optional[memoryview] = memoryview(self._raw) if self._raw is not None else None
+        self._readers: List[io.RawIOBase] = []
+        self._lock = threading.Lock()
+        self._digest: Optional[str] = None
+
+    @property
+    def size(self) -> int:
+        return self.stat.st_size
+
+    @property
+    def buffer(self) -> memoryview:
+        if self._view is None:
+            self._raw = self.pread(self.size, 0)
+            self._view = memoryview(self._raw)
+        return self._view
+
+    def fileno(self) -> int:
+        return self._file.fileno()
+
+    def pread(self, n: int, offset: int) -> bytes:
+        """Até ``n`` bytes a partir de ``offset`` no arquivo aberto, sem mexer na posição dos leitores."""
+        if self._view is not None:
+            return bytes(self._view[offset:offset + n])
+        if hasattr(os, "pread"):
+            chunks = []
+            while n > 0:
+                data = os.pread(self._file.fileno(), n, offset)
+                if not data:
+                    break
+                chunks.append(data)
+                n -= len(data)
+                offset += len(data)
+            return b"".join(chunks)
+        with self._lock:   # Windows: seek + read no arquivo compartilhado
+            self._file.seek(offset)
+            return self._file.read(n)
+
+    def reader(self) -> BinaryIO:
+        if self._view is not None:
+            r: io.RawIOBase = BufferReader(self._raw)
+            self._readers.append(r)
+            return r
+        raw = FileReader(self)
+        self._readers.append(raw)
+        return io.BufferedReader(raw, 64 * 1024)
+
+    def head(self, n: int) -> bytes:
+        return self.pread(n, 0)
+
+    def tail(self, n: int) -> bytes:
+        """Últimos ``n`` bytes que não estão em head(n) (vazio se o arquivo é pequeno)."""
+        if self.size <= n:
+            return b""
+        start = max(n, self.size - n)
+        return self.pread(self.size - start, start)
+
+    def quick_hash(self) -> str:
+        """O mesmo valor de cache_db.quick_file_hash, sem reabrir o arquivo."""
+        span = QUICK_HASH_SPAN
+        if self._view is None:
+            return quick_hash_parts(self.size, self.head(span), self.tail(span))
+        return quick_hash_parts(self.size, self._view[:span],
+                                self._view[max(span, self.size - span):] if self.size > span else b"")
+
+    def digest(self) -> str:
+        """SHA-256 do conteúdo inteiro (o mesmo de dest_index.file_digest), calculado uma vez."""
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.buffer).hexdigest()
+        return self._digest
+
+    def identity(self) -> Dict[str, Any]:
+        """Campos de identidade do arquivo para a entrada do cache (cache_db.update_cache_entry)."""
+        st = self.stat
+        return {"mtime": st.st_mtime, "mtime_ns": st.st_mtime_ns, "size": st.st_size,
+                "ino": st.st_ino, "dev": st.st_dev}
+
+    def close(self) -> None:
+        for r in self._readers:
+            r.close()
+        self._readers.clear()
+        try:
+            if self._view is not None:
+                self._view.release()
+            if isinstance(self._raw, mmap.mmap):
+                self._raw.close()
+        except BufferError:
+            pass   # alguma biblioteca ainda segura uma view; o GC fecha depois
+        self._file.close()
+
+    def __enter__(self) -> "DocumentHandle":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def open_document(path: str, mapped: Optional[bool] = None) -> DocumentHandle:
+    """mapped=None: mmap, exceto em armazenamento de rede (storage_kind)."""
+    return DocumentHandle(path, mapped)
+
+
+def open_stream(src: Union[str, DocumentHandle]) -> BinaryIO:
+    """Arquivo binário para ler ``src``: leitor sobre o buffer do handle, ou o caminho aberto."""
+    if isinstance(src, DocumentHandle):
+        return src.reader()
+    return open(src, "rb")
+
+
+def source_path(src: Union[str, DocumentHandle]) -> str:
+    return src.path if isinstance(src, DocumentHandle) else src
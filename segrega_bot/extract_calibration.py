@@ -0,0 +1,143 @@
+# extract_calibration.py
+# Escolha automática do backend de extração (pdf_reader.BACKENDS) por família de
+# produtor do PDF: numa amostra do corpus, mede cada backend instalado e confere
+# que os matches (nomes e onde foram achados) são iguais aos do pdfminer com
+# layout, a referência. Fica o mais rápido que concorda em toda a amostra.
+# As decisões ficam num JSON pequeno na pasta destino (CALIBRATION_NAME), fora da
+# pasta de cache, que é apagada ao fim de cada execução: valem para as próximas.
+import json
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from pdf_reader import DEFAULT_BACKEND, available_backends, iter_pages_text, pdf_producer
+from search_ac import CompiledNames, find_displays_with_source
+from util_normalize import normalize_texts_for_search
+
+PROBE_FILES = 400          # PDFs dos quais só se lê o /Producer, para achar as famílias
+SAMPLE_PER_PRODUCER = 8    # PDFs medidos por família
+MIN_SPEEDUP = 1.2          # ganho mínimo para trocar a referência
+CALIBRATION_NAME = ".distcolab_calibracao.json"
+
+Match = Tuple[Dict[str, str], List[str]]   # find_displays_with_source
+
+
+def _spread(items: Sequence[str], n: int) -> List[str]:
+    """Até ``n`` itens espalhados pela lista (pastas diferentes, lotes diferentes)."""
+    if len(items) <= n:
+        return list(items)
+    step = len(items) / n
+    return [items[int(i * step)] for i in range(n)]
+
+
+def _match(path: str, names: CompiledNames, max_pages: int, backend: str) -> Match:
+    try:
+        pages = list(iter_pages_text(path, max_pages, backend=backend))
+    except Exception:
+        pages = []
+    *pages_norm, base_norm = normalize_texts_for_search(pages + [Path(path).stem])
+    return find_displays_with_source(names, pages_norm, base_norm)
+
+
+def measure_backends(paths: Sequence[str], names: CompiledNames, max_pages: int,
+                     backends: Sequence[str]) -> Dict[str, Tuple[float, List[Match]]]:
+    """{backend: (segundos na amostra, matches por PDF)}; a 1ª leitura de cada um não conta (imports)."""
+    out: Dict[str, Tuple[float, List[Match]]] = {}
+    for backend in backends:
+        if paths:
+            _match(paths[0], names, max_pages, backend)
+        t0 = time.perf_counter()
+        results = [_match(p, names, max_pages, backend) for p in paths]
+        out[backend] = (time.perf_counter() - t0, results)
+    return out
+
+
+def choose_backend(measured: Dict[str, Tuple[float, List[Match]]],
+                   reference: str = DEFAULT_BACKEND) -> Tuple[str, str]:
+    """(backend, motivo): o mais rápido com os mesmos matches da referência."""
+    ref_s, ref_matches = measured[reference]
+    if not any(sources for sources, _fuzzy in ref_matches):
+        return reference, "nenhum match na amostra"
+    best, best_s = reference, ref_s
+    for backend, (secs, matches) in measured.items():
+        if backend != reference and matches == ref_matches and secs * MIN_SPEEDUP < best_s:
+            best, best_s = backend, secs
+    if best == reference:
+        return reference, "nenhum outro backend deu os mesmos matches mais rápido"
+    return best, f"{ref_s / max(best_s, 1e-9):.1f}x mais rápido, mesmos matches"
+
+
+def calibration_path(out_root: str) -> str:
+    return os.path.join(out_root, CALIBRATION_NAME)
+
+
+def load_decisions(path: str) -> Dict[str, dict]:
+    """{família do produtor: decisão gravada}; vazio se o arquivo não existe ou não lê."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def save_decisions(path: str, decisions: Dict[str, dict]) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(decisions, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def calibrate_backends(
+    pdf_paths: Sequence[str],
+    names: CompiledNames,
+    max_pages: int,
+    store_path: Optional[str] = None,
+    *,
+    candidates: Optional[Sequence[str]] = None,
+    log: Optional[Callable[[str], None]] = None,
+) -> Dict[str, str]:
+    """
+    {família do produtor: backend}. Famílias já decididas em ``store_path`` (com
+    o mesmo conjunto de backends instalados) não são medidas de novo; famílias
+    sem match na amostra ficam na referência e não são gravadas (a próxima
+    execução tenta).
+    """
+    candidates = list(candidates or available_backends())
+    if DEFAULT_BACKEND not in candidates:
+        candidates.insert(0, DEFAULT_BACKEND)
+    groups: Dict[str, List[str]] = {}
+    for p in _spread(pdf_paths, PROBE_FILES):
+        groups.setdefault(pdf_producer(p), []).append(p)
+
+    stored = load_decisions(store_path) if store_path else {}
+    changed = False
+    decisions: Dict[str, str] = {}
+    for producer, files in sorted(groups.items()):
+        label = producer or "produtor desconhecido"
+        known = stored.get(producer)
+        if isinstance(known, dict) and known.get("candidates") == candidates:
+            decisions[producer] = known["backend"]
+            continue
+        if len(candidates) == 1:
+            decisions[producer] = DEFAULT_BACKEND
+            continue
+        sample = _spread(files, SAMPLE_PER_PRODUCER)
+        measured = measure_backends(sample, names, max_pages, candidates)
+        backend, why = choose_backend(measured)
+        decisions[producer] = backend
+        if log:
+            times = ", ".join(f"{b} {s * 1000 / len(sample):.0f} ms" for b, (s, _m) in measured.items())
+            log(f"Calibração '{label}' ({len(sample)} PDFs; {times}): {backend} – {why}.")
+        if store_path and any(src for src, _f in measured[DEFAULT_BACKEND][1]):
+            stored[producer] = {"backend": backend, "candidates": candidates, "samples": len(sample),
+                                "seconds": {b: round(s, 4) for b, (s, _m) in measured.items()}}
+            changed = True
+    if changed:
+        try:
+            save_decisions(store_path, stored)
+        except OSError as e:
+            if log:
+                log(f"[AVISO] Calibração não gravada ({e}); a próxima execução mede de novo.")
+    return decisions
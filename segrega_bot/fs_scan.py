@@ -0,0 +1,186 @@
+# fs_scan.py
+# Varredura da pasta de origem: os.scandir em várias threads (listar pastas é
+# espera de E/S, sobretudo em SMB/NFS) e cada PDF entregue assim que a pasta dele
+# é listada, já com o stat. Cache e cópia reaproveitam esse stat (FileEntry) em
+# vez de restatar o arquivo.
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Deque, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+SCAN_WORKERS = 8
+READ_AHEAD_DIRS = 64   # pastas listadas à frente do consumidor, no máximo
+PDF_SUFFIX = ".pdf"
+
+
+class FileEntry(NamedTuple):
+    """Um PDF achado na varredura, com o stat feito nela (-1 se o stat falhou)."""
+    path: str
+    size: int
+    mtime_ns: int
+    inode: int
+    dev: int = 0
+
+    def identity(self) -> Dict[str, Any]:
+        """Os mesmos campos de DocumentHandle.identity (entrada do cache)."""
+        return {"mtime": self.mtime_ns / 1e9, "mtime_ns": self.mtime_ns, "size": self.size,
+                "ino": self.inode, "dev": self.dev}
+
+
+def entry_path(item: Union[str, FileEntry]) -> str:
+    return item.path if isinstance(item, FileEntry) else item
+
+
+def _file_entry(e: os.DirEntry) -> FileEntry:
+    try:
+        st = e.stat()
+        if not st.st_ino:
+            st = os.stat(e.path)   # Windows: o stat do scandir vem sem inode/dispositivo
+    except OSError:
+        return FileEntry(e.path, -1, -1, 0, 0)
+    return FileEntry(e.path, st.st_size, st.st_mtime_ns, st.st_ino, st.st_dev)
+
+
+class PdfScan:
+    """
+    Iterável de FileEntry dos PDFs sob ``root``, gerados enquanto a varredura anda.
+
+    ordered=True: a mesma ordem de antes (caminhos completos ordenados), ainda em
+    fluxo – percurso em profundidade com os filhos de cada pasta ordenados, com as
+    pastas seguintes já sendo listadas em paralelo. ordered=False: na ordem em que
+    as pastas terminam de ser listadas (uma pasta lenta não segura as outras).
+    Nos dois modos no máximo ``read_ahead`` pastas ficam pedidas e ainda não
+    consumidas: a varredura anda à frente da leitura, mas não lista a árvore toda.
+    Como o os.walk de antes: links para pastas não são seguidos e pastas que não
+    abrem são puladas (contadas em ``errors``).
+    ``found``/``dirs`` crescem durante a varredura; ``finished`` diz se todas as
+    pastas já foram listadas (os PDFs podem ainda não ter sido consumidos).
+    """
+
+    def __init__(self, root: str, workers: int = SCAN_WORKERS, ordered: bool = True,
+                 read_ahead: int = READ_AHEAD_DIRS):
+        self.root = root
+        self.workers = max(1, workers)
+        self.ordered = ordered
+        self.read_ahead = max(1, read_ahead)
+        self.found = 0
+        self.dirs = 0
+        self.errors = 0
+        self._known = 0   # pastas descobertas (listadas ou por listar)
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def _list_dir(self, path: str) -> Tuple[List[FileEntry], List[str]]:
+        files: List[FileEntry] = []
+        subdirs: List[str] = []
+        try:
+            with os.scandir(path) as it:
+                for e in it:
+                    try:
+                        is_dir = e.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        if not e.is_symlink():
+                            subdirs.append(e.name)
+                    elif e.name.lower().endswith(PDF_SUFFIX):
+                        files.append(_file_entry(e))
+        except OSError:
+            with self._lock:
+                self.errors += 1
+        with self._lock:
+            self.found += len(files)
+            self._known += len(subdirs)
+            self.dirs += 1
+        return files, subdirs
+
+    @property
+    def finished(self) -> bool:
+        with self._lock:
+            return self.dirs == self._known
+
+    # ---------- em ordem ----------
+    def _ordered_task(self, path: str) -> List[Tuple[str, Union[FileEntry, str]]]:
+        """Filhos da pasta na ordem dos caminhos completos; subpastas pelo caminho (listadas depois)."""
+        files, subdirs = self._list_dir(path)
+        items: List[Tuple[str, Union[FileEntry, str]]] = [(os.path.basename(f.path), f) for f in files]
+        # tudo que está sob "nome/" ordena junto, logo após o que vem antes de "nome" + sep
+        items.extend((name + os.sep, os.path.join(path, name)) for name in subdirs)
+        items.sort(key=lambda kv: kv[0])
+        return items
+
+    def _iter_ordered(self) -> Iterator[FileEntry]:
+        # pilha do percurso: (filhos ainda não visitados, subpastas deles ainda não pedidas)
+        stack: List[Tuple[Iterator, Deque[str]]] = []
+        ahead: Dict[str, Future] = {}   # pasta -> listagem pedida e ainda não consumida
+
+        def _push(items: List[Tuple[str, Union[FileEntry, str]]]) -> None:
+            stack.append((iter(items), deque(obj for _k, obj in items if isinstance(obj, str))))
+            # pede as próximas pastas na ordem em que serão visitadas (topo da pilha primeiro)
+            for _it, dirs in reversed(stack):
+                while dirs and len(ahead) < self.read_ahead:
+                    path = dirs.popleft()
+                    ahead[path] = self._pool.submit(self._ordered_task, path)
+                if len(ahead) >= self.read_ahead:
+                    return
+
+        with self._lock:
+            self._known += 1
+        _push(self._ordered_task(self.root))
+        while stack:
+            item = next(stack[-1][0], None)
+            if item is None:
+                stack.pop()
+                continue
+            obj = item[1]
+            if isinstance(obj, str):
+                fut = ahead.pop(obj, None)
+                if fut is None:   # ainda não pedida: é a próxima da fila desta pasta
+                    stack[-1][1].popleft()
+                    _push(self._ordered_task(obj))
+                else:
+                    _push(fut.result())
+            else:
+                yield obj
+
+    # ---------- sem ordem ----------
+    def _iter_unordered(self) -> Iterator[FileEntry]:
+        done_q: "queue.SimpleQueue" = queue.SimpleQueue()
+        todo: Deque[str] = deque([self.root])   # descobertas e ainda não pedidas
+        in_flight = 0
+
+        def _task(path: str):
+            files: List[FileEntry] = []
+            subdirs: List[str] = []
+            try:
+                files, subdirs = self._list_dir(path)
+            finally:
+                # sempre, senão o consumidor esperaria para sempre
+                done_q.put((files, [os.path.join(path, name) for name in subdirs]))
+
+        with self._lock:
+            self._known += 1
+        while True:
+            while todo and in_flight < self.read_ahead:
+                self._pool.submit(_task, todo.popleft())
+                in_flight += 1
+            if not in_flight:
+                return
+            files, subdirs = done_q.get()
+            in_flight -= 1
+            todo.extend(subdirs)
+            yield from files
+
+    def __iter__(self) -> Iterator[FileEntry]:
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="scan")
+        try:
+            yield from (self._iter_ordered() if self.ordered else self._iter_unordered())
+        finally:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_pdf_entries(root: str, workers: int = SCAN_WORKERS, ordered: bool = True) -> Iterator[FileEntry]:
+    """Atalho: os FileEntry de PdfScan(root, workers, ordered)."""
+    return iter(PdfScan(root, workers, ordered))
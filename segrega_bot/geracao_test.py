@@ -1,84 +1,272 @@
 # gerar_pdfs_nomes.py
 # -----------------------------------------------------------
-# Gera 100 PDFs. Cada PDF contém 1, 2 ou 3 nomes escolhidos
-# aleatoriamente a partir de uma lista com 200 rótulos.
-# Cria também um manifest.csv mapeando arquivo -> nomes.
+# Gera um corpus de teste/benchmark: N PDFs (1 a várias páginas),
+# cada um citando 1, 2 ou 3 colaboradores de uma lista de nomes
+# brasileiros realistas (com acentos, "da"/"dos", etc.).
+#
+# Parâmetros permitem escalar de 100 a 1M PDFs, com duplicatas,
+# arquivos ilegíveis e subpastas aninhadas. Cria também:
+#   - colaboradores.txt  (entrada do bot)
+#   - manifest.csv       (arquivo -> nomes esperados)
+#
+# Os PDFs são escritos direto em bytes (Helvetica/WinAnsi), sem
+# fpdf: ~50 µs por arquivo em vez de ~50 ms.
+#
+# Uso (exemplos):
+#   python geracao_test.py                                  # 100 PDFs em pdfs_out/
+#   python geracao_test.py --num-pdfs 100000 --names 5000 --max-pages 3 \
+#          --dup-rate 0.02 --bad-rate 0.005 --depth 2 --out corpus_100k
+#   python geracao_test.py --label-names                    # rótulos NOME_001… (antigo)
 # -----------------------------------------------------------
 
-from pathlib import Path
-from fpdf import FPDF  # pip install fpdf2
-import random
+import argparse
 import csv
+import os
+import random
+from pathlib import Path
+from typing import Dict, List, Optional
 
-# --- Lista de nomes (como você pediu) ---
-NAMES = [f"NOME_{i:03d}" for i in range(1, 201)]
+# --- Nomes realistas ---
+FIRST_NAMES = [
+    "Ana", "Maria", "José", "João", "Antônio", "Francisco", "Carlos", "Paulo", "Pedro", "Lucas",
+    "Luiz", "Marcos", "Luís", "Gabriel", "Rafael", "Daniel", "Marcelo", "Bruno", "Eduardo", "Felipe",
+    "Raimundo", "Rodrigo", "Manoel", "Mateus", "André", "Fernando", "Fábio", "Leonardo", "Gustavo", "Guilherme",
+    "Márcia", "Francisca", "Antônia", "Adriana", "Juliana", "Patrícia", "Aline", "Sandra", "Camila", "Amanda",
+    "Bruna", "Jéssica", "Letícia", "Júlia", "Luciana", "Vanessa", "Mariana", "Gabriela", "Vera", "Vitória",
+    "Larissa", "Cláudia", "Beatriz", "Luana", "Rita", "Sônia", "Renata", "Eliane", "Conceição", "Inês",
+    "Benedito", "Sebastião", "Joaquim", "Caio", "Otávio", "Vinícius", "Thaís", "Lúcia", "Cecília", "Ângela",
+]
+MIDDLE_NAMES = [
+    "Aparecida", "Cristina", "Helena", "Eduarda", "Clara", "Luísa", "Vitória", "Fernanda",
+    "Henrique", "Augusto", "Eduardo", "Vinícius", "Gabriel", "Antônio", "José", "Raimundo",
+]
+SURNAMES = [
+    "Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira", "Lima", "Gomes",
+    "Costa", "Ribeiro", "Martins", "Carvalho", "Almeida", "Lopes", "Soares", "Fernandes", "Vieira", "Barbosa",
+    "Rocha", "Dias", "Nascimento", "Andrade", "Moreira", "Nunes", "Marques", "Machado", "Mendes", "Freitas",
+    "Cardoso", "Ramos", "Gonçalves", "Santana", "Teixeira", "Araújo", "Conceição", "Magalhães", "Brandão",
+    "Falcão", "Assunção", "Guimarães", "Simões", "Estêvão", "Sá", "Leão", "Camargo", "Moraes", "Peixoto",
+]
+PARTICLES = ["da", "de", "do", "dos", "das", ""]
 
-# --- Parâmetros ajustáveis ---
+FILLER = [
+    "Declaramos para os devidos fins que o(a) servidor(a) abaixo relacionado(a)",
+    "consta nos registros funcionais desta unidade, conforme documentação anexa.",
+    "O presente documento foi emitido eletronicamente e dispensa assinatura.",
+    "Referência: processo administrativo nº 2024/{n:06d} – folha de pagamento.",
+    "Em caso de divergência, procure o setor de gestão de pessoas.",
+    "Período de apuração: competência {m:02d}/2024. Valores expressos em reais (R$).",
+]
+PRODUCERS = ["segrega_bot bench", "Microsoft: Print To PDF", "LibreOffice 7.5", "iText 5.5.13"]
+
+# --- Parâmetros padrão (compatíveis com o script antigo) ---
 NUM_PDFS = 100
-OUTPUT_DIR = Path("pdfs_out")   # pasta de saída
+NUM_NAMES = 200
+OUTPUT_DIR = Path("pdfs_out")
 RANDOM_SEED = 42                # troque para None se quiser aleatoriedade diferente a cada execução
 NAMES_PER_PDF_CHOICES = [1, 2, 3]
 
-def _shuffled_pool():
-    pool = NAMES[:]
-    random.shuffle(pool)
-    return pool
-
-def _take_names(pool, k):
-    """Retira k nomes do 'pool'. Se acabar, reembaralha e continua."""
-    taken = []
-    while k > 0:
-        if not pool:
-            pool = _shuffled_pool()
-        taken.append(pool.pop())
-        k -= 1
-    return taken, pool
-
-def _make_pdf(filepath: Path, names):
-    pdf = FPDF(orientation="P", unit="mm", format="A4")
-    pdf.set_margins(20, 20, 20)
-    pdf.add_page()
-
-    # Título
-    pdf.set_font("Helvetica", "B", 18)
-    pdf.cell(0, 10, "Lista de Nomes", ln=1)
-
-    # Conteúdo
-    pdf.set_font("Helvetica", "", 14)
-    pdf.ln(4)
-    for idx, name in enumerate(names, start=1):
-        pdf.cell(0, 10, f"{idx}. {name}", ln=1)
-
-    # Rodapé simples
-    pdf.set_y(-20)
-    pdf.set_font("Helvetica", "I", 9)
-    pdf.cell(0, 8, "Gerado automaticamente", align="R")
-
-    pdf.output(str(filepath))
 
-def main():
-    if RANDOM_SEED is not None:
-        random.seed(RANDOM_SEED)
+def realistic_names(n: int, rng: random.Random) -> List[str]:
+    """n nomes completos distintos no estilo brasileiro."""
+    out, seen = [], set()
+    while len(out) < n:
+        parts = [rng.choice(FIRST_NAMES)]
+        if rng.random() < 0.4:
+            parts.append(rng.choice(MIDDLE_NAMES))
+        for _ in range(rng.choice([1, 2, 2, 3])):
+            particle = rng.choice(PARTICLES)
+            if particle:
+                parts.append(particle)
+            parts.append(rng.choice(SURNAMES))
+        name = " ".join(parts)
+        if name.casefold() not in seen:
+            seen.add(name.casefold())
+            out.append(name)
+    return out
+
+
+def label_names(n: int) -> List[str]:
+    return [f"NOME_{i:03d}" for i in range(1, n + 1)]
+
+
+# --- PDF mínimo escrito à mão ---
+def _pdf_escape(s: str) -> bytes:
+    s = s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return s.encode("cp1252", errors="replace")
+
+
+def pdf_bytes(pages: List[List[str]], producer: str = PRODUCERS[0]) -> bytes:
+    """PDF válido com uma linha de texto por item de cada página."""
+    n = len(pages)
+    kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(n))
+    objs: List[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {n} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    for i, lines in enumerate(pages):
+        stream = b"BT /F1 11 Tf 14 TL 56 790 Td " + b"".join(b"(" + _pdf_escape(ln) + b") Tj T* " for ln in lines) + b"ET"
+        objs.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                    f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>".encode())
+        objs.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objs.append(b"<< /Producer (" + _pdf_escape(producer) + b") >>")
+    info_id = len(objs)
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for num, body in enumerate(objs, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % num + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, info_id, xref)
+    return bytes(out)
+
+
+def _doc_pages(names: List[str], num_pages: int, late_name_rate: float, idx: int, rng: random.Random) -> List[List[str]]:
+    pages: List[List[str]] = []
+    for p in range(num_pages):
+        lines = [FILLER[(p + k) % len(FILLER)].format(n=idx, m=(idx % 12) + 1) for k in range(6)]
+        pages.append(lines)
+    # nomes na página 1, às vezes numa página posterior (documentos de várias folhas)
+    target = 0
+    if num_pages > 1 and rng.random() < late_name_rate:
+        target = rng.randrange(1, num_pages)
+    for k, name in enumerate(names, start=1):
+        shown = name.upper() if rng.random() < 0.3 else name
+        pages[target].insert(1 + k, f"{k}. {shown}")
+    return pages
 
-    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
-    # manifesto com o mapeamento arquivo -> nomes
-    manifest_path = OUTPUT_DIR / "manifest.csv"
+def _doc_dir(root: Path, idx: int, depth: int, fanout: int) -> Path:
+    d = root
+    n = idx
+    for _ in range(depth):
+        d = d / f"lote_{n % fanout:03d}"
+        n //= fanout
+    return d
+
+
+def generate_corpus(
+    out_dir: Path,
+    num_pdfs: int = NUM_PDFS,
+    num_names: int = NUM_NAMES,
+    *,
+    labels: bool = False,
+    max_pages: int = 1,
+    late_name_rate: float = 0.1,
+    name_in_filename_rate: float = 0.0,
+    dup_rate: float = 0.0,
+    bad_rate: float = 0.0,
+    depth: int = 0,
+    fanout: int = 50,
+    seed: Optional[int] = RANDOM_SEED,
+    progress_every: int = 0,
+) -> Dict[str, int]:
+    """
+    Gera o corpus em ``out_dir``: PDFs em out_dir/pdfs (ou subpastas), a lista
+    colaboradores.txt e manifest.csv. Retorna contagens por tipo de arquivo.
+    """
+    rng = random.Random(seed)
+    names = label_names(num_names) if labels else realistic_names(num_names, rng)
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    pdf_root = out_dir / "pdfs"
+    pdf_root.mkdir(parents=True, exist_ok=True)
+    with open(out_dir / "colaboradores.txt", "w", encoding="utf-8") as f:
+        f.write("\n".join(names) + "\n")
+
+    stats = {"pdfs": 0, "duplicates": 0, "unreadable": 0, "names": len(names)}
+    recent: List[bytes] = []    # para duplicatas (mesmo conteúdo, outro arquivo)
+    pool: List[str] = []
+
+    manifest_path = out_dir / "manifest.csv"
     with open(manifest_path, "w", newline="", encoding="utf-8") as mf:
         writer = csv.writer(mf, delimiter=";")
-        writer.writerow(["filename", "count", "names"])
+        writer.writerow(["filename", "count", "names", "kind"])
+
+        for i in range(1, num_pdfs + 1):
+            d = _doc_dir(pdf_root, i, depth, fanout)
+            d.mkdir(parents=True, exist_ok=True)
+            roll = rng.random()
+
+            if roll < bad_rate:
+                path = d / f"doc_{i:07d}.pdf"
+                data = os.urandom(rng.randint(64, 4096)) if rng.random() < 0.5 else b"%PDF-1.4\n" + os.urandom(256)
+                path.write_bytes(data)
+                writer.writerow([str(path.relative_to(pdf_root)), 0, "", "unreadable"])
+                stats["unreadable"] += 1
+                continue
+
+            if roll < bad_rate + dup_rate and recent:
+                path = d / f"doc_{i:07d}.pdf"
+                path.write_bytes(rng.choice(recent))
+                writer.writerow([str(path.relative_to(pdf_root)), "", "", "duplicate"])
+                stats["duplicates"] += 1
+                continue
 
-        pool = _shuffled_pool()
+            k = rng.choice(NAMES_PER_PDF_CHOICES)
+            chosen = []
+            for _ in range(k):
+                if not pool:
+                    pool = names[:]
+                    rng.shuffle(pool)
+                chosen.append(pool.pop())
 
-        for i in range(1, NUM_PDFS + 1):
-            k = random.choice(NAMES_PER_PDF_CHOICES)   # 1, 2 ou 3
-            chosen, pool = _take_names(pool, k)
-            pdf_path = OUTPUT_DIR / f"doc_{i:03d}.pdf"
-            _make_pdf(pdf_path, chosen)
-            writer.writerow([pdf_path.name, len(chosen), " | ".join(chosen)])
+            stem = f"doc_{i:07d}"
+            if rng.random() < name_in_filename_rate:
+                stem += "_" + chosen[0].replace(" ", "_")
+            path = d / f"{stem}.pdf"
+            pages = _doc_pages(chosen, rng.randint(1, max(1, max_pages)), late_name_rate, i, rng)
+            data = pdf_bytes(pages, producer=rng.choice(PRODUCERS))
+            path.write_bytes(data)
+            if len(recent) < 64:
+                recent.append(data)
+            else:
+                recent[rng.randrange(64)] = data
+            writer.writerow([str(path.relative_to(pdf_root)), len(chosen), " | ".join(chosen), "ok"])
+            stats["pdfs"] += 1
+
+            if progress_every and i % progress_every == 0:
+                print(f"  {i}/{num_pdfs}")
+
+    return stats
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Gera PDFs de teste com nomes de colaboradores.")
+    ap.add_argument("--out", default=str(OUTPUT_DIR), help="Pasta de saída.")
+    ap.add_argument("--num-pdfs", type=int, default=NUM_PDFS)
+    ap.add_argument("--names", type=int, default=NUM_NAMES, help="Tamanho da lista de colaboradores.")
+    ap.add_argument("--label-names", action="store_true", help="Usa rótulos NOME_001… em vez de nomes reais.")
+    ap.add_argument("--max-pages", type=int, default=1, help="Páginas por documento (1..N, sorteado).")
+    ap.add_argument("--late-name-rate", type=float, default=0.1, help="Fração com o nome fora da página 1.")
+    ap.add_argument("--name-in-filename-rate", type=float, default=0.0, help="Fração com o nome no arquivo.")
+    ap.add_argument("--dup-rate", type=float, default=0.0, help="Fração de cópias de conteúdo já gerado.")
+    ap.add_argument("--bad-rate", type=float, default=0.0, help="Fração de arquivos ilegíveis.")
+    ap.add_argument("--depth", type=int, default=0, help="Níveis de subpastas.")
+    ap.add_argument("--fanout", type=int, default=50, help="Subpastas por nível.")
+    ap.add_argument("--seed", type=int, default=RANDOM_SEED)
+    return ap.parse_args()
+
+
+def main():
+    args = parse_args()
+    out = Path(args.out)
+    stats = generate_corpus(
+        out, args.num_pdfs, args.names,
+        labels=args.label_names, max_pages=args.max_pages, late_name_rate=args.late_name_rate,
+        name_in_filename_rate=args.name_in_filename_rate, dup_rate=args.dup_rate,
+        bad_rate=args.bad_rate, depth=args.depth, fanout=args.fanout, seed=args.seed,
+        progress_every=max(1000, args.num_pdfs // 20) if args.num_pdfs >= 10000 else 0,
+    )
+    print(f"OK! {stats['pdfs']} PDFs (+{stats['duplicates']} duplicatas, "
+          f"{stats['unreadable']} ilegíveis) gerados em: {(out / 'pdfs').resolve()}")
+    print(f"Colaboradores: {(out / 'colaboradores.txt').resolve()}")
+    print(f"Manifesto: {(out / 'manifest.csv').resolve()}")
 
-    print(f"OK! {NUM_PDFS} PDFs gerados em: {OUTPUT_DIR.resolve()}")
-    print(f"Manifesto: {manifest_path.resolve()}")
 
 if __name__ == "__main__":
     main()
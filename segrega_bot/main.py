@@ -1,14 +1,26 @@
-import os, threading
-from pathlib import Path
-from typing import List, Dict
-
-from ui import App
-from util_normalize import normalize_name_for_key, normalize_text_for_search
-from search_ac import build_automaton, find_keys_in_text, map_keys_to_displays
-from pdf_reader import extract_first_pages_text
-from report_writer import write_distribution_report
-from copy_engine import copy_plan
-from cache_db import load_cache, save_cache, is_unchanged, update_cache_entry, get_cached_names, purge_cache
+import itertools, os, sqlite3, tempfile, threading, time
+from typing import Any, List, Dict, Iterable, Iterator, Tuple, Union, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ui import App
+from util_normalize import normalize_names_for_key
+from scan_engine import ExtractorChoice, PageBudget, STOP_FULL, STOP_FILENAME, iter_scan_results
+from pdf_reader import DEFAULT_BACKEND, available_backends
+from extract_calibration import calibrate_backends, calibration_path
+from search_ac import load_or_compile_names
+from report_writer import write_distribution_report, report_format
+from copy_engine import iter_copy_events, result_events, CopyEvent, CopyPipeline
+from fs_scan import FileEntry, PdfScan, entry_path
+from run_journal import RunJournal, load_journal
+from run_metrics import RunMetrics
+from cache_db import (load_cache, save_cache, is_unchanged, update_cache_entry, get_cached_names,
+                      get_cached_sources, get_cached_fuzzy, get_cache_dir, purge_cache, close_cache,
+                      VALIDATE_TEXT)
+
+LOG_DIR_NAME = ".distcolab_logs"   # log completo de cada execução, dentro da pasta destino
+COPY_PROGRESS_LOG_S = 5.0          # intervalo das linhas de progresso/ETA da Fase 2
+SCAN_TOTAL_REFRESH_S = 0.5         # atualização do total da barra enquanto a varredura anda
+CALIBRATION_PREFIX = 2000          # PDFs do início da varredura usados como amostra no backend "auto"
 
 # -------- util --------
 def load_names(txt_path: str) -> List[str]:
@@ -22,34 +34,188 @@ def load_names(txt_path: str) -> List[str]:
 
 def scan_pdfs(src_dir: str) -> List[str]:
     """Return all PDF file paths found under ``src_dir`` in deterministic order."""
-    pdfs = []
-    for root, _, files in os.walk(src_dir):
-        for f in files:
-            if f.lower().endswith(".pdf"):
-                pdfs.append(os.path.join(root, f))
-    pdfs.sort()
-    return pdfs
+    return [e.path for e in PdfScan(src_dir)]
+
+def _timed_scan(entries: Iterable[FileEntry], metrics: RunMetrics) -> Iterator[FileEntry]:
+    """Repassa a varredura somando em "scan_pdfs" só o tempo em que a leitura esperou por ela."""
+    it = iter(entries)
+    try:
+        while True:
+            t0 = time.perf_counter()
+            entry = next(it, None)
+            metrics.add("scan_pdfs", time.perf_counter() - t0, items=0 if entry is None else 1)
+            if entry is None:
+                return
+            yield entry
+    finally:
+        if hasattr(it, "close"):
+            it.close()   # encerra as threads da varredura se a leitura parar antes
+
+def _fmt_eta(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{(seconds % 3600) // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+class _CopyTracker:
+    """
+    Consolida os CopyEvent à medida que chegam. Contadores e progresso ficam em
+    memória; cada evento vai para um spool SQLite temporário (fora do destino),
+    de onde o relatório lê o manifest e o resultado de cada par em fluxo, sem
+    dicionários/listas que cresçam com a execução.
+    """
+
+    def __init__(self):
+        self.method_counts: Dict[str, int] = {}
+        self.conflicts = 0
+        self.count = 0
+        self.nbytes = 0
+        self._lock = threading.Lock()
+        self._indexed = False
+        fd, self._path = tempfile.mkstemp(prefix="distcolab_copias_", suffix=".sqlite")
+        os.close(fd)
+        # descartável: sem diário nem fsync; tudo numa transação que nunca é confirmada
+        self._conn = sqlite3.connect(self._path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=OFF")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute("CREATE TABLE events (collaborator TEXT, pdf TEXT, created INTEGER, "
+                           "detail TEXT, method TEXT)")
+
+    def add(self, ev: CopyEvent) -> None:
+        with self._lock:
+            self.count += 1
+            self.nbytes += ev.nbytes
+            created = ev.status == "created"
+            if created:
+                self.method_counts[ev.method or "?"] = self.method_counts.get(ev.method or "?", 0) + 1
+            elif ev.detail != "cancelled":
+                self.conflicts += 1
+            self._conn.execute("INSERT INTO events VALUES (?, ?, ?, ?, ?)",
+                               (ev.collaborator, ev.pdf_path, int(created), ev.detail, ev.method))
+
+    def created_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM (SELECT DISTINCT collaborator, pdf "
+                                      "FROM events WHERE created)").fetchone()[0]
+
+    def outcome(self, collab: str, pdf_path: str) -> Tuple[str, str]:
+        """(caminho criado ou "", status) do par; o último evento de cada tipo vale."""
+        with self._lock:
+            if not self._indexed:   # índice só depois das inserções (consultas só no relatório)
+                self._conn.execute("CREATE INDEX events_pair ON events (collaborator, pdf)")
+                self._indexed = True
+            created_path, status = "", "created"
+            for created, detail in self._conn.execute(
+                    "SELECT created, detail FROM events WHERE collaborator = ? AND pdf = ? ORDER BY rowid",
+                    (collab, pdf_path)):
+                if created:
+                    created_path = detail
+                else:
+                    status = detail
+            return created_path, status
+
+    def manifest_rows(self) -> Iterator[Dict[str, str]]:
+        """Uma linha da aba "log" por evento, na ordem de chegada (lida do spool aos poucos)."""
+        last = 0
+        while True:
+            with self._lock:
+                batch = self._conn.execute("SELECT rowid, collaborator, pdf, created, detail, method FROM events "
+                                           "WHERE rowid > ? ORDER BY rowid LIMIT 1000", (last,)).fetchall()
+            if not batch:
+                return
+            for last, collab, pdf_path, created, detail, method in batch:
+                yield {
+                    "source_path": pdf_path,
+                    "source_name": os.path.basename(pdf_path),
+                    "collaborator": collab,
+                    "created_path": detail if created else "",
+                    "created_name": os.path.basename(detail) if created else "",
+                    "status": "created" if created else f"skipped:{detail}",
+                    "method": method,
+                }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+        try:
+            os.remove(self._path)
+        except OSError:
+            pass
+
+class _CopyProgress:
+    """
+    Barra e linha "Cópias: x/y – MB/s – restante" da Fase 2: é o on_event da
+    cópia em série e do pipeline. Antes de start() só repassa ao tracker (no
+    pipeline, a barra ainda é a da leitura).
+    """
+
+    def __init__(self, ui, tracker: _CopyTracker):
+        self.ui = ui
+        self.tracker = tracker
+        self._lock = threading.Lock()
+        self._active = False
+        self._pending = self._base_ops = self._base_bytes = 0
+        self._t0 = self._last_log = 0.0
+
+    def start(self, total_ops: int) -> None:
+        """Fase 2 começando: ``total_ops`` destinos no plano; o que já chegou conta como feito."""
+        with self._lock:
+            self._base_ops, self._base_bytes = self.tracker.count, self.tracker.nbytes
+            self._pending = max(0, total_ops - self._base_ops)
+            self._t0 = self._last_log = time.monotonic()
+            self._active = True
+        self.ui.ui_set_progress_total(max(1, total_ops))
+        self.ui.ui_set_progress(self._base_ops)
+
+    def add(self, ev: CopyEvent) -> None:
+        self.tracker.add(ev)
+        if not self._active:
+            return
+        self.ui.ui_step()
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_log < COPY_PROGRESS_LOG_S:
+                return
+            self._last_log = now
+            ops = self.tracker.count - self._base_ops
+            nbytes = self.tracker.nbytes - self._base_bytes
+            elapsed = max(now - self._t0, 1e-6)
+        rate = ops / elapsed
+        eta = (self._pending - ops) / rate if rate > 0 else 0
+        self.ui.ui_log(f"Cópias: {ops}/{self._pending} ({100.0 * ops / max(1, self._pending):.1f}%) – "
+                       f"{nbytes / 2**20 / elapsed:.1f} MB/s – restante ~{_fmt_eta(eta)}")
 
 # -------- controller --------
 class Controller:
-    def __init__(self, ui: App):
+    def __init__(self, ui: "App"):
         self.ui = ui
+        # resumo da última execução (usado pela CLI para o JSON e o código de saída)
+        self.summary: Dict[str, Any] = {}
+        self.metrics = None
         self.thread = None
         self._cancel = threading.Event()
         self._pause = threading.Event()
         self._pause.clear()
+        self._resume = False
 
     def bind(self):
-        self.ui.bind_handlers(on_start=self.on_start, on_pause=self.on_pause, on_cancel=self.on_cancel)
+        self.ui.bind_handlers(on_start=self.on_start, on_pause=self.on_pause, on_cancel=self.on_cancel,
+                              on_resume=self.on_resume)
 
-    def on_start(self, _ui):
+    def on_start(self, _ui, resume: bool = False):
         if self.thread and self.thread.is_alive():
             return
+        self._resume = resume
         self._cancel.clear()
         self._pause.clear()
         self.thread = threading.Thread(target=self._worker, daemon=True)
         self.thread.start()
 
+    def on_resume(self, ui):
+        self.on_start(ui, resume=True)
+
     def on_pause(self, _ui):
         if self._pause.is_set():
             self.ui.ui_log("Retomando…")
@@ -66,60 +232,232 @@ class Controller:
         while self._pause.is_set() and not self._cancel.is_set():
             self._pause.wait(timeout=0.2)
 
+    def _write_metrics(self, metrics: RunMetrics, beside: str):
+        """Grava o JSON de métricas ao lado do relatório (ou do log). Retorna o caminho."""
+        path = os.path.splitext(beside)[0] + "_metricas.json"
+        try:
+            metrics.write_json(path, extra={"summary": dict(self.summary)})
+            self.ui.ui_log(f"Métricas salvas em: {path}")
+            return path
+        except Exception as e:
+            self.ui.ui_log(f"[ERRO] Falha ao salvar métricas: {e}")
+            return None
+
     def _worker(self):
         clear_cache = True
         dst_dir = ""
+        journal = None
+        pipeline = None
+        tracker = None
+        started = time.monotonic()
+        self.summary = {"status": "running"}
+        metrics = self.metrics = RunMetrics()
         try:
             txt_path, src_dir, dst_dir = self.ui.get_paths()
             clear_cache = self.ui.should_clear_cache()
             report_path = self.ui.get_report_path()
 
-            names = load_names(txt_path)
-            canon_by_disp = {disp: normalize_name_for_key(disp) for disp in names}
-            A, key_to_display = build_automaton(canon_by_disp)
+            log_path = os.path.join(dst_dir, LOG_DIR_NAME, time.strftime("distribuicao_%Y%m%d_%H%M%S.log"))
+            self.ui.ui_set_log_file(log_path)
+            self.ui.ui_log(f"Log completo em: {log_path}")
 
-            pdf_paths = scan_pdfs(src_dir)
+            names = load_names(txt_path)
+            canon_by_disp = dict(zip(names, normalize_names_for_key(names)))
+            workers = self.ui.get_workers()
+            validation = self.ui.get_cache_validation()
+            overlap = self.ui.should_overlap_copies()
+            placement = self.ui.get_placement()
+            fuzzy = self.ui.should_match_fuzzy()
+            # a validação "text" do cache compara o hash das páginas 1–2: elas são sempre lidas
+            budget = PageBudget(self.ui.get_max_pages(), self.ui.get_stop_rule(),
+                                min_pages=2 if validation == VALIDATE_TEXT else 0)
+            backend = self.ui.get_extract_backend()   # pdf_reader.BACKENDS ou "auto" (calibração)
+
+            # -------- Checkpoint (retomar execução interrompida) --------
+            params = {"txt": os.path.abspath(txt_path), "src": os.path.abspath(src_dir)}
+            if fuzzy:
+                params["fuzzy"] = True
+            if budget.key() is not None:
+                params["pages"] = budget.key()
+            prev = load_journal(dst_dir) if self._resume else None
+            if self._resume:
+                if prev is None:
+                    self.ui.ui_log("Nenhuma execução interrompida encontrada; iniciando do zero.")
+                elif not prev.matches(params) or any(prev.params.get(k) != params.get(k) for k in ("fuzzy", "pages")):
+                    self.ui.ui_log("O checkpoint é de outra lista/pasta de origem; iniciando do zero.")
+                    prev = None
+                else:
+                    self.ui.ui_log(f"Retomando: {len(prev.scanned)} PDFs já lidos.")
+            journal = RunJournal(dst_dir, params, resume=prev is not None)
+
+            # varredura em fluxo (fs_scan): a leitura começa no primeiro PDF achado
+            scan = PdfScan(src_dir, ordered=not self.ui.should_scan_unordered())
+            timed_scan = _timed_scan(scan, metrics)
+            entries: Iterable[FileEntry] = timed_scan
+            if not scan.ordered:
+                self.ui.ui_log("Varredura sem ordem fixa: os PDFs são lidos na ordem em que as pastas são listadas.")
             cache = load_cache(dst_dir)
+            with metrics.stage("names_automaton", items=len(names)):
+                compiled, compiled_path, from_cache = load_or_compile_names(canon_by_disp, get_cache_dir(dst_dir),
+                                                                            fuzzy=fuzzy)
+            metrics.set("names_automaton_cached", int(from_cache))
+            self.ui.ui_log(f"Autômato de nomes: {len(compiled)} chaves "
+                           f"({'carregado do cache' if from_cache else 'compilado'}).")
+            if budget.stop != STOP_FULL:
+                self.ui.ui_log(f"Leitura adaptativa: até {budget.max_pages} página(s), parando no primeiro "
+                               f"match sem indicação de continuação"
+                               f"{' (ou já pelo nome do arquivo)' if budget.stop == STOP_FILENAME else ''}.")
+            extractor = ExtractorChoice()
+            if backend == "auto":
+                # amostra do começo da varredura; o prefixo volta à frente do resto para a leitura
+                prefix = list(itertools.islice(timed_scan, CALIBRATION_PREFIX))
+                entries = itertools.chain(prefix, timed_scan)
+                with metrics.stage("calibration"):
+                    decisions = calibrate_backends([e.path for e in prefix], compiled, budget.max_pages,
+                                                   calibration_path(dst_dir), log=self.ui.ui_log)
+                extractor = ExtractorChoice(by_producer={p: b for p, b in decisions.items()
+                                                         if b != DEFAULT_BACKEND})
+                for producer, b in sorted(extractor.by_producer.items()):
+                    self.ui.ui_log(f"Extração: '{producer or 'produtor desconhecido'}' com {b}.")
+            elif backend != DEFAULT_BACKEND:
+                if backend in available_backends():
+                    extractor = ExtractorChoice(default=backend)
+                    self.ui.ui_log(f"Extração com {backend}.")
+                else:
+                    self.ui.ui_log(f"[AVISO] Backend de extração '{backend}' não instalado; usando {DEFAULT_BACKEND}.")
+            if fuzzy:
+                self.ui.ui_log("Busca aproximada ativada: nomes com pequenas diferenças (OCR, hifenização) "
+                               "são marcados como 'aproximada' no relatório.")
 
-            self.ui.ui_set_counts(total=len(pdf_paths), colabs=len(names), found=0, nomatch=0, conflicts=0)
-            self.ui.ui_set_progress_total(max(1, len(pdf_paths)))
+            self.ui.ui_set_counts(total=scan.found, colabs=len(names), found=0, nomatch=0, conflicts=0)
+            self.ui.ui_set_progress_total(max(1, scan.found))
 
             files_by_collab: Dict[str, List[str]] = {n: [] for n in names}
             files_no_match: List[str] = []
             plan: Dict[str, List[str]] = {}
+            sources_by_pdf: Dict[str, Dict[str, str]] = {}   # pdf -> {nome: "p. N" | "nome do arquivo"}
+            fuzzy_by_pdf: Dict[str, List[str]] = {}          # pdf -> nomes só da busca aproximada
+            entry_by_pdf: Dict[str, FileEntry] = {}          # pdf casado -> stat da varredura (cópias)
+
+            # operações já concluídas numa execução anterior não são refeitas
+            done = prev.completed_copies() if prev is not None else {}
+            done_pairs = {(p, c) for p, res in done.items()
+                          for kind in ("created", "skipped") for c, _ in res[kind]}
+
+            # modo pipeline: cada PDF casado já segue para a fila de cópias
+            tracker = _CopyTracker()
+            progress = _CopyProgress(self.ui, tracker)
+            pipeline = None
+            if overlap:
+                pipeline = CopyPipeline(dst_dir, cancel_event=self._cancel,
+                                        wait_if_paused=self._wait_if_paused,
+                                        on_result=journal.record_copy, metrics=metrics,
+                                        placement=placement, on_event=progress.add)
+                self.ui.ui_log("Cópias em paralelo com a leitura (pipeline).")
 
             # -------- Fase 1: varredura/matching --------
-            for idx, p in enumerate(pdf_paths, 1):
-                if self._cancel.is_set(): break
-                self._wait_if_paused()
-                self.ui.ui_log(f"[{idx}/{len(pdf_paths)}] Lendo: {os.path.basename(p)}")
-
-                if is_unchanged(p, cache):
-                    matched_displays = get_cached_names(p, cache) or []
-                else:
-                    txt, h12 = extract_first_pages_text(p, max_pages=3)
-                    base_norm = normalize_text_for_search(Path(p).stem)
-                    t_norm = normalize_text_for_search(txt)
-
-                    keys = set()
-                    keys |= find_keys_in_text(A, t_norm)
-                    keys |= find_keys_in_text(A, base_norm)
-                    matched_displays = sorted(map_keys_to_displays(keys, key_to_display))
-                    update_cache_entry(dst_dir, cache, p, h12, matched_displays)
-
-                if matched_displays:
-                    for d in matched_displays:
-                        files_by_collab.setdefault(d, []).append(p)
-                    plan[p] = matched_displays[:]
-                else:
-                    files_no_match.append(p)
+            def _lookup_cached(item: Union[str, FileEntry]):
+                p = entry_path(item)
+                if prev is not None and p in prev.scanned:
+                    metrics.count("journal_hits")
+                    return prev.scanned[p]
+                with metrics.stage("cache_validation"):
+                    unchanged = is_unchanged(p, cache, mode=validation,
+                                             entry=item if isinstance(item, FileEntry) else None)
+                cached = get_cached_names(p, cache, fuzzy, budget.key()) if unchanged else None
+                if cached is not None:
+                    metrics.count("cache_hits")
+                    return cached
+                metrics.count("cache_misses")
+                return None
+
+            phase1_started = time.monotonic()
+            if workers > 1:
+                self.ui.ui_log(f"Leitura em paralelo com {workers} processos.")
+            results = iter_scan_results(
+                entries, canon_by_disp,
+                names=compiled,
+                names_path=compiled_path,
+                workers=workers,
+                budget=budget,
+                extractor=extractor,
+                lookup_cached=_lookup_cached,
+                cancel_event=self._cancel,
+                wait_if_paused=self._wait_if_paused,
+            )
+            shown_total, shown_at = scan.found, 0.0
+            consumed = False
+            try:
+                for idx, res in enumerate(results, 1):
+                    if self._cancel.is_set(): break
+                    p = res.path
+                    # o total cresce enquanto a varredura anda ("+" até ela terminar)
+                    finished = scan.finished
+                    now = time.monotonic()
+                    if scan.found != shown_total and (finished or now - shown_at >= SCAN_TOTAL_REFRESH_S):
+                        shown_total, shown_at = scan.found, now
+                        self.ui.ui_set_progress_total(max(1, shown_total))
+                        self.ui.ui_set_progress(idx - 1)
+                    self.ui.ui_log(f"[{idx}/{scan.found}{'' if finished else '+'}] Lendo: {os.path.basename(p)}")
+
+                    if res.error:
+                        self.ui.ui_log(f"[ERRO] {os.path.basename(p)}: {res.error}")
+                        metrics.count("scan_errors")
+                    else:
+                        metrics.record_scan_timings(p, res.timings)
+                        from_journal = prev is not None and p in prev.scanned
+                        if not res.cached:
+                            update_cache_entry(dst_dir, cache, p, res.first2_hash, res.names, res.sources,
+                                               res.fuzzy if fuzzy else None, budget.key(),
+                                               res.backend if res.backend != DEFAULT_BACKEND else None,
+                                               file_info=res.file_info)
+                        elif from_journal:
+                            res.sources = prev.sources.get(p, {})
+                            res.fuzzy = prev.fuzzy.get(p, [])
+                        else:
+                            res.sources = {n: src for n, src in get_cached_sources(p, cache).items()
+                                           if n in res.names}
+                            res.fuzzy = get_cached_fuzzy(p, cache) if fuzzy else []
+                        if not from_journal:
+                            journal.record_scan(p, res.names, res.sources, res.fuzzy)
+                    matched_displays = res.names
+
+                    if matched_displays:
+                        sources_by_pdf[p] = res.sources
+                        if res.fuzzy:
+                            fuzzy_by_pdf[p] = res.fuzzy
+                        for d in matched_displays:
+                            files_by_collab.setdefault(d, []).append(p)
+                        plan[p] = matched_displays[:]
+                        if res.entry is not None:
+                            entry_by_pdf[p] = res.entry
+                        if pipeline is not None:
+                            left = [c for c in matched_displays if (p, c) not in done_pairs]
+                            if left:
+                                pipeline.submit(p, left, res.entry)
+                    else:
+                        files_no_match.append(p)
 
-                self.ui.ui_step()
+                    self.ui.ui_step()
+                consumed = True
+            finally:
+                results.close()
+                timed_scan.close()
+                # erro ou cancelamento no meio da leitura: as threads de cópia não ficam para trás
+                # (as cópias já feitas ficam no diário)
+                if pipeline is not None and (not consumed or self._cancel.is_set()):
+                    pipeline.close()
+            metrics.set("scan_dirs", scan.dirs)
+            metrics.set("scan_dir_errors", scan.errors)
+            if scan.errors:
+                self.ui.ui_log(f"[AVISO] {scan.errors} pasta(s) da origem não puderam ser listadas.")
 
             save_cache(dst_dir, cache)
+            close_cache(dst_dir)
+            metrics.phase("fase1_leitura", time.monotonic() - phase1_started)
 
             if self._cancel.is_set():
-                self.ui.ui_log("Cancelado antes das cópias.")
+                self.ui.ui_log("Cancelado antes das cópias. Use 'Retomar' para continuar de onde parou.")
                 if clear_cache:
                     try:
                         purge_cache(dst_dir)
@@ -128,76 +466,90 @@ class Controller:
                         pass
                 else:
                     self.ui.ui_log("Cache mantido conforme preferência do usuário.")
-                self.ui.ui_on_finish(None)
+                self.summary = {"status": "cancelled", "phase": "scan", "pdfs": scan.found,
+                                "elapsed_s": round(time.monotonic() - started, 3),
+                                "metrics": self._write_metrics(metrics, log_path)}
+                self.ui.ui_on_finish(None, resumable=True)
                 return
 
             # -------- Fase 2: cópias/links --------
+            phase2_started = time.monotonic()
+            journal.record_plan(plan)
             total_copy_ops = sum(len(v) for v in plan.values())
-            self.ui.ui_log(f"Iniciando cópias/links ({total_copy_ops} destinos)…")
-            self.ui.ui_set_progress_total(max(1, total_copy_ops))
+            if pipeline is not None:
+                self.ui.ui_log(f"Concluindo cópias/links ({total_copy_ops} destinos)…")
+            else:
+                self.ui.ui_log(f"Iniciando cópias/links ({total_copy_ops} destinos)…")
+
+            if done_pairs:
+                self.ui.ui_log(f"{len(done_pairs)} destinos já resolvidos na execução anterior.")
 
-            result = copy_plan(plan, dst_dir, max_workers=2, cancel_event=self._cancel)
+            for p, res in done.items():
+                if p in plan:
+                    for ev in result_events(p, res):
+                        tracker.add(ev)
+
+            # a partir daqui cada cópia avança a barra (também as que o pipeline ainda termina)
+            progress.start(total_copy_ops)
+            if pipeline is not None:
+                pipeline.close()
+            else:
+                pending_plan: Dict[str, List[str]] = {}
+                for p, collabs in plan.items():
+                    left = [c for c in collabs if (p, c) not in done_pairs]
+                    if left:
+                        pending_plan[p] = left
+                for ev in iter_copy_events(pending_plan, dst_dir, cancel_event=self._cancel,
+                                           metrics=metrics, placement=placement, entries=entry_by_pdf):
+                    progress.add(ev)
+                    journal.record_copy(ev.pdf_path, ev.as_result())
+            self.ui.ui_set_progress(tracker.count)
             cancelled_during_copy = self._cancel.is_set()
-            conflicts = 0
-            created_map = {}
-            reason_map = {}
-            progress = 0
-
-            # Também montamos o manifest (linhas planas)
-            manifest_rows: List[Dict[str, str]] = []
-
-            for pdf_path, res in result.items():
-                src_name = os.path.basename(pdf_path)
-                for collab, created_path in res.get("created", []):
-                    created_map[(collab, pdf_path)] = created_path
-                    manifest_rows.append({
-                        "source_path": pdf_path,
-                        "source_name": src_name,
-                        "collaborator": collab,
-                        "created_path": created_path,
-                        "created_name": os.path.basename(created_path),
-                        "status": "created",
-                    })
-                    progress += 1
-                    self.ui.ui_step()
-                for collab, reason in res.get("skipped", []):
-                    if reason != "cancelled":
-                        conflicts += 1
-                    reason_map[(collab, pdf_path)] = reason
-                    manifest_rows.append({
-                        "source_path": pdf_path,
-                        "source_name": src_name,
-                        "collaborator": collab,
-                        "created_path": "",
-                        "created_name": "",
-                        "status": f"skipped:{reason}",
-                    })
-                    progress += 1
-                    self.ui.ui_step()
+            metrics.phase("fase2_copias", time.monotonic() - phase2_started)
 
-            # -------- Monta linhas do relatório --------
-            rows = []
-            not_found_collabs = []
-            for collab in names:
-                pdfs = files_by_collab.get(collab, [])
-                if not pdfs:
-                    not_found_collabs.append(collab)
-                else:
-                    for pdf_path in pdfs:
-                        rows.append({
+            method_counts = tracker.method_counts
+            conflicts = tracker.conflicts
+
+            # -------- Linhas do relatório (geradas na gravação, com o resultado lido do spool) --------
+            not_found_collabs = [collab for collab in names if not files_by_collab.get(collab)]
+            n_rows = sum(len(pdfs) for pdfs in files_by_collab.values())
+
+            def _report_rows() -> Iterator[Dict[str, str]]:
+                for collab in names:
+                    for pdf_path in files_by_collab.get(collab, []):
+                        created_path, status = tracker.outcome(collab, pdf_path)
+                        yield {
                             "collaborator": collab,
                             "source_path": pdf_path,
-                            "created_path": created_map.get((collab, pdf_path), ""),
-                            "status": reason_map.get((collab, pdf_path), "created"),
-                        })
+                            "created_path": created_path,
+                            "status": status,
+                            "found_in": sources_by_pdf.get(pdf_path, {}).get(collab, ""),
+                            "match": "aproximada" if collab in fuzzy_by_pdf.get(pdf_path, ()) else "exata",
+                        }
 
             # -------- Atualiza contadores --------
             found = sum(1 for collab in names if files_by_collab.get(collab))
-            self.ui.ui_set_counts(total=len(pdf_paths), colabs=len(names),
+            self.ui.ui_set_counts(total=scan.found, colabs=len(names),
                                   found=found, nomatch=len(files_no_match), conflicts=conflicts)
+            self.summary = {
+                "status": "running",
+                "pdfs": scan.found,
+                "collaborators": len(names),
+                "collaborators_found": found,
+                "collaborators_not_found": len(not_found_collabs),
+                "pdfs_no_match": len(files_no_match),
+                "copy_ops": total_copy_ops,
+                "created": tracker.created_count(),
+                "conflicts": conflicts,
+                "placement": placement,
+                "placement_methods": method_counts,
+            }
+            if method_counts:
+                self.ui.ui_log("Destinos por método (" + placement + "): " +
+                               ", ".join(f"{m}={n}" for m, n in sorted(method_counts.items())))
 
             if cancelled_during_copy:
-                self.ui.ui_log("Cancelado durante as cópias.")
+                self.ui.ui_log("Cancelado durante as cópias. Use 'Retomar' para continuar de onde parou.")
                 if clear_cache:
                     try:
                         purge_cache(dst_dir)
@@ -206,7 +558,10 @@ class Controller:
                         pass
                 else:
                     self.ui.ui_log("Cache mantido conforme preferência do usuário.")
-                self.ui.ui_on_finish(None)
+                self.summary.update(status="cancelled", phase="copy",
+                                    elapsed_s=round(time.monotonic() - started, 3),
+                                    metrics=self._write_metrics(metrics, log_path))
+                self.ui.ui_on_finish(None, resumable=True)
                 return
 
             # -------- Relatório --------
@@ -214,17 +569,26 @@ class Controller:
             
             if report_path:                
                 try:
+                    # a aba "métricas" não inclui o próprio relatório (esse tempo vai só no JSON)
+                    with metrics.stage("report", items=n_rows + tracker.count):
                         final_report = write_distribution_report(
                             report_path=report_path,
                             collaborators=names,
-                            rows=rows,
+                            rows=_report_rows(),
                             not_found_collabs=not_found_collabs,
                             files_no_match=files_no_match,
-                            manifest_rows=manifest_rows,
+                            manifest_rows=tracker.manifest_rows(),
+                            metrics_rows=metrics.sheet_rows(),
                         )
-                        self.ui.ui_log(f"Relatório salvo em: {final_report}")
+                    self.ui.ui_log(f"Relatório salvo em: {final_report}")
+                    fmt = report_format(final_report)
+                    if fmt != "xlsx":
+                        base = os.path.splitext(final_report)[0]
+                        self.ui.ui_log(f"Demais abas em: {base}_sem_match.{fmt}, {base}_log.{fmt}, {base}_metricas.{fmt}")
                 except Exception as e:
                         self.ui.ui_log(f"[ERRO] Falha ao salvar relatório: {e}")
+                        self.summary["report_error"] = str(e)
+            self.summary["report"] = final_report
 
             # -------- Purga cache ao final --------
             if clear_cache:
@@ -236,22 +600,44 @@ class Controller:
             else:
                 self.ui.ui_log("Cache mantido conforme preferência do usuário.")
 
+            journal.finish()
+            self.summary.update(status="ok", elapsed_s=round(time.monotonic() - started, 3))
+            self.summary["metrics"] = self._write_metrics(metrics, final_report or log_path)
             self.ui.ui_on_finish(final_report)
 
         except Exception as e:
             self.ui.ui_log(f"[ERRO FATAL] {e}")
+            if pipeline is not None:
+                try:
+                    pipeline.close()   # antes de purgar: as cópias usam o índice do destino
+                except Exception:
+                    pass
             # tentativa de purgar cache mesmo em falha
             try:
                 if not dst_dir:
                     _, _, dst_dir = self.ui.get_paths()
+                if dst_dir:
+                    close_cache(dst_dir)
                 if clear_cache and dst_dir:
                     purge_cache(dst_dir)
             except Exception:
                 pass
-            self.ui.ui_on_finish(None)
+            self.summary = {"status": "error", "error": str(e),
+                            "elapsed_s": round(time.monotonic() - started, 3)}
+            self.ui.ui_on_finish(None, resumable=journal is not None)
+        finally:
+            if pipeline is not None:
+                pipeline.close()
+            if tracker is not None:
+                tracker.close()
+            if journal is not None:
+                journal.close()
 
 # --------- bootstrap ---------
 if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()  # pool de leitura no executável congelado (Windows)
+    from ui import App
     app = App()
     Controller(app).bind()
     app.mainloop()
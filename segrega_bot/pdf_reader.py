@@ -1,56 +1,294 @@
-# Extrai texto só das páginas 1–3, com pdfminer e fallback em pypdf.
-from typing import Tuple, Iterable
+# Extrai texto só das primeiras páginas (1–3 por padrão), com pdfminer e fallback em pypdf;
+# página a página, para quem pode parar antes (scan_engine, orçamento de páginas).
+# pdfminer e pypdf são importados só na primeira extração (startup rápido).
+# Todas as funções aceitam o caminho ou um DocumentHandle já aberto (doc_handle):
+# com o handle, backends, fallback e /Producer leem o mesmo buffer mapeado.
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from contextlib import ExitStack
+from io import StringIO
 import logging
+import hashlib
+import re
+import time
 
-# silencia pdfminer verboso
-for name in ("pdfminer", "pdfminer.pdfinterp", "pdfminer.pdfpage",
-             "pdfminer.psparser", "pdfminer.pdftypes", "pdfminer.layout"):
-    logging.getLogger(name).setLevel(logging.ERROR)
+from doc_handle import DocumentHandle, open_stream
 
-from pdfminer.high_level import extract_text
-import hashlib
+Source = Union[str, DocumentHandle]
+
+_loggers_quiet = False
+
+def _quiet_pdfminer_logs() -> None:
+    """Silencia o pdfminer verboso (uma vez, junto com o primeiro import)."""
+    global _loggers_quiet
+    if _loggers_quiet:
+        return
+    for name in ("pdfminer", "pdfminer.pdfinterp", "pdfminer.pdfpage",
+                 "pdfminer.psparser", "pdfminer.pdftypes", "pdfminer.layout"):
+        logging.getLogger(name).setLevel(logging.ERROR)
+    _loggers_quiet = True
+
+# abaixo disso a página é considerada "sem texto" e tenta-se o pypdf
+MIN_PAGE_CHARS = 20
 
 def _hash_text(s: str) -> str:
     return hashlib.sha1(s.encode("utf-8", errors="ignore")).hexdigest()
 
-def _extract_text_for_pages(path: str, page_numbers: Iterable[int]) -> str:
-    pages = list(page_numbers)
-    if not pages:
-        return ""
+# ---------------- backends de extração ----------------
+# Cada backend gera o texto das primeiras páginas, uma a uma, terminando cada
+# página em '\\f'. "pdfminer" (análise de layout completa) é a referência; os
+# outros só são usados quando escolhidos ou aprovados na calibração
+# (extract_calibration), que confere que dão os mesmos matches.
+BACKEND_PDFMINER = "pdfminer"          # pdfminer com LAParams (layout)
+BACKEND_PDFMINER_RAW = "pdfminer_raw"  # pdfminer sem análise de layout
+BACKEND_PYPDF = "pypdf"
+BACKEND_PYMUPDF = "pymupdf"            # opcional (pip install pymupdf)
+BACKEND_PDFIUM = "pdfium"              # opcional (pip install pypdfium2)
+BACKENDS = (BACKEND_PDFMINER, BACKEND_PDFMINER_RAW, BACKEND_PYPDF, BACKEND_PYMUPDF, BACKEND_PDFIUM)
+DEFAULT_BACKEND = BACKEND_PDFMINER
+_BACKEND_MODULES = {
+    BACKEND_PDFMINER: "pdfminer", BACKEND_PDFMINER_RAW: "pdfminer", BACKEND_PYPDF: "pypdf",
+    BACKEND_PYMUPDF: "fitz", BACKEND_PDFIUM: "pypdfium2",
+}
+
+def available_backends() -> List[str]:
+    """Backends cuja biblioteca está instalada (sem importá-la)."""
+    from importlib.util import find_spec
+
+    return [b for b in BACKENDS if find_spec(_BACKEND_MODULES[b]) is not None]
+
+def _pdfminer_pages(src: Source, max_pages: int, layout: bool = True) -> Iterator[str]:
+    """Parse sob demanda: quem para de consumir, para o parse. Páginas como em ``extract_text``."""
+    _quiet_pdfminer_logs()
+    from pdfminer.converter import TextConverter
+    from pdfminer.layout import LAParams
+    from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+    from pdfminer.pdfpage import PDFPage
+
+    with open_stream(src) as fp, StringIO() as buf:
+        rsrcmgr = PDFResourceManager(caching=True)
+        device = TextConverter(rsrcmgr, buf, codec="utf-8", laparams=LAParams() if layout else None)
+        interpreter = PDFPageInterpreter(rsrcmgr, device)
+        for page in PDFPage.get_pages(fp, maxpages=max_pages):
+            interpreter.process_page(page)
+            text = buf.getvalue()
+            buf.seek(0)
+            buf.truncate(0)
+            yield text
+
+def _pdfminer_raw_pages(src: Source, max_pages: int) -> Iterator[str]:
+    return _pdfminer_pages(src, max_pages, layout=False)
+
+def _pypdf_pages(src: Source, max_pages: int) -> Iterator[str]:
+    from pypdf import PdfReader
+
+    with open_stream(src) as fh:
+        reader = PdfReader(fh, strict=False)
+        for idx in range(min(max_pages, len(reader.pages))):
+            try:
+                txt = reader.pages[idx].extract_text() or ""
+            except Exception:
+                txt = ""
+            yield txt + "\f" if txt.strip() else ""
+
+def _pymupdf_pages(src: Source, max_pages: int) -> Iterator[str]:
+    import fitz
+
+    opened = (fitz.open(stream=src.buffer, filetype="pdf") if isinstance(src, DocumentHandle)
+              else fitz.open(src))
+    with opened as doc:
+        for idx in range(min(max_pages, doc.page_count)):
+            yield doc[idx].get_text() + "\f"
+
+def _pdfium_pages(src: Source, max_pages: int) -> Iterator[str]:
+    import pypdfium2 as pdfium
+
+    doc = pdfium.PdfDocument(src.reader() if isinstance(src, DocumentHandle) else src)
+    try:
+        for idx in range(min(max_pages, len(doc))):
+            page = doc[idx]
+            textpage = page.get_textpage()
+            try:
+                text = textpage.get_text_range()
+            finally:
+                textpage.close()
+                page.close()
+            yield text + "\f"
+    finally:
+        doc.close()
+
+_BACKEND_PAGES = {
+    BACKEND_PDFMINER: _pdfminer_pages, BACKEND_PDFMINER_RAW: _pdfminer_raw_pages, BACKEND_PYPDF: _pypdf_pages,
+    BACKEND_PYMUPDF: _pymupdf_pages, BACKEND_PDFIUM: _pdfium_pages,
+}
+
+def _timed_pages(name: str, pages: Iterator[str], stats: Dict[str, float]) -> Iterator[str]:
+    """
+    Repassa as páginas de um backend somando em ``stats`` <nome>_s, <nome>_cpu_s e
+    <nome>_pages. Se o backend falhar no meio, só termina antes (as páginas já
+    entregues valem) e conta <nome>_failed.
+    """
+    t0, c0 = time.perf_counter(), time.thread_time()
     try:
-        txt = extract_text(path, page_numbers=pages) or ""
+        for text in pages:
+            _add_stat(stats, f"{name}_s", time.perf_counter() - t0)
+            _add_stat(stats, f"{name}_cpu_s", time.thread_time() - c0)
+            _add_stat(stats, f"{name}_pages", 1)
+            yield text
+            t0, c0 = time.perf_counter(), time.thread_time()
     except Exception:
-        txt = ""
+        _add_stat(stats, f"{name}_failed", 1)
+    finally:
+        pages.close()
+    _add_stat(stats, f"{name}_s", time.perf_counter() - t0)
+    _add_stat(stats, f"{name}_cpu_s", time.thread_time() - c0)
 
-    if len(txt.strip()) < 20:
+def _add_stat(stats: Optional[Dict[str, float]], key: str, value: float) -> None:
+    if stats is not None:
+        stats[key] = stats.get(key, 0) + value
+
+def iter_pages_text(src: Source, max_pages: int = 3, stats: Optional[Dict[str, float]] = None,
+                    backend: str = DEFAULT_BACKEND) -> Iterator[str]:
+    """
+    Texto de cada uma das primeiras ``max_pages`` páginas, uma a uma, com UM
+    parse do ``backend`` que só avança quando a próxima página é pedida.
+    Páginas com menos de MIN_PAGE_CHARS caracteres recorrem ao pypdf (aberto só
+    se alguma página precisar); se o backend falhar no meio, o pypdf segue
+    com as páginas restantes. ``stats`` (opcional) acumula tempos de parede/CPU
+    e páginas por biblioteca.
+    """
+    if max_pages <= 0:
+        return
+    if backend not in _BACKEND_PAGES:
+        raise ValueError(f"backend de extração desconhecido: {backend}")
+    reader: list = []   # [PdfReader | None], aberto na 1ª página fraca
+    owned = ExitStack()   # o arquivo que o pypdf abriu, fechado quando o gerador termina
+
+    def _pypdf(idx: int) -> Optional[str]:
+        t0, c0 = time.perf_counter(), time.thread_time()
+        if not reader:
+            try:
+                from pypdf import PdfReader
+
+                reader.append(PdfReader(owned.enter_context(open_stream(src)), strict=False))
+            except Exception:
+                reader.append(None)
+        txt = None
+        doc = reader[0]
+        if doc is not None:
+            try:
+                if idx < len(doc.pages):
+                    try:
+                        txt = doc.pages[idx].extract_text() or ""
+                    except Exception:
+                        txt = ""
+            except Exception:
+                pass
+        _add_stat(stats, "pypdf_s", time.perf_counter() - t0)
+        _add_stat(stats, "pypdf_cpu_s", time.thread_time() - c0)
+        if txt is not None:
+            _add_stat(stats, "pypdf_pages", 1)
+        return txt
+
+    stats = {} if stats is None else stats   # também é por onde se sabe se o backend falhou
+    failed_key = f"{backend}_failed"
+    failed_before = stats.get(failed_key, 0)
+    fallback = backend != BACKEND_PYPDF   # o pypdf como principal não tem a quem recorrer
+    idx = 0
+    with owned:
+        primary = _timed_pages(backend, _BACKEND_PAGES[backend](src, max_pages), stats)
         try:
-            from pypdf import PdfReader
+            for text in primary:
+                if fallback and len(text.strip()) < MIN_PAGE_CHARS:
+                    txt2 = _pypdf(idx)
+                    if txt2 is not None and len(txt2.strip()) > len(text.strip()):
+                        text = txt2 + "\f"
+                yield text
+                idx += 1
+        finally:
+            primary.close()
 
-            reader = PdfReader(path, strict=False)
-            total = len(reader.pages)
-            parts = []
-            for idx in pages:
-                if 0 <= idx < total:
-                    parts.append(reader.pages[idx].extract_text() or "")
-            txt2 = "\n".join(parts)
-            if len(txt2.strip()) > len(txt.strip()):
-                txt = txt2
-        except Exception:
-            pass
+        # parse do backend interrompido: as páginas que faltam vêm do pypdf
+        if not fallback or stats.get(failed_key, 0) == failed_before:
+            return
+        while idx < max_pages:
+            txt2 = _pypdf(idx)
+            if txt2 is None:
+                return
+            yield txt2 + "\f" if txt2.strip() else ""
+            idx += 1
 
-    return txt
+def extract_pages_text(src: Source, max_pages: int = 3, stats: Optional[Dict[str, float]] = None,
+                       backend: str = DEFAULT_BACKEND) -> List[str]:
+    """Todas as primeiras ``max_pages`` páginas de uma vez (iter_pages_text até o fim)."""
+    return list(iter_pages_text(src, max_pages, stats, backend))
+
+# ---------------- produtor (/Producer) ----------------
+# O dicionário Info costuma ficar no fim do arquivo (ou no início, se linearizado);
+# basta ler as pontas. Em object streams comprimidos não é achado ("").
+_PRODUCER_SPAN = 16 * 1024
+_PRODUCER_RE = re.compile(rb"/Producer\s*(\((?:[^()\\]|\\.)*\)|<[0-9A-Fa-f\s]*>)")
+_PDF_ESCAPES = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"b": b"\b", b"f": b"\f"}
+
+def _pdf_string(raw: bytes) -> str:
+    if raw.startswith(b"<"):
+        data = bytes.fromhex(re.sub(rb"\s", b"", raw[1:-1]).decode("ascii"))
+    else:
+        data = re.sub(rb"\\(.)", lambda m: _PDF_ESCAPES.get(m.group(1), m.group(1)), raw[1:-1], flags=re.S)
+    if data.startswith(b"\xfe\xff"):
+        return data[2:].decode("utf-16-be", "replace")
+    return data.decode("latin-1")
+
+def pdf_producer(src: Source) -> str:
+    """
+    Família do produtor do PDF: o /Producer até o primeiro dígito, minúsculo
+    ("LibreOffice 7.5" -> "libreoffice"), para agrupar versões. "" se não achar.
+    """
+    if isinstance(src, DocumentHandle):
+        return _producer_family(src.head(_PRODUCER_SPAN), src.tail(_PRODUCER_SPAN))
+    try:
+        with open(src, "rb") as f:
+            head = f.read(_PRODUCER_SPAN)
+            f.seek(0, 2)
+            size = f.tell()
+            tail = b""
+            if size > _PRODUCER_SPAN:
+                f.seek(max(_PRODUCER_SPAN, size - _PRODUCER_SPAN))
+                tail = f.read()
+    except OSError:
+        return ""
+    return _producer_family(head, tail)
+
+def _producer_family(head: bytes, tail: bytes) -> str:
+    m = _PRODUCER_RE.search(tail) or _PRODUCER_RE.search(head)
+    if m is None:
+        return ""
+    try:
+        name = _pdf_string(m.group(1))
+    except ValueError:
+        return ""
+    return re.split(r"\d", name, maxsplit=1)[0].strip(" \t\r\n;:,-_(/").lower()
+
+def first_two_pages_hash(pages: List[str]) -> str:
+    """Hash das páginas 1–2 exatamente como no texto concatenado (validação "text" do cache)."""
+    return _hash_text("".join(pages[:2]))
+
+def extract_first_pages(path: str, max_pages: int = 3,
+                        stats: Optional[Dict[str, float]] = None) -> Tuple[List[str], str]:
+    """
+    Retorna (textos_por_página, hash_p1a2) a partir de uma única extração.
+    Páginas 1–2 entram no hash exatamente como no texto concatenado.
+    """
+    pages = extract_pages_text(path, max(max_pages, 2), stats)
+    return pages[:max_pages], first_two_pages_hash(pages)
 
-def extract_first_pages_text(path: str, max_pages: int = 3) -> Tuple[str, str]:
+def extract_first_pages_text(path: str, max_pages: int = 3,
+                             stats: Optional[Dict[str, float]] = None) -> Tuple[str, str]:
     """
     Retorna (texto_p1a3, hash_p1a2) – ambos já como string (sem normalizar aqui).
     """
-    pages = [i for i in range(max_pages)]
-    txt = _extract_text_for_pages(path, pages)
-    txt12 = _extract_text_for_pages(path, [0, 1])
-    h12 = _hash_text(txt12)
-    return txt, h12
+    pages, h12 = extract_first_pages(path, max_pages, stats)
+    return "".join(pages), h12
 
-def extract_first_two_pages_hash(path: str) -> str:
-    """Retorna hash (SHA-1) do texto das duas primeiras páginas."""
-    txt12 = _extract_text_for_pages(path, [0, 1])
-    return _hash_text(txt12)
+def extract_first_two_pages_hash(src: Source, backend: str = DEFAULT_BACKEND) -> str:
+    """Retorna hash (SHA-1) do texto das duas primeiras páginas (pelo backend que gerou o do cache)."""
+    return first_two_pages_hash(extract_pages_text(src, 2, backend=backend))
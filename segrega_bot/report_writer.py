@@ -1,12 +1,49 @@
 # report_writer.py
-from typing import List, Optional, Dict
-from openpyxl import Workbook
-from openpyxl.utils import get_column_letter
+# openpyxl (e pyarrow, para parquet) só é importado quando um relatório é de fato gravado.
+from itertools import chain, islice
+from typing import Any, Iterable, Iterator, List, Optional, Dict, Tuple, TYPE_CHECKING
+import csv
+import json
 import os
 
-def _autosize(ws):
-    widths = {}
-    for row in ws.iter_rows(values_only=True):
+if TYPE_CHECKING:
+    from openpyxl import Workbook
+
+# Formatos do relatório; o formato sai da extensão do caminho (relatorio.csv -> csv).
+# Fora do xlsx cada aba vira um arquivo: <base>.<ext> (principal), <base>_sem_match.<ext>,
+# <base>_log.<ext> e <base>_metricas.<ext>.
+REPORT_FORMATS = ("xlsx", "csv", "jsonl", "parquet")
+DEFAULT_FORMAT = "xlsx"
+
+# Modo write_only do openpyxl: as linhas vão direto para o arquivo, mas as larguras
+# das colunas precisam ser definidas antes da primeira linha. Por isso elas saem
+# de uma amostra do início da aba, e a memória não cresce com o número de linhas.
+WIDTH_SAMPLE_ROWS = 1000
+# limite do Excel por aba (cabeçalho incluso); acima disso a aba continua em "<nome> (2)"…
+XLSX_MAX_ROWS = 1_048_576
+PARQUET_BATCH_ROWS = 65_536
+CSV_DELIMITER = ";"   # mesmo separador do manifest.csv do gerador (Excel pt-BR)
+
+MANIFEST_HEADERS = ["source_path", "source_name", "collaborator", "created_path", "created_name", "status", "method"]
+
+# (título da aba no xlsx, sufixo do arquivo nos outros formatos)
+SHEET_MAIN = ("Relatório de Distribuição", "")
+SHEET_NO_MATCH = ("PDFs Sem Match", "_sem_match")
+SHEET_LOG = ("log", "_log")
+SHEET_METRICS = ("métricas", "_metricas")
+
+
+def report_format(report_path: str) -> str:
+    ext = os.path.splitext(report_path)[1].lower().lstrip(".")
+    return ext if ext in REPORT_FORMATS else DEFAULT_FORMAT
+
+
+# ---------------- xlsx ----------------
+def _set_widths(ws, sample: List[list]):
+    from openpyxl.utils import get_column_letter
+
+    widths: Dict[int, int] = {}
+    for row in sample:
         for i, cell in enumerate(row, start=1):
             txt = "" if cell is None else str(cell)
             widths[i] = max(widths.get(i, 0), len(txt))
@@ -14,76 +51,172 @@ def _autosize(ws):
         ws.column_dimensions[get_column_letter(col)].width = min(max(12, w + 2), 80)
 
 
-def _append_manifest_sheet_from_rows(wb: Workbook, manifest_rows: Optional[List[Dict[str, str]]]):
-    if not manifest_rows:
-        return
-    ws = wb.create_sheet("log")
-    headers = ["source_path", "source_name", "collaborator", "created_path", "created_name", "status"]
-    ws.append(headers)
-    for r in manifest_rows:
-        ws.append([
-            r.get("source_path", ""),
-            r.get("source_name", ""),
-            r.get("collaborator", ""),
-            r.get("created_path", ""),
-            r.get("created_name", ""),
-            r.get("status", ""),
-        ])
-    _autosize(ws)
-
-
-def write_distribution_report(
-    report_path: Optional[str],
-    collaborators: List[str],
-    rows: List[dict],
-    not_found_collabs: List[str],
-    files_no_match: List[str],
-    manifest_rows: Optional[List[Dict[str, str]]] = None,  # <— agora recebe o manifest em memória
-) -> Optional[str]:
+def _write_sheet(wb: "Workbook", title: str, headers: List[str], rows: Iterable[list]) -> int:
     """
-    rows: lista de dicts com:
-      - collaborator: str
-      - source_path: str
-      - created_path: str  (pode ser "" quando houve match mas não criou destino)
+    Cria a aba e grava ``rows`` em streaming; retorna quantas linhas (sem o cabeçalho).
+    Passando de XLSX_MAX_ROWS, continua em "<título> (2)", "(3)"… com o mesmo cabeçalho.
     """
-    if not report_path:
-        return None
-
-    os.makedirs(os.path.dirname(report_path) or ".", exist_ok=True)
-
-    wb = Workbook()
-
-    # Aba principal
-    ws = wb.active
-    ws.title = "Relatório de Distribuição"
-    ws.append(["Colaborador", "Documento (origem)", "Arquivo criado", "Caminho do arquivo criado", "Status"])
-
+    it = iter(rows)
+    per_sheet = XLSX_MAX_ROWS - 1
+    total, part = 0, 1
+    while True:
+        head = list(islice(it, min(WIDTH_SAMPLE_ROWS, per_sheet)))
+        if part > 1 and not head:
+            return total
+        ws = wb.create_sheet(title if part == 1 else f"{title} ({part})")
+        _set_widths(ws, [headers] + head)
+        ws.append(headers)
+        for r in head:
+            ws.append(r)
+        n = len(head)
+        for r in islice(it, per_sheet - n):
+            ws.append(r)
+            n += 1
+        total += n
+        if n < per_sheet:
+            return total
+        part += 1
+
+
+# ---------------- csv / jsonl / parquet ----------------
+def _write_csv(path: str, headers: List[str], rows: Iterable[list]) -> int:
+    n = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f, delimiter=CSV_DELIMITER)
+        w.writerow(headers)
+        for r in rows:
+            w.writerow(r)
+            n += 1
+    return n
+
+
+def _write_jsonl(path: str, headers: List[str], rows: Iterable[list]) -> int:
+    n = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for r in rows:
+            f.write(json.dumps(dict(zip(headers, r)), ensure_ascii=False))
+            f.write("\n")
+            n += 1
+    return n
+
+
+def _write_parquet(path: str, headers: List[str], rows: Iterable[list]) -> int:
+    """Grava em lotes de PARQUET_BATCH_ROWS; tipos inferidos do 1º lote (texto se vazio)."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("o formato parquet requer o pacote pyarrow (pip install pyarrow)")
+
+    it = iter(rows)
+    writer = None
+    n = 0
+    try:
+        while True:
+            batch = list(islice(it, PARQUET_BATCH_ROWS))
+            if not batch and writer is not None:
+                break
+            cols = {h: [r[i] for r in batch] for i, h in enumerate(headers)}
+            if writer is None:
+                schema = (pa.Table.from_pydict(cols).schema if batch
+                          else pa.schema([(h, pa.string()) for h in headers]))
+                writer = pq.ParquetWriter(path, schema)
+            writer.write_table(pa.Table.from_pydict(cols, schema=writer.schema))
+            n += len(batch)
+            if len(batch) < PARQUET_BATCH_ROWS:
+                break
+    finally:
+        if writer is not None:
+            writer.close()
+    return n
+
+
+_FILE_WRITERS = {"csv": _write_csv, "jsonl": _write_jsonl, "parquet": _write_parquet}
+
+
+# ---------------- linhas das abas ----------------
+def _main_rows(rows: Iterable[dict], not_found_collabs: Iterable[str]) -> Iterator[List[Any]]:
     for r in rows:
         collab = r.get("collaborator", "")
         src = r.get("source_path", "")
         dst = r.get("created_path", "")
         status = r.get("status", "")
+        found_in = r.get("found_in", "")
+        match = r.get("match", "")
 
         src_name = os.path.basename(src) if src else ""
         created_name = os.path.basename(dst) if dst else "-"
         created_path_out = dst if dst else "-"
 
-        ws.append([collab, src_name, created_name, created_path_out, status])
+        yield [collab, src_name, created_name, created_path_out, status, found_in, match]
 
     for collab in not_found_collabs:
-        ws.append([collab, "colaborador não localizado", "-", "-", ""])
+        yield [collab, "colaborador não localizado", "-", "-", "", "", ""]
 
-    _autosize(ws)
 
-    # Aba PDFs Sem Match
-    ws2 = wb.create_sheet("PDFs Sem Match")
-    ws2.append(["Nome do arquivo", "Local"])
-    for p in sorted(files_no_match):
-        ws2.append([os.path.basename(p), p])
-    _autosize(ws2)
+def _manifest_rows(manifest_rows: Iterable[Dict[str, str]]) -> Iterator[List[str]]:
+    for r in manifest_rows:
+        yield [r.get(h, "") for h in MANIFEST_HEADERS]
+
+
+def _sheets(rows, not_found_collabs, files_no_match, manifest_rows, metrics_rows
+            ) -> Iterator[Tuple[Tuple[str, str], List[str], Iterable[list]]]:
+    """(aba, cabeçalho, linhas) na ordem do relatório; log e métricas só se houver linhas."""
+    yield (SHEET_MAIN,
+           ["Colaborador", "Documento (origem)", "Arquivo criado", "Caminho do arquivo criado", "Status",
+            "Encontrado em", "Correspondência"],
+           _main_rows(rows, not_found_collabs))
+    yield (SHEET_NO_MATCH, ["Nome do arquivo", "Local"],
+           ([os.path.basename(p), p] for p in sorted(files_no_match)))
+    if manifest_rows is not None:
+        it = iter(manifest_rows)
+        first = next(it, None)
+        if first is not None:
+            yield SHEET_LOG, MANIFEST_HEADERS, _manifest_rows(chain([first], it))
+    if metrics_rows:
+        yield SHEET_METRICS, ["Seção", "Métrica", "Valor", "Detalhe"], (list(r) for r in metrics_rows)
 
-    # Aba manifest (em memória)
-    _append_manifest_sheet_from_rows(wb, manifest_rows)
 
-    wb.save(report_path)
-    return report_path
+def write_distribution_report(
+    report_path: Optional[str],
+    collaborators: List[str],
+    rows: Iterable[dict],
+    not_found_collabs: List[str],
+    files_no_match: Iterable[str],
+    manifest_rows: Optional[Iterable[Dict[str, str]]] = None,  # manifest em memória ou iterador
+    metrics_rows: Optional[List[list]] = None,                 # aba "métricas" (RunMetrics.sheet_rows)
+    fmt: Optional[str] = None,                                 # REPORT_FORMATS; None = pela extensão
+) -> Optional[str]:
+    """
+    rows: dicts (lista ou iterador, consumido uma vez) com:
+      - collaborator: str
+      - source_path: str
+      - created_path: str  (pode ser "" quando houve match mas não criou destino)
+      - found_in: str      (opcional: "p. N" ou "nome do arquivo")
+      - match: str         (opcional: "exata" ou "aproximada")
+    Tudo é gravado em streaming: memória constante qualquer que seja o tamanho da execução.
+    Retorna ``report_path`` (no xlsx, o arquivo; nos demais, o arquivo da aba principal).
+    """
+    if not report_path:
+        return None
+
+    fmt = fmt or report_format(report_path)
+    if fmt not in REPORT_FORMATS:
+        raise ValueError(f"formato de relatório desconhecido: {fmt}")
+    os.makedirs(os.path.dirname(report_path) or ".", exist_ok=True)
+    sheets = _sheets(rows, not_found_collabs, files_no_match, manifest_rows, metrics_rows)
+
+    if fmt == "xlsx":
+        from openpyxl import Workbook
+
+        wb = Workbook(write_only=True)
+        for (title, _suffix), headers, sheet_rows in sheets:
+            _write_sheet(wb, title, headers, sheet_rows)
+        wb.save(report_path)
+        return report_path
+
+    write = _FILE_WRITERS[fmt]
+    base, _ext = os.path.splitext(report_path)
+    for (_title, suffix), headers, sheet_rows in sheets:
+        write(f"{base}{suffix}.{fmt}", headers, sheet_rows)
+    return f"{base}.{fmt}"
@@ -0,0 +1,160 @@
+# Diário (checkpoint) da execução: permite retomar uma distribuição interrompida.
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+JOURNAL_NAME = ".distcolab_journal.jsonl"
+
+# fsync em lote: a cada N registros ou T segundos (flush() vai a cada registro)
+FSYNC_EVERY = 200
+FSYNC_INTERVAL_S = 2.0
+
+
+def journal_path(out_root: str) -> str:
+    return os.path.join(out_root, JOURNAL_NAME)
+
+
+@dataclass
+class JournalState:
+    """O que uma execução anterior já concluiu, reconstruído do diário."""
+    params: Dict[str, Any] = field(default_factory=dict)
+    scanned: Dict[str, List[str]] = field(default_factory=dict)   # pdf -> nomes
+    sources: Dict[str, Dict[str, str]] = field(default_factory=dict)   # pdf -> {nome: origem}
+    fuzzy: Dict[str, List[str]] = field(default_factory=dict)   # pdf -> nomes só da busca aproximada
+    plan: Optional[Dict[str, List[str]]] = None
+    # pdf -> {"created": [(collab, path)], "skipped": [(collab, reason)], "methods": {path: método}}
+    copies: Dict[str, Dict[str, List[Tuple[str, str]]]] = field(default_factory=dict)
+
+    def matches(self, params: Dict[str, Any]) -> bool:
+        return all(self.params.get(k) == v for k, v in params.items())
+
+    def completed_copies(self) -> Dict[str, Dict[str, List[Tuple[str, str]]]]:
+        """
+        Operações de cópia já resolvidas (criadas ou puladas de forma definitiva).
+        Canceladas e falhas de cópia ficam de fora para serem refeitas.
+        """
+        out: Dict[str, Dict[str, List[Tuple[str, str]]]] = {}
+        for pdf, res in self.copies.items():
+            created = list(res.get("created", []))
+            skipped = [(c, r) for c, r in res.get("skipped", [])
+                       if r != "cancelled" and not r.startswith("copy_failed")]
+            if created or skipped:
+                out[pdf] = {"created": created, "skipped": skipped, "methods": dict(res.get("methods", {}))}
+        return out
+
+
+def load_journal(out_root: str) -> Optional[JournalState]:
+    """Lê o diário da pasta destino; None se não houver execução pendente."""
+    p = journal_path(out_root)
+    if not os.path.exists(p):
+        return None
+    state = JournalState()
+    try:
+        with open(p, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue   # linha truncada por uma queda
+                kind = rec.get("type")
+                if kind == "start":
+                    state.params = rec.get("params", {})
+                elif kind == "scan":
+                    state.scanned[rec["path"]] = list(rec.get("names", []))
+                    if rec.get("sources"):
+                        state.sources[rec["path"]] = dict(rec["sources"])
+                    if rec.get("fuzzy"):
+                        state.fuzzy[rec["path"]] = list(rec["fuzzy"])
+                elif kind == "plan":
+                    state.plan = rec.get("plan", {})
+                elif kind == "copy":
+                    res = state.copies.setdefault(rec["pdf"], {"created": [], "skipped": [], "methods": {}})
+                    res[rec["status"]].append((rec["collab"], rec["value"]))
+                    if rec.get("method"):
+                        res["methods"][rec["value"]] = rec["method"]
+    except OSError:
+        return None
+    return state
+
+
+def _ends_without_newline(path: str) -> bool:
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return False
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+    except OSError:
+        return False
+
+
+class RunJournal:
+    """Diário append-only em JSON Lines, gravado na pasta destino (thread-safe)."""
+
+    def __init__(self, out_root: str, params: Dict[str, Any], resume: bool = False):
+        self.path = journal_path(out_root)
+        needs_newline = resume and _ends_without_newline(self.path)
+        self._f = open(self.path, "a" if resume else "w", encoding="utf-8")
+        if needs_newline:
+            self._f.write("\n")
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        if not resume:
+            self._write({"type": "start", "params": params, "ts": time.time()}, sync=True)
+
+    def _write(self, rec: Dict[str, Any], sync: bool = False) -> None:
+        line = json.dumps(rec, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._f.write(line)
+            self._f.flush()
+            self._unsynced += 1
+            if (sync or self._unsynced >= FSYNC_EVERY
+                    or time.monotonic() - self._last_sync >= FSYNC_INTERVAL_S):
+                os.fsync(self._f.fileno())
+                self._unsynced = 0
+                self._last_sync = time.monotonic()
+
+    def record_scan(self, pdf_path: str, names: List[str], sources: Optional[Dict[str, str]] = None,
+                    fuzzy: Optional[List[str]] = None) -> None:
+        rec: Dict[str, Any] = {"type": "scan", "path": pdf_path, "names": names}
+        if sources:
+            rec["sources"] = sources
+        if fuzzy:
+            rec["fuzzy"] = fuzzy
+        self._write(rec)
+
+    def record_plan(self, plan: Dict[str, List[str]]) -> None:
+        self._write({"type": "plan", "plan": plan}, sync=True)
+
+    def record_copy(self, pdf_path: str, res: Dict[str, List[Tuple[str, str]]]) -> None:
+        methods = res.get("methods", {})
+        for collab, created_path in res.get("created", []):
+            self._write({"type": "copy", "pdf": pdf_path, "collab": collab,
+                         "status": "created", "value": created_path,
+                         "method": methods.get(created_path, "")})
+        for collab, reason in res.get("skipped", []):
+            self._write({"type": "copy", "pdf": pdf_path, "collab": collab,
+                         "status": "skipped", "value": reason})
+
+    def close(self) -> None:
+        with self._lock:
+            if self._f.closed:
+                return
+            try:
+                self._f.flush()
+                os.fsync(self._f.fileno())
+            finally:
+                self._f.close()
+
+    def finish(self) -> None:
+        """Execução concluída: o diário não é mais necessário."""
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
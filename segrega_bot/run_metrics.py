@@ -0,0 +1,174 @@
+# run_metrics.py
+# Instrumentação de uma execução: tempo (parede/CPU) e contagem por etapa,
+# contadores avulsos e latência por arquivo da extração (percentis + mais lentos).
+# Vai para a aba "métricas" do relatório e para um JSON ao lado dele.
+import heapq
+import json
+import os
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# etapas na ordem em que aparecem na aba/JSON
+STAGES = [
+    ("scan_pdfs", "Varredura da pasta de origem"),
+    ("cache_validation", "Validação do cache"),
+    ("names_automaton", "Autômato de nomes (compilação/carga)"),
+    ("calibration", "Calibração dos extratores"),
+    ("extract_pdfminer", "Extração (pdfminer)"),
+    ("extract_pdfminer_raw", "Extração (pdfminer sem layout)"),
+    ("extract_pymupdf", "Extração (PyMuPDF)"),
+    ("extract_pdfium", "Extração (pdfium)"),
+    ("extract_pypdf", "Extração (pypdf, principal ou fallback)"),
+    ("normalize", "Normalização do texto"),
+    ("search", "Busca (Aho–Corasick)"),
+    ("conflict_resolution", "Resolução de conflitos no destino"),
+    ("link_copy", "Link/cópia"),
+    ("report", "Relatório"),
+]
+
+PERCENTILES = (50, 90, 99)
+SLOWEST_KEPT = 20
+
+
+def _percentile(sorted_vals, p: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    k = (len(sorted_vals) - 1) * p / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (k - lo)
+
+
+class RunMetrics:
+    """Acumuladores thread-safe; tempos de processos do pool entram via add()."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[str, int] = {}
+        self.phases: Dict[str, float] = {}
+        self._latencies = array("d")                       # extração por arquivo (s)
+        self._slowest: List[Tuple[float, str]] = []         # heap mínimo dos mais lentos
+        self.started = time.time()
+
+    def add(self, stage: str, wall: float, cpu: float = 0.0, items: int = 1) -> None:
+        with self._lock:
+            s = self.stages.setdefault(stage, {"wall_s": 0.0, "cpu_s": 0.0, "items": 0})
+            s["wall_s"] += wall
+            s["cpu_s"] += cpu
+            s["items"] += items
+
+    @contextmanager
+    def stage(self, stage: str, items: int = 1) -> Iterator[Dict[str, int]]:
+        """Mede o bloco na thread atual (CPU = thread_time); o bloco pode ajustar ["items"]."""
+        info = {"items": items}
+        t0, c0 = time.perf_counter(), time.thread_time()
+        try:
+            yield info
+        finally:
+            self.add(stage, time.perf_counter() - t0, time.thread_time() - c0, info["items"])
+
+    def record_scan_timings(self, path: str, timings: Dict[str, float]) -> None:
+        """Incorpora os tempos de um ScanResult (medidos no processo que extraiu)."""
+        if not timings:
+            return
+        if "pdfminer_s" in timings:
+            self.add("extract_pdfminer", timings["pdfminer_s"], timings.get("pdfminer_cpu_s", 0.0))
+        for lib in ("pdfminer_raw", "pymupdf", "pdfium"):   # outros backends (pdf_reader.BACKENDS)
+            if f"{lib}_s" in timings:
+                self.add(f"extract_{lib}", timings[f"{lib}_s"], timings.get(f"{lib}_cpu_s", 0.0))
+        if "pypdf_s" in timings:
+            self.add("extract_pypdf", timings["pypdf_s"], timings.get("pypdf_cpu_s", 0.0),
+                     int(timings.get("pypdf_pages", 0)))
+            self.count("pypdf_files")
+        self.add("normalize", timings.get("normalize_s", 0.0), timings.get("normalize_cpu_s", 0.0))
+        self.add("search", timings.get("search_s", 0.0), timings.get("search_cpu_s", 0.0))
+        for key in ("pdfminer_pages", "pypdf_pages", "pdfminer_failed", "early_stop", "filename_stop",
+                    "pdfminer_raw_pages", "pymupdf_pages", "pdfium_pages",
+                    "pdfminer_raw_failed", "pymupdf_failed", "pdfium_failed", "pypdf_failed"):
+            if timings.get(key):
+                self.count(key, int(timings[key]))
+        self.observe_extraction(path, timings.get("extract_s", 0.0))
+
+    def count(self, name: str, inc: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + inc
+
+    def set(self, name: str, value: int) -> None:
+        """Contador com valor absoluto (ex.: limite final de threads de cópia)."""
+        with self._lock:
+            self.counters[name] = value
+
+    def phase(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def observe_extraction(self, path: str, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+            item = (seconds, path)
+            if len(self._slowest) < SLOWEST_KEPT:
+                heapq.heappush(self._slowest, item)
+            elif item > self._slowest[0]:
+                heapq.heapreplace(self._slowest, item)
+
+    # ---- saída ----
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            lat = sorted(self._latencies)
+            counters = dict(self.counters)
+            stages = {k: dict(v) for k, v in self.stages.items()}
+            phases = dict(self.phases)
+            slowest = sorted(self._slowest, reverse=True)
+
+        hits = counters.get("cache_hits", 0) + counters.get("journal_hits", 0)
+        lookups = hits + counters.get("cache_misses", 0)
+        latency = {"files": len(lat)}
+        if lat:
+            latency.update({f"p{p}_ms": round(_percentile(lat, p) * 1000, 2) for p in PERCENTILES})
+            latency["max_ms"] = round(lat[-1] * 1000, 2)
+            latency["mean_ms"] = round(sum(lat) / len(lat) * 1000, 2)
+
+        order = [k for k, _ in STAGES] + sorted(k for k in stages if k not in dict(STAGES))
+        return {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "phases_s": {k: round(v, 3) for k, v in phases.items()},
+            "stages": {k: {"wall_s": round(stages[k]["wall_s"], 4), "cpu_s": round(stages[k]["cpu_s"], 4),
+                           "items": int(stages[k]["items"])} for k in order if k in stages},
+            "counters": counters,
+            "cache_hit_rate": round(hits / lookups, 4) if lookups else None,
+            "extraction_latency": latency,
+            "slowest_files": [{"path": p, "ms": round(s * 1000, 2)} for s, p in slowest],
+        }
+
+    def sheet_rows(self) -> List[List[Any]]:
+        """Linhas (Seção, Métrica, Valor, Detalhe) para a aba "métricas"."""
+        d = self.to_dict()
+        labels = dict(STAGES)
+        rows: List[List[Any]] = []
+        for name, secs in d["phases_s"].items():
+            rows.append(["Fase", name, secs, "s (parede)"])
+        for name, s in d["stages"].items():
+            rows.append(["Etapa", labels.get(name, name), s["wall_s"],
+                         f"s parede | CPU {s['cpu_s']} s | {s['items']} itens"])
+        for name, v in sorted(d["counters"].items()):
+            rows.append(["Contador", name, v, ""])
+        if d["cache_hit_rate"] is not None:
+            rows.append(["Cache", "taxa de acerto", d["cache_hit_rate"], ""])
+        for name, v in d["extraction_latency"].items():
+            rows.append(["Latência extração", name, v, ""])
+        for item in d["slowest_files"]:
+            rows.append(["Mais lentos", os.path.basename(item["path"]), item["ms"], item["path"]])
+        return rows
+
+    def write_json(self, path: str, extra: Optional[Dict[str, Any]] = None) -> str:
+        data = self.to_dict()
+        if extra:
+            data.update(extra)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        return path
@@ -0,0 +1,363 @@
+# Fase 1 em paralelo: extração + matching distribuídos num pool de processos.
+import multiprocessing
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+from util_normalize import normalize_text_for_search, strip_accents_lower
+from search_ac import CompiledNames, compile_names, find_displays_with_source, load_compiled_names
+from pdf_reader import DEFAULT_BACKEND, iter_pages_text, first_two_pages_hash, pdf_producer
+from doc_handle import DocumentHandle, open_document
+from fs_scan import FileEntry, entry_path
+
+# estado de cada processo do pool (montado uma única vez no initializer)
+_NAMES: Optional[CompiledNames] = None
+
+# Regras de parada da leitura (orçamento de páginas)
+STOP_FULL = "full"          # lê sempre as max_pages páginas (comportamento clássico)
+STOP_MATCH = "match"        # para na 1ª página com match que não indique continuação
+STOP_FILENAME = "filename"  # como "match", e o nome do arquivo casando já dispensa o parse
+STOP_RULES = (STOP_FULL, STOP_MATCH, STOP_FILENAME)
+DEFAULT_MAX_PAGES = 3
+
+# "continua", "segue no verso", "página 1 de 3"… (texto sem acentos, minúsculo)
+_CONTINUATION_RE = re.compile(
+    r"\b(?:continua|segue no verso|vide verso)\b"
+    r"|\b(?:p(?:ag(?:ina)?|g)?|fls?|folha)\.?\s*(\d{1,3})\s*(?:de|/)\s*(\d{1,3})\b"
+)
+
+
+def has_continuation(page_text: str) -> bool:
+    """A página avisa que o documento continua (marcador ou "página N de M" com N < M)?"""
+    for m in _CONTINUATION_RE.finditer(strip_accents_lower(page_text)):
+        if m.group(1) is None or int(m.group(1)) < int(m.group(2)):
+            return True
+    return False
+
+
+@dataclass(frozen=True)
+class PageBudget:
+    """
+    Quantas páginas ler e quando parar antes. ``min_pages``: lidas mesmo com
+    parada antecipada (a validação "text" do cache precisa das páginas 1–2).
+    """
+    max_pages: int = DEFAULT_MAX_PAGES
+    stop: str = STOP_FULL
+    min_pages: int = 0
+
+    def key(self) -> Optional[str]:
+        """
+        Identifica o modo de leitura no cache/diário pela regra efetiva (a que muda
+        os nomes achados); None no modo padrão. ``min_pages`` desliga a parada pelo
+        nome do arquivo e adia a parada no match; se adia até a última página, é
+        o mesmo que ler todas.
+        """
+        stop = self.stop
+        if stop == STOP_FILENAME and self.min_pages > 0:
+            stop = STOP_MATCH
+        floor = max(self.min_pages, 1)
+        if stop != STOP_FULL and floor >= self.max_pages:
+            stop = STOP_FULL
+        if stop == STOP_FULL:
+            return None if self.max_pages == DEFAULT_MAX_PAGES else f"{STOP_FULL}:{self.max_pages}"
+        return f"{stop}:{self.max_pages}" + (f":min{floor}" if floor > 1 else "")
+
+
+@dataclass
+class ScanResult:
+    path: str
+    names: List[str] = field(default_factory=list)
+    first2_hash: Optional[str] = None   # None quando veio do cache
+    cached: bool = False
+    error: Optional[str] = None
+    # tempos/contagens desta extração (pdfminer_s, pypdf_s, normalize_s, search_s, …)
+    timings: Dict[str, float] = field(default_factory=dict)
+    # onde cada nome foi encontrado: {"Nome": "p. 2" | "nome do arquivo"} (vazio no cache antigo)
+    sources: Dict[str, str] = field(default_factory=dict)
+    # nomes achados só pela busca aproximada (search_fuzzy), quando ativada
+    fuzzy: List[str] = field(default_factory=list)
+    backend: str = DEFAULT_BACKEND   # extrator usado (pdf_reader.BACKENDS)
+    # identidade (stat) + quick_hash do arquivo como lido, p/ o cache não reabrir/restatar
+    file_info: Optional[Dict[str, Any]] = None
+    # stat da varredura (fs_scan), quando o PDF veio dela: a cópia não restata
+    entry: Optional[FileEntry] = None
+
+
+@dataclass
+class ExtractorChoice:
+    """
+    Backend de extração por família de produtor (extract_calibration); os PDFs
+    de outras famílias usam ``default``. Sem mapa, o /Producer nem é lido.
+    """
+    default: str = DEFAULT_BACKEND
+    by_producer: Dict[str, str] = field(default_factory=dict)
+
+    def for_path(self, src: Union[str, DocumentHandle]) -> str:
+        if not self.by_producer:
+            return self.default
+        return self.by_producer.get(pdf_producer(src), self.default)
+
+
+def match_pdf(path: str, names: CompiledNames, budget: Optional[PageBudget] = None,
+              extractor: Optional[ExtractorChoice] = None) -> ScanResult:
+    """
+    Procura os nomes no nome do arquivo e nas primeiras páginas, lidas uma a uma
+    até o orçamento (``budget``); com regra de parada, o parse termina assim que
+    ela é satisfeita. Cada busca é uma única passada do autômato sobre as
+    páginas lidas + nome do arquivo, guardando a origem de cada nome.
+    O PDF é aberto uma vez (doc_handle): /Producer, extração, fallback, stat e
+    hash rápido do cache saem do mesmo buffer mapeado.
+    """
+    try:
+        doc = open_document(path)
+    except OSError:
+        # segue pelo caminho, como antes: a extração falha e o nome do arquivo ainda vale
+        return _match_source(path, path, names, budget, extractor)
+    with doc:
+        res = _match_source(path, doc, names, budget, extractor)
+        res.file_info = {**doc.identity(), "quick_hash": doc.quick_hash()}
+    return res
+
+
+def _match_source(path: str, src: Union[str, DocumentHandle], names: CompiledNames,
+                  budget: Optional[PageBudget], extractor: Optional[ExtractorChoice]) -> ScanResult:
+    budget = budget or PageBudget()
+    backend = extractor.for_path(src) if extractor is not None else DEFAULT_BACKEND
+    timings: Dict[str, float] = {}
+    norm_s = norm_cpu = search_s = search_cpu = 0.0
+    t_start = time.perf_counter()
+
+    def _normalize(text: str) -> str:
+        nonlocal norm_s, norm_cpu
+        t, c = time.perf_counter(), time.thread_time()
+        out = normalize_text_for_search(text)
+        norm_s += time.perf_counter() - t
+        norm_cpu += time.thread_time() - c
+        return out
+
+    def _search():
+        nonlocal search_s, search_cpu
+        t, c = time.perf_counter(), time.thread_time()
+        out = find_displays_with_source(names, pages_norm, base_norm)
+        search_s += time.perf_counter() - t
+        search_cpu += time.thread_time() - c
+        return out
+
+    base_norm = _normalize(Path(path).stem)
+    pages: List[str] = []
+    pages_norm: List[str] = []
+    found = None          # resultado da busca sobre exatamente as páginas lidas
+    stopped = False
+    if budget.stop == STOP_FILENAME and budget.min_pages <= 0:
+        found = _search()
+        stopped = bool(found[0])
+        if stopped:
+            timings["filename_stop"] = 1
+
+    limit = max(budget.max_pages, budget.min_pages)
+    if not stopped and limit > 0:
+        it = iter_pages_text(src, limit, timings, backend)
+        try:
+            for page in it:
+                pages.append(page)
+                if len(pages) > budget.max_pages:
+                    continue   # só para o hash das páginas 1–2
+                pages_norm.append(_normalize(page))
+                found = None
+                if budget.stop == STOP_FULL or len(pages) < max(budget.min_pages, 1):
+                    continue
+                if len(pages) >= limit:
+                    break      # última página do orçamento: a busca final resolve
+                found = _search()
+                if found[0] and not has_continuation(page):
+                    stopped = True
+                    timings["early_stop"] = 1
+                    break
+        finally:
+            it.close()
+    if found is None:
+        found = _search()
+    sources, fuzzy = found
+
+    # hash das páginas 1–2 (validação "text" do cache), se elas foram lidas por inteiro
+    h12 = first_two_pages_hash(pages) if len(pages) >= 2 or (not stopped and limit >= 2) else None
+    timings.update(extract_s=time.perf_counter() - t_start - norm_s - search_s,
+                   normalize_s=norm_s, normalize_cpu_s=norm_cpu, search_s=search_s, search_cpu_s=search_cpu)
+    return ScanResult(path=path, names=sorted(sources), first2_hash=h12, timings=timings, sources=sources,
+                      fuzzy=fuzzy, backend=backend)
+
+
+def _pool_context():
+    """
+    Processos do pool sem fork do processo principal: ele já tem threads (varredura,
+    cópia, interface) e um fork no meio delas pode herdar locks presos.
+    forkserver onde existe (POSIX), senão spawn (Windows).
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _init_worker(fingerprint: str, names_path: Optional[str], canon_by_disp: Dict[str, str], fuzzy: bool):
+    """
+    O autômato vem do arquivo na pasta de cache (search_ac); compilar é o último
+    caso (sem pasta de cache ou arquivo ilegível).
+    """
+    global _NAMES
+    if _NAMES is not None and _NAMES.fingerprint == fingerprint:
+        return
+    _NAMES = load_compiled_names(names_path, fingerprint) if names_path else None
+    if _NAMES is None:
+        _NAMES = compile_names(canon_by_disp, fingerprint, fuzzy)
+
+
+def _worker_match(path: str, budget: Optional[PageBudget] = None,
+                  extractor: Optional[ExtractorChoice] = None) -> ScanResult:
+    try:
+        return match_pdf(path, _NAMES, budget, extractor)
+    except Exception as e:
+        return ScanResult(path=path, error=str(e))
+
+
+def iter_scan_results(
+    pdf_paths: Iterable[Union[str, FileEntry]],
+    canon_by_disp: Dict[str, str],
+    *,
+    names: Optional[CompiledNames] = None,
+    names_path: Optional[str] = None,
+    workers: int = 1,
+    budget: Optional[PageBudget] = None,
+    extractor: Optional[ExtractorChoice] = None,
+    lookup_cached: Optional[Callable[[Union[str, FileEntry]], Optional[List[str]]]] = None,
+    cancel_event: Optional[threading.Event] = None,
+    wait_if_paused: Optional[Callable[[], None]] = None,
+    window: Optional[int] = None,
+) -> Iterator[ScanResult]:
+    """
+    Gera um ScanResult por PDF, na MESMA ordem de ``pdf_paths`` (caminhos ou os
+    FileEntry da varredura, consumidos em fluxo; o FileEntry segue em ``entry``).
+
+    names/names_path: autômato já compilado (search_ac.load_or_compile_names) e o
+    arquivo de onde os processos do pool o carregam; sem eles, compila aqui.
+    budget: páginas a ler e regra de parada (PageBudget; padrão: páginas 1–3).
+    extractor: backend de extração por produtor (padrão: pdfminer com layout).
+    lookup_cached(path ou FileEntry) -> lista de nomes (hit) ou None (precisa extrair).
+    Com workers > 1 os PDFs não cacheados são distribuídos num
+    ProcessPoolExecutor; no máximo ``window`` PDFs ficam em voo, de modo que
+    pausar/cancelar tem efeito rápido e a memória não cresce com o corpus.
+    Se um processo do pool morre (falha nativa num parser, falta de memória), o
+    pool é recriado e os PDFs que estavam em voo rodam de novo um por vez: só o
+    que derrubar o pool outra vez sai com ``error``.
+    """
+    def _should_cancel() -> bool:
+        return bool(cancel_event and cancel_event.is_set())
+
+    def _cached(item: Union[str, FileEntry]) -> Optional[ScanResult]:
+        if lookup_cached is None:
+            return None
+        names = lookup_cached(item)
+        if names is None:
+            return None
+        return ScanResult(path=entry_path(item), names=list(names), cached=True)
+
+    def _with_entry(res: ScanResult, item: Union[str, FileEntry]) -> ScanResult:
+        if isinstance(item, FileEntry):
+            res.entry = item
+        return res
+
+    if names is None:
+        names = compile_names(canon_by_disp)
+
+    if workers <= 1:
+        for item in pdf_paths:
+            if _should_cancel():
+                return
+            if wait_if_paused:
+                wait_if_paused()
+            res = _cached(item)
+            if res is None:
+                p = entry_path(item)
+                try:
+                    res = match_pdf(p, names, budget, extractor)
+                except Exception as e:
+                    res = ScanResult(path=p, error=str(e))
+            yield _with_entry(res, item)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor   # só quando há pool
+    from concurrent.futures.process import BrokenProcessPool
+
+    window = window or workers * 4
+    pending: deque = deque()   # (item, ScanResult pronto (cache) ou Future), em ordem
+    it = iter(pdf_paths)
+    exhausted = False
+
+    def _new_pool() -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context(), initializer=_init_worker,
+                                   initargs=(names.fingerprint, names_path, canon_by_disp, names.fuzzy is not None))
+
+    def _rerun_isolated(entries: deque) -> deque:
+        """Pool quebrado: resolve os futures em voo, rodando de novo (sozinho) cada um que quebrou."""
+        nonlocal ex
+        ex.shutdown(wait=True, cancel_futures=True)
+        ex = _new_pool()
+        out: deque = deque()
+        for item, head in entries:
+            if not isinstance(head, ScanResult):
+                p = entry_path(item)
+                for attempt in (1, 2):
+                    try:
+                        head = head.result()
+                        break
+                    except BrokenProcessPool as e:
+                        if attempt == 2 or _should_cancel():
+                            head = ScanResult(path=p, error=f"processo de leitura encerrado: {e}")
+                            ex.shutdown(wait=True, cancel_futures=True)
+                            ex = _new_pool()
+                            break
+                        head = ex.submit(_worker_match, p, budget, extractor)
+                    except Exception as e:
+                        head = ScanResult(path=p, error=str(e))
+                        break
+            out.append((item, head))
+        return out
+
+    ex = _new_pool()
+    try:
+        while True:
+            # completa a janela (respeitando pausa/cancelamento)
+            while not exhausted and len(pending) < window:
+                if _should_cancel():
+                    return
+                if wait_if_paused:
+                    wait_if_paused()
+                item = next(it, None)
+                if item is None:
+                    exhausted = True
+                    break
+                res = _cached(item)
+                pending.append((item, res if res is not None
+                                else ex.submit(_worker_match, entry_path(item), budget, extractor)))
+
+            if not pending:
+                return
+
+            item, head = pending[0]
+            if not isinstance(head, ScanResult):
+                try:
+                    head.result()
+                except BrokenProcessPool:
+                    pending = _rerun_isolated(pending)
+                    if _should_cancel():
+                        return
+                    item, head = pending[0]
+            pending.popleft()
+            yield _with_entry(head if isinstance(head, ScanResult) else head.result(), item)
+    finally:
+        for _item, head in pending:
+            if not isinstance(head, ScanResult):
+                head.cancel()
+        ex.shutdown(wait=True, cancel_futures=True)
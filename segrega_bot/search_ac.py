@@ -1,39 +1,256 @@
 # Aho–Corasick para busca de "palavra inteira" com verificação de fronteiras.
-from typing import Dict, List, Set, Tuple
-import ahocorasick 
-from util_normalize import is_word_char
+# O autômato guarda só ids inteiros; id -> tamanho da chave e id -> nomes ficam em
+# arrays. Compilado uma vez por lista de nomes e persistido na pasta de cache, sem
+# pickle (a pasta fica no destino, às vezes compartilhado): o autômato no formato
+# binário do pyahocorasick (payload inteiro, nada é desserializado) e o resto em JSON.
+import glob
+import hashlib
+import json
+import os
+from array import array
+from bisect import bisect_right
+from typing import Dict, List, Optional, Sequence, Tuple
+import ahocorasick
+from util_normalize import WORD_CHARS
+from search_fuzzy import FuzzyIndex, find_fuzzy_ids
 
-def build_automaton(canon_by_display: Dict[str, str]):
+# Separa o texto das páginas do nome do arquivo numa única passada do autômato.
+# O texto normalizado nunca tem "\n" (espaços viram " ") e nenhuma chave também,
+# então nenhum casamento atravessa o separador; e "\n" não é caractere de palavra.
+SOURCE_SEP = "\n"
+FILENAME_SOURCE = 0   # origem "nome do arquivo"; páginas são 1, 2, 3…
+
+# muda quando o formato do arquivo persistido muda (invalida os antigos)
+_FORMAT = "names-v2"
+_FILE_PREFIX = "automaton_"
+_FILE_SUFFIX = ".json"
+_AUTOMATON_SUFFIX = ".aho"
+
+
+class CompiledNames:
+    """
+    Autômato com payload inteiro (id da chave canônica) e, por id, o tamanho da
+    chave (``key_len``) e os nomes exibidos ``displays[disp_start[i]:disp_start[i + 1]]``.
+    ``fuzzy``: índice da busca aproximada (search_fuzzy), só quando pedido.
+    """
+
+    __slots__ = ("automaton", "key_len", "disp_start", "displays", "fingerprint", "fuzzy")
+
+    def __init__(self, automaton, key_len: array, disp_start: array, displays: List[str], fingerprint: str,
+                 fuzzy: Optional[FuzzyIndex] = None):
+        self.automaton = automaton
+        self.key_len = key_len
+        self.disp_start = disp_start
+        self.displays = displays
+        self.fingerprint = fingerprint
+        self.fuzzy = fuzzy
+
+    def __len__(self) -> int:
+        return len(self.key_len)
+
+    def displays_of(self, key_id: int) -> List[str]:
+        return self.displays[self.disp_start[key_id]:self.disp_start[key_id + 1]]
+
+    def __getstate__(self):
+        return (self.automaton, self.key_len, self.disp_start, self.displays, self.fingerprint, self.fuzzy)
+
+    def __setstate__(self, state):
+        self.automaton, self.key_len, self.disp_start, self.displays, self.fingerprint, self.fuzzy = state
+
+
+def names_fingerprint(canon_by_display: Dict[str, str], fuzzy: bool = False) -> str:
+    """Hash da lista (nome exibido -> chave canônica, na ordem) que gera o autômato."""
+    h = hashlib.sha256(_FORMAT.encode() + (b"+fuzzy" if fuzzy else b""))
+    for display, key in canon_by_display.items():
+        h.update(display.encode("utf-8", "surrogatepass"))
+        h.update(b"\0")
+        h.update(key.encode("utf-8", "surrogatepass"))
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+def compile_names(canon_by_display: Dict[str, str], fingerprint: Optional[str] = None,
+                  fuzzy: bool = False) -> CompiledNames:
     """
     canon_by_display: {"Nome Original": "nome canonico sem stopwords"}
-    Retorna automaton e também um mapa key->display para atribuição.
+    Chaves iguais (mesmo nome canônico para pessoas diferentes é raro, mas
+    tratamos) viram um único id com vários nomes exibidos.
+    fuzzy: monta também o índice da busca aproximada (mesmos ids).
     """
-    A = ahocorasick.Automaton()
-    key_to_display: Dict[str, List[str]] = {}
+    ids: Dict[str, int] = {}
+    groups: List[List[str]] = []
     for display, key in canon_by_display.items():
         if not key:
             continue
-        # Evita duplicar chaves iguais (mesmo nome canônico para pessoas diferentes é raro, mas tratamos)
-        if key not in key_to_display:
-            A.add_word(key, key)
-        key_to_display.setdefault(key, []).append(display)
+        kid = ids.get(key)
+        if kid is None:
+            kid = ids[key] = len(groups)
+            groups.append([])
+        groups[kid].append(display)
+
+    A = ahocorasick.Automaton(ahocorasick.STORE_INTS)
+    key_len = array("I", bytes(4 * len(ids)))
+    for key, kid in ids.items():
+        A.add_word(key, kid)
+        key_len[kid] = len(key)
     A.make_automaton()
-    return A, key_to_display
+
+    disp_start = array("I", [0])
+    displays: List[str] = []
+    for group in groups:
+        displays.extend(group)
+        disp_start.append(len(displays))
+    return CompiledNames(A, key_len, disp_start, displays,
+                         fingerprint or names_fingerprint(canon_by_display, fuzzy),
+                         FuzzyIndex(list(ids)) if fuzzy else None)
+
+
+def compiled_names_path(cache_dir: str, fingerprint: str) -> str:
+    return os.path.join(cache_dir, f"{_FILE_PREFIX}{fingerprint[:32]}{_FILE_SUFFIX}")
+
+
+def _automaton_path(path: str) -> str:
+    return path[:-len(_FILE_SUFFIX)] + _AUTOMATON_SUFFIX
+
+
+def _no_objects(_data: bytes):
+    # autômato com payload inteiro não tem objetos a desserializar
+    raise ValueError("automaton with object payload")
+
+
+def load_compiled_names(path: str, fingerprint: str) -> Optional[CompiledNames]:
+    """Autômato persistido, ou None se não existe, não abre ou é de outra lista."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != _FORMAT or meta.get("fingerprint") != fingerprint:
+            return None
+        automaton = ahocorasick.load(_automaton_path(path), _no_objects)
+        if automaton.store != ahocorasick.STORE_INTS or len(automaton) != len(meta["keys"]):
+            return None
+        keys: List[str] = meta["keys"]
+        key_len = array("I", meta["key_len"])
+        disp_start = array("I", meta["disp_start"])
+        displays: List[str] = meta["displays"]
+        if len(keys) != len(key_len) or len(disp_start) != len(keys) + 1 or disp_start[-1] != len(displays):
+            return None
+        return CompiledNames(automaton, key_len, disp_start, displays, fingerprint,
+                             FuzzyIndex(keys) if meta["fuzzy"] else None)
+    except Exception:
+        return None
+
+
+def _save_compiled_names(names: CompiledNames, keys: List[str], path: str) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    names.automaton.save(tmp)
+    os.replace(tmp, _automaton_path(path))
+    meta = {"format": _FORMAT, "fingerprint": names.fingerprint, "fuzzy": names.fuzzy is not None,
+            "keys": keys, "key_len": names.key_len.tolist(), "disp_start": names.disp_start.tolist(),
+            "displays": names.displays}
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)   # por último: o JSON só aparece com o autômato já no lugar
+
+
+def load_or_compile_names(canon_by_display: Dict[str, str], cache_dir: Optional[str] = None,
+                          fuzzy: bool = False) -> Tuple[CompiledNames, Optional[str], bool]:
+    """
+    Carrega da pasta de cache o autômato desta lista de nomes ou compila e grava.
+    Retorna (nomes compilados, caminho do arquivo ou None, veio do cache?).
+    """
+    fp = names_fingerprint(canon_by_display, fuzzy)
+    if not cache_dir:
+        return compile_names(canon_by_display, fp, fuzzy), None, False
+    path = compiled_names_path(cache_dir, fp)
+    names = load_compiled_names(path, fp)
+    if names is not None:
+        return names, path, True
+
+    names = compile_names(canon_by_display, fp, fuzzy)
+    keys = list(dict.fromkeys(k for k in canon_by_display.values() if k))   # na ordem dos ids
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        _save_compiled_names(names, keys, path)
+        # só o da lista atual fica (listas grandes geram arquivos grandes); some também o .pickle antigo
+        keep = {path, _automaton_path(path)}
+        for old in glob.glob(os.path.join(cache_dir, f"{_FILE_PREFIX}*")):
+            if old not in keep and not old.endswith(".tmp"):
+                os.remove(old)
+    except OSError:
+        return names, None, False
+    return names, path, False
+
 
 def boundary_ok(text: str, start: int, end: int) -> bool:
     """Garante 'palavra inteira' verificando caracteres vizinhos."""
-    left_ok = start == 0 or not is_word_char(text[start - 1])
-    right_ok = end == len(text) - 1 or not is_word_char(text[end + 1])
+    left_ok = start == 0 or text[start - 1] not in WORD_CHARS
+    right_ok = end == len(text) - 1 or text[end + 1] not in WORD_CHARS
     return left_ok and right_ok
 
-def find_keys_in_text(A, text: str) -> Set[str]:
-    """Retorna conjunto de chaves canônicas encontradas no 'text' (com fronteira de palavra)."""
-    hits: Set[str] = set()
-    for end, key in A.iter(text):
-        start = end - len(key) + 1
-        if start >= 0 and boundary_ok(text, start, end):
-            hits.add(key)
-    return hits
-
-def map_keys_to_displays(keys: Set[str], key_to_display: Dict[str, List[str]]) -> Set[str]:
-    return {disp for k in keys for disp in key_to_display.get(k, [])}
+def join_sources(pages: Sequence[str], filename: str = "") -> Tuple[str, List[int]]:
+    """
+    Texto único para a busca: páginas (já normalizadas) unidas por espaço, como
+    o texto corrido de antes, e o nome do arquivo depois de SOURCE_SEP.
+    Retorna (texto, início de cada página) – o nome do arquivo começa após a última.
+    """
+    parts: List[str] = []
+    starts: List[int] = []
+    pos = 0
+    for page in pages:
+        starts.append(pos)
+        if page:
+            if parts:
+                parts.append(" ")
+                pos += 1
+                starts[-1] = pos
+            parts.append(page)
+            pos += len(page)
+    parts.append(SOURCE_SEP)
+    starts.append(pos + 1)
+    parts.append(filename)
+    return "".join(parts), starts
+
+def find_ids_with_source(names: CompiledNames, pages: Sequence[str], filename: str = "") -> Dict[int, int]:
+    """
+    Uma passada do autômato sobre páginas + nome do arquivo (join_sources).
+    Retorna {id da chave: origem}: nº da página (1…) onde a chave começa pela
+    primeira vez, ou FILENAME_SOURCE quando só aparece no nome do arquivo.
+    """
+    text, starts = join_sources(pages, filename)
+    name_start = starts[-1]
+    found: Dict[int, int] = {}
+    last = len(text) - 1
+    word = WORD_CHARS
+    key_len = names.key_len
+    for end, kid in names.automaton.iter(text):
+        if kid in found:
+            continue   # hits chegam em ordem de posição: a 1ª origem já foi registrada
+        start = end - key_len[kid] + 1
+        if start < 0 or (start and text[start - 1] in word) or (end < last and text[end + 1] in word):
+            continue
+        found[kid] = FILENAME_SOURCE if start >= name_start else bisect_right(starts, start, 0, len(starts) - 1)
+    return found
+
+def find_displays_with_source(names: CompiledNames, pages: Sequence[str],
+                              filename: str = "") -> Tuple[Dict[str, str], List[str]]:
+    """
+    ({nome exibido: "p. N" | "nome do arquivo"}, nomes só achados pela busca
+    aproximada). A aproximada (se houver índice) só procura o que não casou exato.
+    """
+    found = find_ids_with_source(names, pages, filename)
+    approx: Dict[int, int] = {}
+    if names.fuzzy is not None:
+        approx = find_fuzzy_ids(names.fuzzy, pages, filename, skip=set(found))
+    out: Dict[str, str] = {}
+    fuzzy: List[str] = []
+    for ids, is_fuzzy in ((found, False), (approx, True)):
+        for kid, src in ids.items():
+            label = source_label(src)
+            for disp in names.displays_of(kid):
+                out[disp] = label
+                if is_fuzzy:
+                    fuzzy.append(disp)
+    return out, sorted(fuzzy)
+
+def source_label(source: int) -> str:
+    return "nome do arquivo" if source == FILENAME_SOURCE else f"p. {source}"
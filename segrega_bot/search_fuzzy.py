@@ -0,0 +1,167 @@
+# search_fuzzy.py
+# Busca aproximada (opcional) para texto com ruído de OCR ou hifenização:
+# "maria sllva", "sil- va". Índice de vizinhança por deleção (1 deleção) sobre os
+# tokens dos nomes canônicos; cada candidato é confirmado com distância de edição
+# limitada. Um nome casa quando seus tokens aparecem em sequência, cada um com no
+# máximo MAX_TOKEN_EDITS edições, e pelo menos um deles exato. Um casamento
+# aproximado é descartado se o trecho já casa exato com outro nome da lista, ou se
+# outro nome casa o mesmo trecho com tantas ou menos edições (ambíguo).
+import re
+from array import array
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from util_normalize import WORD_CHARS
+
+MIN_TOKEN_LEN = 4        # tokens menores (ana, luz, paz) só casam exatos
+MAX_TOKEN_EDITS = 1      # Levenshtein por token
+MAX_FUZZY_TOKENS = 2     # tokens aproximados por nome
+MEMO_MAX = 200_000       # tokens de texto já resolvidos (o vocabulário das páginas se repete muito)
+
+_TOKEN_RE = re.compile("[" + re.escape("".join(sorted(WORD_CHARS))) + "]+")
+# quebra de linha hifenizada: "sil-\nva" normalizado vira "sil- va"
+_HYPHEN_BREAK_RE = re.compile(r"(?<=[a-z])- (?=[a-z])")
+
+
+def tokens_of(text: str) -> List[str]:
+    return _TOKEN_RE.findall(_HYPHEN_BREAK_RE.sub("", text))
+
+
+def _deletes(tok: str) -> Set[str]:
+    return {tok[:i] + tok[i + 1:] for i in range(len(tok))}
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """Levenshtein(a, b) <= 1, em O(n)."""
+    la, lb = len(a), len(b)
+    if la > lb:
+        a, b, la, lb = b, a, lb, la
+    if lb - la > 1:
+        return False
+    i = 0
+    while i < la and a[i] == b[i]:
+        i += 1
+    if la == lb:
+        return a[i + 1:] == b[i + 1:]
+    return a[i:] == b[i + 1:]
+
+
+class FuzzyIndex:
+    """
+    ``vocab`` token -> id; ``deletes`` variante (o token ou ele sem 1 letra) -> ids;
+    ``names`` id da chave (o mesmo de CompiledNames) -> ids dos seus tokens;
+    ``by_pair`` (1º, 2º token) -> ids das chaves que começam assim.
+    """
+
+    __slots__ = ("vocab", "words", "deletes", "names", "by_pair", "_singles", "_memo")
+
+    def __init__(self, keys: Sequence[str]):
+        self.vocab: Dict[str, int] = {}
+        self.words: List[str] = []
+        self.deletes: Dict[str, array] = {}
+        self.names: List[Tuple[int, ...]] = []
+        self.by_pair: Dict[Tuple[int, int], array] = {}
+        for kid, key in enumerate(keys):
+            ids = tuple(self._token_id(t) for t in tokens_of(key))
+            self.names.append(ids)
+            if len(ids) >= 2:   # nomes de um só token não entram (aproximação pura demais)
+                self.by_pair.setdefault(ids[:2], array("I")).append(kid)
+        self._derive()
+
+    def _derive(self) -> None:
+        # nomes de um só token: só contam para marcar trechos já casados exatos
+        self._singles: Set[int] = {ids[0] for ids in self.names if len(ids) == 1}
+        self._memo: Dict[str, Dict[int, int]] = {}
+
+    def _token_id(self, tok: str) -> int:
+        tid = self.vocab.get(tok)
+        if tid is None:
+            tid = self.vocab[tok] = len(self.words)
+            self.words.append(tok)
+            if len(tok) >= MIN_TOKEN_LEN:
+                for v in _deletes(tok) | {tok}:
+                    self.deletes.setdefault(v, array("I")).append(tid)
+        return tid
+
+    def __getstate__(self):
+        return (self.vocab, self.words, self.deletes, self.names, self.by_pair)
+
+    def __setstate__(self, state):
+        self.vocab, self.words, self.deletes, self.names, self.by_pair = state
+        self._derive()
+
+    def matches(self, tok: str) -> Dict[int, int]:
+        """{id do token do vocabulário: edições (0 ou 1)} para um token do texto."""
+        hit = self._memo.get(tok)
+        if hit is not None:
+            return hit
+        out: Dict[int, int] = {}
+        tid = self.vocab.get(tok)
+        if tid is not None:
+            out[tid] = 0
+        if len(tok) >= MIN_TOKEN_LEN - MAX_TOKEN_EDITS:
+            words, deletes = self.words, self.deletes
+            for v in _deletes(tok) | {tok}:
+                for cand in deletes.get(v, ()):
+                    if cand not in out and _within_one_edit(tok, words[cand]):
+                        out[cand] = 1
+        if len(self._memo) >= MEMO_MAX:
+            self._memo.clear()
+        self._memo[tok] = out
+        return out
+
+    def find(self, text: str, skip: Set[int]) -> Set[int]:
+        """Ids das chaves que casam de forma aproximada em ``text`` (exceto ``skip``)."""
+        cands = [self.matches(t) for t in tokens_of(text)]
+        n = len(cands)
+        names, by_pair = self.names, self.by_pair
+        exact = [False] * n          # token dentro de um trecho que casa exato com algum nome
+        singles = self._singles
+        for i, c in enumerate(cands):
+            if any(e == 0 and t in singles for t, e in c.items()):
+                exact[i] = True
+        spans: List[Tuple[int, int, int, int]] = []   # (início, fim, edições, id) aproximados
+        for i in range(n - 1):
+            first, second = cands[i], cands[i + 1]
+            if not first or not second:
+                continue
+            for a, ea in first.items():
+                for b, eb in second.items():
+                    for kid in by_pair.get((a, b), ()):
+                        ids = names[kid]
+                        if i + len(ids) > n:
+                            continue
+                        edits = ea + eb
+                        for j in range(2, len(ids)):
+                            e = cands[i + j].get(ids[j])
+                            if e is None:
+                                break
+                            edits += e
+                        else:
+                            if edits == 0:
+                                exact[i:i + len(ids)] = [True] * len(ids)
+                            elif edits <= MAX_FUZZY_TOKENS and edits < len(ids):
+                                spans.append((i, i + len(ids), edits, kid))
+
+        found: Set[int] = set()
+        for start, end, edits, kid in spans:
+            if kid in skip or any(exact[start:end]):
+                continue
+            # outro nome no mesmo trecho com tantas ou menos edições: não dá para escolher
+            if any(k != kid and s < end and start < e and ed <= edits for s, e, ed, k in spans):
+                continue
+            found.add(kid)
+        return found
+
+
+def find_fuzzy_ids(index: FuzzyIndex, pages: Sequence[str], filename: str,
+                   skip: Optional[Set[int]] = None) -> Dict[int, int]:
+    """{id da chave: origem} (página 1… ou 0 = nome do arquivo) dos casamentos aproximados."""
+    skip = set(skip or ())
+    out: Dict[int, int] = {}
+    for source, text in list(enumerate(pages, start=1)) + [(0, filename)]:
+        if not text:
+            continue
+        for kid in index.find(text, skip):
+            out[kid] = source
+            skip.add(kid)
+    return out
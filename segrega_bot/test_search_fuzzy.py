@@ -0,0 +1,34 @@
+# test_search_fuzzy.py
+# Busca aproximada com nomes quase iguais na lista (python -m pytest, nesta pasta).
+from search_ac import compile_names, find_displays_with_source
+from util_normalize import normalize_names_for_key, normalize_text_for_search
+
+NAMES = ["Maria Sousa", "Maria Souza", "João Pereira"]
+
+
+def _find(text: str):
+    names = compile_names(dict(zip(NAMES, normalize_names_for_key(NAMES))), fuzzy=True)
+    return find_displays_with_source(names, [normalize_text_for_search(text)])
+
+
+def test_exact_span_is_not_matched_again_approximately():
+    sources, fuzzy = _find("Declaro que Maria Souza recebeu")
+    assert set(sources) == {"Maria Souza"}
+    assert fuzzy == []
+
+
+def test_tie_between_near_identical_names_matches_neither():
+    sources, fuzzy = _find("Declaro que Maria Souxa recebeu")
+    assert sources == {} and fuzzy == []
+
+
+def test_closest_name_wins():
+    sources, fuzzy = _find("Declaro que Maria Souzza recebeu")
+    assert set(sources) == {"Maria Souza"}
+    assert fuzzy == ["Maria Souza"]
+
+
+def test_other_names_still_match_approximately():
+    sources, fuzzy = _find("Joao Pereyra e Maria Sousa")
+    assert set(sources) == {"Maria Sousa", "João Pereira"}
+    assert fuzzy == ["João Pereira"]
@@ -1,5 +1,6 @@
 # ui.py
 import os
+import queue
 import subprocess
 import sys
 import webbrowser
@@ -10,6 +11,48 @@ from tkinter.scrolledtext import ScrolledText
 
 APP_TITLE = "CEFGD - BOT DE DISTRIBUIÇÃO"
 DEFAULT_REPORT_NAME = "relatorio_distribuicao.xlsx"
+# modo de validação do cache (cache_db.VALIDATE_*) -> rótulo exibido
+CACHE_VALIDATION_LABELS = {
+    "stat": "Rápida (metadados)",
+    "bytes": "Bytes do arquivo",
+    "text": "Rigorosa (texto p. 1–2)",
+}
+# modo de colocação no destino (copy_engine.PLACEMENT_MODES) -> rótulo exibido
+PLACEMENT_LABELS = {
+    "auto": "Automático (link → clone → cópia)",
+    "clone": "Clone/cópia (arquivos independentes)",
+    "copy": "Sempre copiar",
+    "symlink": "Links simbólicos p/ a origem",
+}
+# regra de parada da leitura (scan_engine.STOP_RULES) -> rótulo exibido
+STOP_RULE_LABELS = {
+    "full": "Ler todas as páginas do limite",
+    "match": "Parar no 1º match (sem \"continua\")",
+    "filename": "Parar no 1º match, inclusive pelo nome do arquivo",
+}
+DEFAULT_MAX_PAGES = 3
+# backend de extração (pdf_reader.BACKENDS, ou calibração automática) -> rótulo exibido
+EXTRACT_BACKEND_LABELS = {
+    "pdfminer": "pdfminer com layout (padrão)",
+    "auto": "Automático (calibra por produtor do PDF)",
+    "pdfminer_raw": "pdfminer sem layout",
+    "pypdf": "pypdf",
+    "pymupdf": "PyMuPDF (se instalado)",
+    "pdfium": "pdfium (se instalado)",
+}
+# formato do relatório (report_writer.REPORT_FORMATS) -> rótulo exibido
+REPORT_FORMAT_LABELS = {
+    "xlsx": "Excel (.xlsx)",
+    "csv": "CSV (.csv, um arquivo por aba)",
+    "jsonl": "JSON Lines (.jsonl, um arquivo por aba)",
+    "parquet": "Parquet (.parquet, requer pyarrow)",
+}
+DEFAULT_WORKERS = max(1, (os.cpu_count() or 2) - 1)  # deixa um núcleo livre p/ GUI e cópias
+
+# atualizações vindas das threads são aplicadas em lote, a cada quadro
+UI_FRAME_MS = 50
+UI_MAX_ITEMS_PER_FRAME = 20000
+LOG_MAX_LINES = 2000   # o log completo vai para arquivo (ui_set_log_file)
 
 
 def open_path(path):
@@ -106,13 +149,18 @@ class App(tk.Tk):
         self.title(APP_TITLE)
         self.geometry("900x520")
         self.minsize(820, 480)
+        # canal de atualizações thread-safe, drenado pelo loop do Tk
+        self._updates: queue.SimpleQueue = queue.SimpleQueue()
+        self._log_file = None
         self._setup_style()
         self._build_ui()
         self._bind_shortcuts()
+        self.after(UI_FRAME_MS, self._drain_updates)
         # callbacks externos
         self._on_start = None
         self._on_pause = None
         self._on_cancel = None
+        self._on_resume = None
 
     # ---- Estilo ----
     def _setup_style(self):
@@ -156,8 +204,11 @@ class App(tk.Tk):
         self.var_report = tk.BooleanVar(value=True)
         self.var_open_rep = tk.BooleanVar(value=False)
         self.var_clear_cache = tk.BooleanVar(value=True)
+        self.var_overlap = tk.BooleanVar(value=False)
+        self.var_fuzzy = tk.BooleanVar(value=False)
+        self.var_unordered_scan = tk.BooleanVar(value=False)
 
-        ttk.Checkbutton(frm_rep, text="Gerar Excel", variable=self.var_report).grid(row=0, column=0, sticky="w")
+        ttk.Checkbutton(frm_rep, text="Gerar relatório", variable=self.var_report).grid(row=0, column=0, sticky="w")
         self.f_report = PathField(
             frm_rep,
             mode="savefile",
@@ -168,6 +219,11 @@ class App(tk.Tk):
         self.f_report.grid(row=0, column=1, sticky="ew")
         ttk.Checkbutton(frm_rep, text="Abrir ao finalizar", variable=self.var_open_rep).grid(row=0, column=2, sticky="w")
 
+        self.var_report_format = tk.StringVar(value=REPORT_FORMAT_LABELS["xlsx"])
+        ttk.Label(frm_rep, text="Formato:").grid(row=1, column=0, sticky="w", pady=(4, 0))
+        ttk.Combobox(frm_rep, state="readonly", width=38, textvariable=self.var_report_format,
+                     values=list(REPORT_FORMAT_LABELS.values())).grid(row=1, column=1, sticky="w", pady=(4, 0))
+
         # Execução / Status
         frm_run = ttk.LabelFrame(self, text="Execução")
         frm_run.grid(row=2, column=0, sticky="nsew", **pad)
@@ -190,11 +246,64 @@ class App(tk.Tk):
         for i, w in enumerate([self.lbl_total, self.lbl_colabs, self.lbl_found, self.lbl_nomatch, self.lbl_conflicts]):
             w.grid(row=0, column=i, sticky="w")
 
+        frm_opts = ttk.Frame(frm_run)
+        frm_opts.grid(row=2, column=0, sticky="ew")
         ttk.Checkbutton(
-            frm_run,
+            frm_opts,
             text="Limpar cache ao finalizar",
             variable=self.var_clear_cache
-        ).grid(row=2, column=0, sticky="w")
+        ).grid(row=0, column=0, sticky="w")
+
+        self.var_workers = tk.IntVar(value=DEFAULT_WORKERS)
+        ttk.Label(frm_opts, text="Processos de leitura:").grid(row=0, column=1, sticky="w", padx=(18, 4))
+        ttk.Spinbox(frm_opts, from_=1, to=max(64, DEFAULT_WORKERS), width=4,
+                    textvariable=self.var_workers).grid(row=0, column=2, sticky="w")
+
+        self.var_validation = tk.StringVar(value=CACHE_VALIDATION_LABELS["stat"])
+        ttk.Label(frm_opts, text="Validação do cache:").grid(row=0, column=3, sticky="w", padx=(18, 4))
+        ttk.Combobox(frm_opts, state="readonly", width=24, textvariable=self.var_validation,
+                     values=list(CACHE_VALIDATION_LABELS.values())).grid(row=0, column=4, sticky="w")
+
+        ttk.Checkbutton(
+            frm_opts,
+            text="Copiar durante a leitura",
+            variable=self.var_overlap
+        ).grid(row=0, column=5, sticky="w", padx=(18, 0))
+
+        self.var_placement = tk.StringVar(value=PLACEMENT_LABELS["auto"])
+        ttk.Label(frm_opts, text="Modo de cópia:").grid(row=1, column=1, sticky="w", padx=(18, 4), pady=(4, 0))
+        ttk.Combobox(frm_opts, state="readonly", width=34, textvariable=self.var_placement,
+                     values=list(PLACEMENT_LABELS.values())).grid(row=1, column=2, columnspan=3,
+                                                                  sticky="w", pady=(4, 0))
+
+        ttk.Checkbutton(
+            frm_opts,
+            text="Busca aproximada (OCR)",
+            variable=self.var_fuzzy
+        ).grid(row=1, column=5, sticky="w", padx=(18, 0), pady=(4, 0))
+
+        self.var_max_pages = tk.IntVar(value=DEFAULT_MAX_PAGES)
+        ttk.Label(frm_opts, text="Páginas lidas (máx.):").grid(row=2, column=1, sticky="w", padx=(18, 4), pady=(4, 0))
+        ttk.Spinbox(frm_opts, from_=1, to=50, width=4,
+                    textvariable=self.var_max_pages).grid(row=2, column=2, sticky="w", pady=(4, 0))
+
+        self.var_stop_rule = tk.StringVar(value=STOP_RULE_LABELS["full"])
+        ttk.Label(frm_opts, text="Parar a leitura:").grid(row=2, column=3, sticky="w", padx=(18, 4), pady=(4, 0))
+        ttk.Combobox(frm_opts, state="readonly", width=44, textvariable=self.var_stop_rule,
+                     values=list(STOP_RULE_LABELS.values())).grid(row=2, column=4, columnspan=2,
+                                                                  sticky="w", pady=(4, 0))
+
+        self.var_backend = tk.StringVar(value=EXTRACT_BACKEND_LABELS["pdfminer"])
+        ttk.Label(frm_opts, text="Extração:").grid(row=3, column=1, sticky="w", padx=(18, 4), pady=(4, 0))
+        ttk.Combobox(frm_opts, state="readonly", width=40, textvariable=self.var_backend,
+                     values=list(EXTRACT_BACKEND_LABELS.values())).grid(row=3, column=2, columnspan=3,
+                                                                        sticky="w", pady=(4, 0))
+
+        ttk.Checkbutton(
+            frm_opts,
+            text="Varredura sem ordem fixa",
+            variable=self.var_unordered_scan
+        ).grid(row=3, column=5, sticky="w", padx=(18, 0), pady=(4, 0))
 
         self.log = ScrolledText(frm_run, height=9, state='normal')
         self.log.grid(row=3, column=0, sticky="nsew", pady=(6, 6))
@@ -210,7 +319,9 @@ class App(tk.Tk):
         self.btn_pause = ttk.Button(left, text="Pausar", state='disabled', command=self.pause)
         self.btn_cancel = ttk.Button(left, text="Cancelar", style='Danger.TButton', state='disabled', command=self.cancel)
         self.btn_new = ttk.Button(left, text="Novo", state='disabled', command=self.new)
+        self.btn_resume = ttk.Button(left, text="Retomar", command=self.resume)
         self.btn_new.grid(row=0, column=3, padx=(6, 0))
+        self.btn_resume.grid(row=0, column=4, padx=(6, 0))
         self.btn_start.grid(row=0, column=0, padx=(0, 6))
         self.btn_pause.grid(row=0, column=1, padx=(0, 6))
         self.btn_cancel.grid(row=0, column=2)
@@ -221,10 +332,11 @@ class App(tk.Tk):
         self.btn_open_dst.grid(row=0, column=1)
 
     # ---- binding externo ----
-    def bind_handlers(self, *, on_start, on_pause, on_cancel):
+    def bind_handlers(self, *, on_start, on_pause, on_cancel, on_resume=None):
         self._on_start = on_start
         self._on_pause = on_pause
         self._on_cancel = on_cancel
+        self._on_resume = on_resume
 
     # ---- atalhos e validação ----
     def _bind_shortcuts(self):
@@ -257,6 +369,15 @@ class App(tk.Tk):
         if self._on_start:
             self._on_start(self)
 
+    def resume(self):
+        """Retoma a última execução interrompida na pasta destino (checkpoint)."""
+        if not self._validate_inputs():
+            return
+        self.ui_log("Retomando execução anterior…")
+        self._toggle_buttons(running=True)
+        if self._on_resume:
+            self._on_resume(self)
+
     def pause(self):
         self.ui_log("Pausa solicitada…")
         if self._on_pause:
@@ -269,15 +390,84 @@ class App(tk.Tk):
 
     def _toggle_buttons(self, running: bool):
         self.btn_start.configure(state='disabled' if running else 'normal')
+        self.btn_resume.configure(state='disabled' if running else 'normal')
         self.btn_pause.configure(state='normal' if running else 'disabled')
         self.btn_cancel.configure(state='normal' if running else 'disabled')
         self.btn_new.configure(state='disabled')  # só habilita ao finalizar
         self.btn_open_dst.configure(state='disabled' if running else 'normal')
         self.btn_open_report.configure(state='disabled')
 
+    # ---- canal de atualizações (produtor: threads; consumidor: loop do Tk) ----
+    def _post(self, kind: str, payload=None):
+        self._updates.put((kind, payload))
+
+    def _drain_updates(self):
+        """Aplica de uma vez tudo o que chegou desde o último quadro."""
+        lines: list[str] = []
+        steps = 0
+
+        def _flush():
+            nonlocal lines, steps
+            if lines:
+                self._append_log(lines)
+                lines = []
+            if steps:
+                self.prog.config(value=min(self.prog['value'] + steps, self.prog['maximum']))
+                steps = 0
+
+        try:
+            for _ in range(UI_MAX_ITEMS_PER_FRAME):
+                try:
+                    kind, payload = self._updates.get_nowait()
+                except queue.Empty:
+                    break
+                if kind == "log":
+                    lines.append(payload)
+                elif kind == "step":
+                    steps += payload
+                else:   # "call": preserva a ordem em relação a logs/passos
+                    _flush()
+                    payload()
+            _flush()
+        finally:
+            self.after(UI_FRAME_MS, self._drain_updates)
+
+    def _append_log(self, lines: list[str]):
+        text = "\n".join(lines) + "\n"
+        if self._log_file is not None:
+            try:
+                self._log_file.write(text)
+                self._log_file.flush()
+            except (OSError, ValueError):
+                self._log_file = None
+        self.log.insert('end', text)
+        # mantém só as últimas LOG_MAX_LINES linhas na tela
+        excess = int(self.log.index('end-1c').split('.')[0]) - 1 - LOG_MAX_LINES
+        if excess > 0:
+            self.log.delete('1.0', f'{excess + 1}.0')
+        self.log.see('end')
+
+    def _set_log_file(self, path: str | None):
+        if self._log_file is not None:
+            try:
+                self._log_file.close()
+            except OSError:
+                pass
+            self._log_file = None
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                self._log_file = open(path, "a", encoding="utf-8")
+            except OSError:
+                self._log_file = None
+
     # ---- helpers thread-safe para o main usar ----
     def ui_log(self, msg: str):
-        self.after(0, lambda: (self.log.insert('end', msg + "\n"), self.log.see('end')))
+        self._post("log", msg)
+
+    def ui_set_log_file(self, path: str | None):
+        """Grava o log completo em ``path`` (a tela guarda só as últimas linhas)."""
+        self._post("call", lambda: self._set_log_file(path))
 
     def ui_set_counts(self, *, total=0, colabs=0, found=0, nomatch=0, conflicts=0):
         def _apply():
@@ -286,25 +476,25 @@ class App(tk.Tk):
             self.lbl_found.config(text=f"Encontrados: {found}")
             self.lbl_nomatch.config(text=f"Sem match: {nomatch}")
             self.lbl_conflicts.config(text=f"Conflitos: {conflicts}")
-        self.after(0, _apply)
+        self._post("call", _apply)
 
     def ui_set_progress_total(self, total: int):
-        self.after(0, lambda: (self.prog.config(maximum=max(1, total)), self.prog.config(value=0)))
+        self._post("call", lambda: (self.prog.config(maximum=max(1, total)), self.prog.config(value=0)))
 
     def ui_set_progress(self, value: int):
-        self.after(0, lambda: self.prog.config(value=min(value, int(self.prog['maximum']))))
+        self._post("call", lambda: self.prog.config(value=min(value, int(self.prog['maximum']))))
 
     def ui_step(self, inc: int = 1):
-        def _apply():
-            self.prog.config(value=min(self.prog['value'] + inc, self.prog['maximum']))
-        self.after(0, _apply)
+        self._post("step", inc)
 
-    def ui_on_finish(self, report_path: str | None):
+    def ui_on_finish(self, report_path: str | None, resumable: bool = False):
         def _apply():
             self.ui_log("Concluído!")
 
             # Mantém INICIAR desabilitado para evitar duplicidade
             self.btn_start.configure(state='disabled')
+            # execução interrompida: deixa 'Retomar' disponível
+            self.btn_resume.configure(state='normal' if resumable else 'disabled')
             self.btn_pause.configure(state='disabled')
             self.btn_cancel.configure(state='disabled')
 
@@ -318,7 +508,7 @@ class App(tk.Tk):
                     except Exception:
                         pass
                 self.btn_open_report.configure(state='normal')
-        self.after(0, _apply)
+        self._post("call", _apply)
 
     def new(self):
         """Limpa campos/estado e reabilita o botão Iniciar."""
@@ -346,6 +536,7 @@ class App(tk.Tk):
 
         # Reabilita Iniciar e desabilita 'Novo' até a próxima conclusão
         self.btn_start.configure(state='normal')
+        self.btn_resume.configure(state='normal')
         self.btn_new.configure(state='disabled')
 
     # acessos aos caminhos
@@ -359,8 +550,9 @@ class App(tk.Tk):
         if not raw:
             return None
         p = Path(raw)
-        if not p.suffix:
-            p = p.with_suffix(".xlsx")
+        # a extensão acompanha o formato escolhido (outras extensões são respeitadas)
+        if not p.suffix or p.suffix.lower().lstrip(".") in REPORT_FORMAT_LABELS:
+            p = p.with_suffix("." + self.get_report_format())
         if not p.is_absolute():
             dst = Path(self.f_dst.get()) if self.f_dst.get() else Path.cwd()
             p = dst / p
@@ -369,6 +561,62 @@ class App(tk.Tk):
     def should_clear_cache(self) -> bool:
         return bool(self.var_clear_cache.get())
 
+    def should_overlap_copies(self) -> bool:
+        return bool(self.var_overlap.get())
+
+    def should_match_fuzzy(self) -> bool:
+        return bool(self.var_fuzzy.get())
+
+    def should_scan_unordered(self) -> bool:
+        return bool(self.var_unordered_scan.get())
+
+    def get_placement(self) -> str:
+        label = self.var_placement.get()
+        for mode, lbl in PLACEMENT_LABELS.items():
+            if lbl == label:
+                return mode
+        return "auto"
+
+    def get_report_format(self) -> str:
+        label = self.var_report_format.get()
+        for fmt, lbl in REPORT_FORMAT_LABELS.items():
+            if lbl == label:
+                return fmt
+        return "xlsx"
+
+    def get_cache_validation(self) -> str:
+        label = self.var_validation.get()
+        for mode, lbl in CACHE_VALIDATION_LABELS.items():
+            if lbl == label:
+                return mode
+        return "stat"
+
+    def get_workers(self) -> int:
+        try:
+            return max(1, int(self.var_workers.get()))
+        except (tk.TclError, ValueError):
+            return DEFAULT_WORKERS
+
+    def get_max_pages(self) -> int:
+        try:
+            return max(1, int(self.var_max_pages.get()))
+        except (tk.TclError, ValueError):
+            return DEFAULT_MAX_PAGES
+
+    def get_extract_backend(self) -> str:
+        label = self.var_backend.get()
+        for backend, lbl in EXTRACT_BACKEND_LABELS.items():
+            if lbl == label:
+                return backend
+        return "pdfminer"
+
+    def get_stop_rule(self) -> str:
+        label = self.var_stop_rule.get()
+        for rule, lbl in STOP_RULE_LABELS.items():
+            if lbl == label:
+                return rule
+        return "full"
+
     def _open_report(self):
         p = self.get_report_path()
         if not p:
@@ -384,4 +632,5 @@ class App(tk.Tk):
             messagebox.showinfo("Relatório", f"Arquivo não encontrado:\n{P}")
 
     def _on_exit(self):
+        self._set_log_file(None)
         self.destroy()
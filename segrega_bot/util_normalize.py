@@ -1,38 +1,118 @@
-import re
 import unicodedata
+from typing import Iterable, List
 
 # palavras brasileiras a remover dos NOMES (e também do texto normalizado p/ matching)
 STOPWORDS = {"de", "da", "do", "dos", "das", "e"}
 
-_WORD_RE = re.compile(r"[a-z0-9]", re.IGNORECASE)
+# caracteres de "palavra" p/ as fronteiras da busca: o mesmo conjunto que a antiga
+# regex [a-z0-9] com IGNORECASE aceitava (que inclui İ, ı, ſ e o K do Kelvin)
+WORD_CHARS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789\u0130\u0131\u017f\u212a")
+
+# separador do lote em normalize_texts_for_search (não pode aparecer nos textos)
+_BATCH_SEP = "\x00"
+
+
+def _fold_char(ch: str) -> str:
+    """O que sobra de ``ch`` após NFD sem as marcas combinantes (ex.: "ã" -> "a", "Ç" -> "C")."""
+    return "".join(c for c in unicodedata.normalize("NFD", ch) if not unicodedata.combining(c))
+
+
+class _FoldTable(dict):
+    """
+    Tabela p/ str.translate: acentos fora, marcas combinantes apagadas. Latin-1 e
+    Latin Extended A/B vêm pré-calculados; o resto do Unicode entra sob demanda.
+    Caracteres que não mudam ficam mapeados para si mesmos (cache do "não muda").
+    """
+
+    def __missing__(self, cp: int):
+        ch = chr(cp)
+        folded = _fold_char(ch)
+        value = cp if folded == ch else (folded or None)
+        self[cp] = value
+        return value
+
+
+_FOLD = _FoldTable()
+for _cp in range(0xC0, 0x250):
+    _FOLD[_cp]
+
+# Latin-1 se dobra 1 p/ 1 dentro do próprio Latin-1 ("é" -> "e", "Ç" -> "C", "ß" fica):
+# o grosso do texto passa por bytes.translate, bem mais rápido que str.translate com dicionário
+_LATIN1_TABLE = bytes(ord(_fold_char(chr(_cp))) for _cp in range(256))
+del _cp
+
+
+
+def _fold_outside_latin1(s: str, encoded: bytes, out: str) -> str:
+    """Refaz em ``out`` os trechos que o encode trocou por "?" (–, “”, grego…) pela tabela geral."""
+    parts, last, n = [], 0, len(s)
+    i = encoded.find(b"?")
+    while i >= 0:
+        if s[i] == "?":
+            i = encoded.find(b"?", i + 1)
+            continue
+        j = i + 1
+        while j < n and encoded[j] == 0x3F and s[j] != "?":
+            j += 1
+        parts.append(out[last:i])
+        parts.append(s[i:j].translate(_FOLD))
+        last = j
+        i = encoded.find(b"?", j)
+    parts.append(out[last:])
+    return "".join(parts)
+
+
+def _fold(s: str) -> str:
+    # ASCII não tem acento: só o lower(), que é o caso da maioria dos nomes de arquivo
+    if s.isascii():
+        return s.lower()
+    # um caractere -> um byte ("?" fora do Latin-1), então as posições se mantêm
+    encoded = s.encode("latin-1", "replace")
+    out = encoded.translate(_LATIN1_TABLE).decode("latin-1")
+    if encoded.count(b"?") != s.count("?"):
+        out = _fold_outside_latin1(s, encoded, out)
+    # lower() no fim, sobre o texto inteiro (preserva o sigma final do grego, como antes)
+    return out.lower()
+
 
 def strip_accents_lower(s: str) -> str:
+    """Sem acentos/Ç, minúsculo, espaços (Unicode) colapsados em 1 e aparados."""
     if not s:
         return ""
-    # Normaliza e remove acentos
-    s = unicodedata.normalize("NFD", s)
-    s = "".join(ch for ch in s if not unicodedata.combining(ch))
-    # Ç explícito para C por segurança (após NFD, "ç" vira "c")
-    s = s.replace("Ç", "C").replace("ç", "c")
-    s = s.lower()
-    # colapsa espaços e pontuação redundante em 1 espaço
-    s = re.sub(r"\s+", " ", s)
-    return s.strip()
+    return " ".join(_fold(s).split())
 
 def remove_stopwords_tokens(text: str) -> str:
-    tokens = text.split()
-    tokens = [t for t in tokens if t not in STOPWORDS]
-    return " ".join(tokens)
+    return " ".join([t for t in text.split() if t not in STOPWORDS])
 
 def normalize_name_for_key(name: str) -> str:
     """Nome canônico: sem acentos/Ç, minúsculo, sem stopwords."""
-    base = strip_accents_lower(name)
-    return remove_stopwords_tokens(base)
+    if not name:
+        return ""
+    return " ".join([t for t in _fold(name).split() if t not in STOPWORDS])
 
 def normalize_text_for_search(text: str) -> str:
     """Texto do PDF/filename pronto p/ busca: sem acentos/Ç, minúsculo, sem stopwords."""
-    base = strip_accents_lower(text)
-    return remove_stopwords_tokens(base)
+    if not text:
+        return ""
+    return " ".join([t for t in _fold(text).split() if t not in STOPWORDS])
+
+def normalize_texts_for_search(texts: Iterable[str]) -> List[str]:
+    """
+    Lote de normalize_text_for_search: um translate/lower só sobre os textos
+    unidos por um separador, depois a divisão por texto (mesmo resultado).
+    """
+    texts = [t or "" for t in texts]
+    if not texts:
+        return []
+    if any(_BATCH_SEP in t for t in texts):
+        return [normalize_text_for_search(t) for t in texts]
+    stop = STOPWORDS
+    return [" ".join([t for t in part.split() if t not in stop])
+            for part in _fold(_BATCH_SEP.join(texts)).split(_BATCH_SEP)]
+
+def normalize_names_for_key(names: Iterable[str]) -> List[str]:
+    """Lote de normalize_name_for_key (nome e texto seguem a mesma normalização)."""
+    return normalize_texts_for_search(names)
 
 def is_word_char(ch: str) -> bool:
-    return bool(ch) and bool(_WORD_RE.match(ch))
+    return bool(ch) and ch[0] in WORD_CHARS